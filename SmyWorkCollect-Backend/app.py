@@ -1,4 +1,5 @@
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Flask, jsonify, send_file, request, g
+from flask.json.provider import JSONProvider, DefaultJSONProvider
 from flask_cors import CORS
 import json
 import os
@@ -6,11 +7,63 @@ import shutil
 import hashlib
 import time
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
+from werkzeug.exceptions import RequestEntityTooLarge
 import tempfile
 import re
 import unicodedata
+import uuid
+import bisect
+import functools
+import threading
+import atexit
+import sqlite3
+import gzip
+import stat
+import mimetypes
+from urllib.parse import quote
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from concurrent.futures import ThreadPoolExecutor
+import zipfile
+import operator
+from array import array
+import select
+import struct
+import errno
+import ipaddress
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import ctypes
+    import ctypes.util
+    _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    _libc.inotify_init1.argtypes = [ctypes.c_int]
+    _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+except (ImportError, OSError, AttributeError):  # 非 Linux 时作品目录监视退回轮询
+    _libc = None
+
+try:
+    import brotli
+except ImportError:  # 未安装 brotli 时只提供 gzip 压缩
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时使用标准库 json
+    orjson = None
+
+try:
+    from PIL import Image
+except ImportError:  # 未安装 Pillow 时不生成缩略图，直接返回原图
+    Image = None
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -29,8 +82,8 @@ app.config['MAX_FORM_PARTS'] = 1000
 
 # 获取项目根目录
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-# works 目录已移动到后端目录下
-WORKS_DIR = os.path.join(BASE_DIR, 'works')
+# works 目录已移动到后端目录下（可用环境变量 SMY_WORKS_DIR 指定其他位置）
+WORKS_DIR = os.environ.get('SMY_WORKS_DIR') or os.path.join(BASE_DIR, 'works')
 # config 目录已移动到前端目录下
 FRONTEND_DIR = os.path.abspath(os.path.join(BASE_DIR, '..', 'SmyWorkCollect-Frontend'))
 CONFIG_DIR = os.path.join(FRONTEND_DIR, 'config')
@@ -41,9 +94,31 @@ ADMIN_TOKEN = "shumengya520"
 # 允许的文件扩展名
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp4', 'avi', 'mov', 'zip', 'rar', 'apk', 'exe', 'dmg'}
 
-# 防刷机制：存储用户操作记录
-# 格式: {user_fingerprint: {action_type: {work_id: last_action_time}}}
-user_actions = {}
+# 上传支持的文件类型
+UPLOAD_FILE_TYPES = ('image', 'video', 'platform')
+# 内容寻址的文件存储目录（与 works 目录在同一文件系统上才能使用硬链接，环境变量 SMY_BLOB_DIR）
+BLOB_DIR = os.environ.get('SMY_BLOB_DIR') or os.path.join(BASE_DIR, 'blobs')
+# 上传暂存目录（位于作品目录内，完成后同盘重命名，无需跨设备复制）
+UPLOAD_STAGING_SUBDIR = '.uploads'
+# 上传写盘缓冲大小
+UPLOAD_BUFFER_SIZE = 1024 * 1024
+# 分块上传默认分块大小和上限
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+# 未完成的分块上传会话保留时间（秒）
+UPLOAD_SESSION_TTL = 24 * 3600
+
+# 防刷机制存储后端：'memory'（单进程）或 'sqlite'（多个 gunicorn worker 共享），
+# 可用环境变量 SMY_RATE_LIMIT_BACKEND 指定；gunicorn.conf.py 在多个 worker 时默认设为 'sqlite'
+RATE_LIMIT_BACKEND = os.environ.get('SMY_RATE_LIMIT_BACKEND') or 'memory'
+# 防刷记录最大条数，超出后按最近最少使用淘汰
+RATE_LIMIT_MAX_ENTRIES = 100000
+
+# 可信的反向代理（IP 或网段）。直连地址是可信代理时才读取 REAL_IP_HEADER，并从右向左跳过其中的可信代理，
+# 第一个不可信的地址即客户端 IP（与 nginx 的 set_real_ip_from + real_ip_recursive on 相同）；
+# 其他情况一律使用直连地址，客户端自己伪造的 X-Forwarded-For 不起作用
+TRUSTED_PROXIES = ('127.0.0.1', '::1')
+REAL_IP_HEADER = 'X-Forwarded-For'
 
 # 防刷时间间隔（秒）
 RATE_LIMITS = {
@@ -52,6 +127,94 @@ RATE_LIMITS = {
     'like': 3600     # 点赞：1小时内同一用户同一作品只能计数一次
 }
 
+# 作品目录缓存全量校验间隔（秒），用于发现绕过API手动修改的配置（未启用目录监视时）
+CATALOG_REFRESH_INTERVAL = 5
+# 监视 works 目录，手动放入/修改/删除的作品由后台线程增量更新，请求不再定期全量扫描：
+#   'auto'     Linux 上使用 inotify，不可用时退回轮询（默认）
+#   'inotify'  只用 inotify（失败时同样退回轮询并记录警告）
+#   'poll'     后台线程定期全量校验
+#   'off'      不监视，由请求按 CATALOG_REFRESH_INTERVAL 定期全量校验
+WORKS_WATCH = 'auto'
+# 连续的文件事件在安静这么久（秒）之后才合并处理，最长不超过 WATCH_MAX_DELAY
+WATCH_DEBOUNCE = 0.2
+WATCH_MAX_DELAY = 2
+# 轮询模式的全量校验间隔（秒）
+WATCH_POLL_INTERVAL = 2
+
+# work_config.json 使用紧凑格式（无缩进）保存，文件更小、写入更快
+WORK_CONFIG_COMPACT = False
+# JSON 序列化（接口响应、作品配置读写）：'auto'（安装了 orjson 时使用）、'orjson' 或 'stdlib'
+JSON_BACKEND = 'auto'
+# 写入 work_config.json 后 fsync，断电时不会留下半个文件
+WORK_CONFIG_FSYNC = True
+
+# 作品配置存储后端：'file'（works/<id>/work_config.json，默认）或 'sqlite'（DATA_DIR/works.db）
+# 切换前先用 works_db_tool.py import 把现有配置导入数据库
+WORK_STORE_BACKEND = 'file'
+
+# 统计字段
+STAT_FIELDS = ['作品下载量', '作品浏览量', '作品点赞量', '作品更新次数']
+
+# 作品文件（图片/视频/下载）发送方式：
+#   'direct'     由 Flask 直接发送（支持 Range/If-Range）
+#   'x-accel'    Flask 只做查找和计数，由 nginx 通过 X-Accel-Redirect 发送文件
+#   'x-sendfile' 由 Apache/lighttpd 通过 X-Sendfile 发送文件
+SEND_FILE_MODE = 'direct'
+# X-Accel-Redirect 模式下 nginx 中指向 works 目录的 internal location
+X_ACCEL_PREFIX = '/_works/'
+# 带版本号（?v=）的图片、视频链接的浏览器缓存时间（秒）
+STATIC_MAX_AGE = 365 * 24 * 3600
+app.config['USE_X_SENDFILE'] = SEND_FILE_MODE == 'x-sendfile'
+
+# 图片缩略图允许的宽度和格式（/api/image/<work_id>/<filename>?w=320&fmt=webp）
+THUMBNAIL_WIDTHS = (160, 320, 640, 1280)
+THUMBNAIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG', 'jpg': 'JPEG', 'png': 'PNG'}
+# 上传封面时预先生成的缩略图 (宽度, 格式)，设为 None 则不预生成
+COVER_THUMBNAIL = (640, 'webp')
+
+# JSON 响应缓存最大条数（按请求路径+查询参数区分）
+RESPONSE_CACHE_MAX_ENTRIES = 256
+
+# JSON 响应压缩：小于该大小（字节）的响应不压缩
+COMPRESS_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# 运行时数据目录（统计日志、防刷数据库等，环境变量 SMY_DATA_DIR）
+DATA_DIR = os.environ.get('SMY_DATA_DIR') or os.path.join(BASE_DIR, 'data')
+WORKS_DB_PATH = os.path.join(DATA_DIR, 'works.db')
+
+# 浏览/下载/点赞计数写回配置文件的间隔（秒），也是列表/详情接口中计数的最大滞后时间
+STATS_FLUSH_INTERVAL = 10
+
+# 统计时间序列：事件日志及按分钟/小时/天汇总的环形数组保存在 DATA_DIR/stats.db
+# {粒度: (每格秒数, 格数)}，格数决定该粒度可查询的最长范围
+STATS_ROLLUPS = {
+    'minute': (60, 120),        # 最近 2 小时
+    'hour': (3600, 24 * 14),    # 最近 14 天
+    'day': (86400, 400)         # 最近 400 天
+}
+# 原始事件保留时间（秒），汇总数据不受影响
+STATS_EVENT_RETENTION = 90 * 24 * 3600
+# 热度排序（sort=trending）：最近 TRENDING_WINDOW_HOURS 小时内各类计数的加权和，
+# 按 TRENDING_HALF_LIFE_HOURS 小时半衰，结果缓存 TRENDING_CACHE_TTL 秒
+TRENDING_WEIGHTS = {'作品浏览量': 1, '作品下载量': 5, '作品点赞量': 3}
+TRENDING_WINDOW_HOURS = 7 * 24
+TRENDING_HALF_LIFE_HOURS = 48
+TRENDING_CACHE_TTL = 60
+
+# 后台任务（删除作品、完成上传、生成缩略图、打包）线程数和任务记录保留时间（秒）
+JOB_WORKERS = 2
+JOB_RETENTION = 7 * 24 * 3600
+# 删除作品时先把目录改名到这里（瞬间完成），再由后台任务删除
+TRASH_SUBDIR = '.trash'
+# 已经压缩过的文件类型，打包时直接存储不再压缩
+STORED_EXTENSIONS = {'zip', 'rar', '7z', 'gz', 'apk', 'exe', 'dmg', 'mp4', 'avi', 'mov',
+                     'png', 'jpg', 'jpeg', 'gif', 'webp'}
+
+# 是否提供 /metrics（Prometheus 文本格式）并统计每个请求的耗时和响应大小
+METRICS_ENABLED = True
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -106,69 +269,426 @@ def verify_admin_token():
     token = request.args.get('token') or request.headers.get('Authorization')
     return token == ADMIN_TOKEN
 
+TRUSTED_PROXY_NETWORKS = tuple(ipaddress.ip_network(value, strict=False) for value in TRUSTED_PROXIES)
+REAL_IP_ENVIRON = 'HTTP_' + REAL_IP_HEADER.upper().replace('-', '_')
+
+@functools.lru_cache(maxsize=4096)
+def is_trusted_proxy(address):
+    """address 是否属于 TRUSTED_PROXIES（无法解析的地址不可信）"""
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return any(ip in network for network in TRUSTED_PROXY_NETWORKS)
+
+def resolve_client_ip(environ):
+    """按 nginx real_ip 模块（real_ip_recursive on）的规则确定客户端 IP"""
+    address = environ.get('REMOTE_ADDR', '')
+    if not TRUSTED_PROXY_NETWORKS or not is_trusted_proxy(address):
+        return address
+    header = environ.get(REAL_IP_ENVIRON)
+    if not header:
+        return address
+    # 最右边的地址由离我们最近的代理添加；全部可信时与 nginx 一样取最左边的地址
+    for candidate in reversed(header.split(',')):
+        candidate = candidate.strip()
+        if not candidate:
+            continue
+        address = candidate
+        if not is_trusted_proxy(candidate):
+            break
+    return address
+
+@functools.lru_cache(maxsize=None)
+def fingerprint_key():
+    """
+    用户指纹的哈希密钥，首次使用时随机生成并保存到 DATA_DIR/fingerprint.key，
+    多个 worker 进程和重启后保持一致，防刷记录中也无法反推出 IP
+    """
+    path = os.path.join(DATA_DIR, 'fingerprint.key')
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(os.urandom(32))
+        try:
+            # 多个进程同时生成时以先完成的为准
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_path)
+    with open(path, 'rb') as f:
+        return f.read()
+
 def get_user_fingerprint():
-    """生成用户指纹，用于防刷"""
-    # 使用IP地址和User-Agent生成指纹
-    ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR', ''))
-    user_agent = request.headers.get('User-Agent', '')
-    fingerprint_string = f"{ip}:{user_agent}"
-    return hashlib.md5(fingerprint_string.encode()).hexdigest()
+    """用户指纹（客户端 IP + User-Agent 的8字节带密钥哈希），用于防刷，每个请求只计算一次"""
+    fingerprint = g.get('user_fingerprint')
+    if fingerprint is None:
+        environ = request.environ
+        data = f"{resolve_client_ip(environ)}\n{environ.get('HTTP_USER_AGENT', '')}"
+        fingerprint = hashlib.blake2b(data.encode('utf-8'), key=fingerprint_key(), digest_size=8).digest()
+        g.user_fingerprint = fingerprint
+    return fingerprint
+
+#==============================JSON 序列化===============================
+class StdlibJSONProvider(DefaultJSONProvider):
+    """标准库 json：中文直接输出 UTF-8（不转义为 \\uXXXX），不排序键，紧凑格式"""
+    ensure_ascii = False
+    sort_keys = False
+    compact = True
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('separators', (',', ':'))
+        return super().dumps(obj, **kwargs)
+
+    def dumps_bytes(self, obj):
+        return self.dumps(obj).encode('utf-8')
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    orjson：输出即为 UTF-8 字节，序列化和解析都比标准库快数倍
+    以标准库的输出为准，orjson 只在以下几处不同：浮点数的指数写法（1e20 / 1e+20、1.5e-7 / 1.5e-07，
+    数值相同）；NaN 和 Infinity 写成 null（标准库写成非标准的 NaN）；超出 64 位的整数交给标准库序列化，
+    但解析时会变成浮点数
+    """
+    mimetype = 'application/json'
+    # 日期交给 Flask 的默认处理（HTTP 日期格式），与标准库输出一致；int 等非字符串键转为字符串
+    OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def dumps_bytes(self, obj):
+        try:
+            return orjson.dumps(obj, default=DefaultJSONProvider.default, option=self.OPTIONS)
+        except orjson.JSONEncodeError:
+            return json.dumps(obj, ensure_ascii=False, separators=(',', ':'),
+                              default=DefaultJSONProvider.default).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # orjson 不支持的参数（indent、sort_keys 等）交给标准库
+            kwargs.setdefault('ensure_ascii', False)
+            kwargs.setdefault('default', DefaultJSONProvider.default)
+            return json.dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def create_json_provider(flask_app):
+    """按 JSON_BACKEND 选择 JSON provider"""
+    if JSON_BACKEND == 'orjson' and orjson is None:
+        logger.warning("未安装 orjson，JSON 序列化改用标准库")
+    if JSON_BACKEND != 'stdlib' and orjson is not None:
+        return OrjsonProvider(flask_app)
+    return StdlibJSONProvider(flask_app)
+
+app.json = create_json_provider(app)
+
+def dump_config_json(config, compact=False):
+    """
+    序列化作品配置，返回 UTF-8 字节
+    以标准库 json.dumps(indent=2) 为准；使用 orjson 时缩进、分隔符和中文的写法都相同，
+    浮点数的写法可能不同（见 OrjsonProvider），超出 64 位的整数等 orjson 不支持的内容改用标准库
+    """
+    if isinstance(app.json, OrjsonProvider):
+        try:
+            return orjson.dumps(config, option=0 if compact else orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError:
+            pass
+    if compact:
+        return json.dumps(config, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return json.dumps(config, ensure_ascii=False, indent=2).encode('utf-8')
+
+def load_json(data):
+    """解析 JSON（str 或 UTF-8 字节）"""
+    return app.json.loads(data)
+
+#==============================监控指标===============================
+# 耗时直方图分桶（秒）和大小直方图分桶（字节）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))  # 256B ~ 64MB
+THROUGHPUT_BUCKETS = tuple(1024 * 1024 * 2 ** i for i in range(10))  # 1MB/s ~ 512MB/s
+
+class Metrics:
+    """
+    进程内的 Prometheus 指标：计数器、直方图，以及抓取时才计算的仪表
+    多个 worker 进程时各自统计，/metrics 返回的是处理该请求的进程的数据（指标带 pid 标签）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}        # {name: (类型, 说明, 分桶)}
+        self._counters = {}    # {(name, labels): value}
+        self._histograms = {}  # {(name, labels): [各桶计数..., 总和, 总数]}
+        self._gauges = {}      # {name: callback}
+
+    def counter(self, name, help_text):
+        self._meta[name] = ('counter', help_text, None)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self._meta[name] = ('histogram', help_text, buckets)
+
+    def gauge(self, name, help_text, callback):
+        """callback() 返回数值，或 [(标签字典, 数值)]"""
+        self._meta[name] = ('gauge', help_text, None)
+        self._gauges[name] = callback
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        buckets = self._meta[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            data = self._histograms.get(key)
+            if data is None:
+                data = self._histograms[key] = [0] * (len(buckets) + 3)
+            data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ''
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+        return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+    def render(self):
+        """生成 Prometheus 文本格式"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(data) for key, data in self._histograms.items()}
+        pid = (('pid', str(os.getpid())),)
+        lines = []
+        for name, (kind, help_text, buckets) in self._meta.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in counters.items():
+                    if metric == name:
+                        lines.append(f'{name}{self._labels(labels + pid)} {value}')
+            elif kind == 'histogram':
+                for (metric, labels), data in histograms.items():
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), data):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{self._labels(labels + pid + (("le", str(bound)),))} {cumulative}')
+                    lines.append(f'{name}_sum{self._labels(labels + pid)} {data[-2]}')
+                    lines.append(f'{name}_count{self._labels(labels + pid)} {data[-1]}')
+            else:
+                try:
+                    value = self._gauges[name]()
+                except Exception as e:
+                    logger.warning(f"采集指标 {name} 失败: {e}")
+                    continue
+                if isinstance(value, list):
+                    for labels, v in value:
+                        lines.append(f'{name}{self._labels(tuple(sorted(labels.items())) + pid)} {v}')
+                else:
+                    lines.append(f'{name}{self._labels(pid)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+metrics.counter('smy_http_requests_total', '请求数（按路由、方法、状态码）')
+metrics.histogram('smy_http_request_duration_seconds', '请求处理耗时（文件下载只计到开始发送）')
+metrics.histogram('smy_http_response_size_bytes', '响应大小', SIZE_BUCKETS)
+metrics.histogram('smy_function_duration_seconds', '内部函数耗时')
+metrics.histogram('smy_json_encode_seconds', 'JSON 响应序列化耗时')
+metrics.counter('smy_cache_requests_total', '缓存查询次数（按缓存名称和是否命中）')
+metrics.counter('smy_upload_bytes_total', '上传写盘字节数')
+metrics.counter('smy_upload_seconds_total', '上传写盘耗时（含接收请求体）')
+metrics.histogram('smy_upload_throughput_bytes_per_second', '单次上传（或分块）的写盘速度', THROUGHPUT_BUCKETS)
+
+def timed(name):
+    """装饰器：把函数耗时记入 smy_function_duration_seconds{function=name}"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.observe('smy_function_duration_seconds', time.perf_counter() - start, function=name)
+        return wrapper
+    return decorator
+
+def record_cache(cache, hit):
+    metrics.inc('smy_cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+def record_upload(mode, size, seconds):
+    metrics.inc('smy_upload_bytes_total', size, mode=mode)
+    metrics.inc('smy_upload_seconds_total', seconds, mode=mode)
+    if seconds > 0 and size > 0:
+        metrics.observe('smy_upload_throughput_bytes_per_second', size / seconds, mode=mode)
+
+
+#==============================防刷记录存储===============================
+def rate_limit_key(fingerprint, action_type, work_id):
+    """把 (用户指纹, 操作类型, 作品ID) 压缩成8字节的键"""
+    return hashlib.blake2b(fingerprint + f"{action_type}:{work_id}".encode('utf-8'), digest_size=8).digest()
+
+class MemoryRateLimitStore:
+    """
+    进程内防刷存储：{键: 过期时间}
+    记录过期后自动失效，条数超过上限时淘汰最久未更新的记录
+    """
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self, max_entries=RATE_LIMIT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._ops = 0
+
+    def hit(self, key, ttl, now=None):
+        """键未记录或已过期时记录本次操作并返回 True，否则返回 False"""
+        now = time.time() if now is None else now
+        with self._lock:
+            expires = self._entries.get(key)
+            if expires is not None and expires > now:
+                return False
+            self._entries[key] = now + ttl
+            self._entries.move_to_end(key)
+            self._ops += 1
+            if self._ops % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def _sweep(self, now):
+        expired = [key for key, expires in self._entries.items() if expires <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteRateLimitStore:
+    """
+    基于 SQLite（WAL 模式）的防刷存储，多个 worker 进程共享同一份记录
+    """
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self, db_path, max_entries=RATE_LIMIT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._ops = 0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS rate_limits (key BLOB PRIMARY KEY, expires REAL NOT NULL) WITHOUT ROWID')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_rate_limits_expires ON rate_limits (expires)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def hit(self, key, ttl, now=None):
+        """键未记录或已过期时记录本次操作并返回 True，否则返回 False"""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        # 单条语句完成“检查并设置”，多进程并发时也不会重复计数
+        cursor = conn.execute(
+            'INSERT INTO rate_limits (key, expires) VALUES (?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET expires = excluded.expires WHERE rate_limits.expires <= ?',
+            (key, now + ttl, now)
+        )
+        self._ops += 1
+        if self._ops % self.SWEEP_EVERY == 0:
+            self._sweep(conn, now)
+        return cursor.rowcount == 1
+
+    def _sweep(self, conn, now):
+        conn.execute('DELETE FROM rate_limits WHERE expires <= ?', (now,))
+        conn.execute(
+            'DELETE FROM rate_limits WHERE key IN ('
+            'SELECT key FROM rate_limits ORDER BY expires DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def __len__(self):
+        return self._conn().execute('SELECT COUNT(*) FROM rate_limits').fetchone()[0]
+
+
+def create_rate_limit_store(backend=RATE_LIMIT_BACKEND):
+    """根据配置创建防刷存储"""
+    if backend == 'sqlite':
+        return SQLiteRateLimitStore(os.path.join(DATA_DIR, 'rate_limits.db'))
+    if backend == 'memory':
+        return MemoryRateLimitStore()
+    raise ValueError(f"未知的防刷存储后端: {backend}")
+
+
+rate_limit_store = create_rate_limit_store()
 
 def can_perform_action(action_type, work_id):
     """检查用户是否可以执行某个操作（防刷检查）"""
-    fingerprint = get_user_fingerprint()
-    current_time = time.time()
-    
-    # 如果用户从未记录过，允许操作
-    if fingerprint not in user_actions:
-        user_actions[fingerprint] = {}
-    
-    if action_type not in user_actions[fingerprint]:
-        user_actions[fingerprint][action_type] = {}
-    
-    # 检查这个作品的上次操作时间
-    last_action_time = user_actions[fingerprint][action_type].get(work_id, 0)
-    time_diff = current_time - last_action_time
-    
-    # 如果时间间隔足够，允许操作
-    if time_diff >= RATE_LIMITS.get(action_type, 0):
-        user_actions[fingerprint][action_type][work_id] = current_time
-        return True
-    
-    return False
+    key = rate_limit_key(get_user_fingerprint(), action_type, work_id)
+    return rate_limit_store.hit(key, RATE_LIMITS.get(action_type, 0))
 
+@timed('update_work_stats')
 def update_work_stats(work_id, stat_type, increment=1):
-    """更新作品统计数据"""
-    work_dir = os.path.join(WORKS_DIR, work_id)
-    config_path = os.path.join(work_dir, 'work_config.json')
+    """更新作品统计数据（先计入内存，由 stats_counter 批量写回配置文件）"""
+    if stat_type not in STAT_FIELDS or works_catalog.get(work_id) is None:
+        return False
     
-    if not os.path.exists(config_path):
+    try:
+        stats_counter.increment(work_id, stat_type, increment)
+        stats_timeline.record(work_id, stat_type, increment)
+        return True
+    except Exception:
+        logger.exception(f"更新统计数据失败 {work_id}/{stat_type}")
         return False
+
+def write_work_stats(work_id, counts):
+    """
+    把累计的统计增量写入作品配置文件
+    返回 True 表示已写入，None 表示作品已不存在（计数直接丢弃），False 表示写入失败（调用方应保留计数重试）
+    """
+    if not work_config_store.exists(work_id):
+        return None
     
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        # 确保统计字段存在
-        stat_fields = ['作品下载量', '作品浏览量', '作品点赞量', '作品更新次数']
-        for field in stat_fields:
-            if field not in config:
-                config[field] = 0
-        
-        # 更新指定统计数据
-        if stat_type in config:
-            config[stat_type] += increment
-            config['更新时间'] = datetime.now().isoformat()
-            
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+        with work_config_store.update(work_id) as config:
+            # 确保统计字段存在
+            for field in STAT_FIELDS:
+                if field not in config:
+                    config[field] = 0
             
-            return True
-    except Exception as e:
-        print(f"更新统计数据失败: {e}")
+            # 更新指定统计数据
+            for stat_type, increment in counts.items():
+                if stat_type in config:
+                    config[stat_type] += increment
+            config['更新时间'] = datetime.now().isoformat()
+        
+        return True
+    except Exception:
+        logger.exception(f"写回统计数据失败 {work_id}: {counts}")
         return False
-    
-    return False
 
 #加载网站设置
 def load_settings():
@@ -189,205 +709,2540 @@ def load_settings():
             "启用分类": True
         }
 
-#加载单个作品配置
-def load_work_config(work_id):
-    """加载单个作品配置"""
-    work_path = os.path.join(WORKS_DIR, work_id, 'work_config.json')
+def file_version(path):
+    """按文件修改时间和大小生成版本号，文件不存在时返回 None"""
     try:
-        with open(work_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            # 添加下载链接
-            config['下载链接'] = {}
-            if '支持平台' in config and '文件名称' in config:
-                for platform in config['支持平台']:
-                    if platform in config['文件名称']:
-                        files = config['文件名称'][platform]
-                        config['下载链接'][platform] = [
-                            f"/api/download/{work_id}/{platform}/{file}" 
-                            for file in files
-                        ]
-            
-            # 添加图片链接
-            if '作品截图' in config:
-                config['图片链接'] = [
-                    f"/api/image/{work_id}/{img}" 
-                    for img in config['作品截图']
-                ]
-            
-            # 添加视频链接
-            if '作品视频' in config:
-                config['视频链接'] = [
-                    f"/api/video/{work_id}/{video}" 
-                    for video in config['作品视频']
-                ]
-                
-            return config
-    except FileNotFoundError:
+        st = os.stat(path)
+    except OSError:
         return None
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
 
+def versioned_url(url, path):
+    """给静态文件链接加上 ?v=版本号，文件变化后链接随之变化"""
+    version = file_version(path)
+    return f"{url}?v={version}" if version else url
 
-#==============================公开API接口===============================
-#获取所有作品
-def get_all_works():
-    """获取所有作品"""
-    works = []
-    if not os.path.exists(WORKS_DIR):
-        return works
+#读取单个作品配置（直接读存储后端）
+@timed('read_work_config')
+def read_work_config(work_id):
+    """从存储后端读取单个作品配置并生成链接"""
+    config = work_config_store.read(work_id)
+    if config is None:
+        return None
+    # 添加下载链接
+    config['下载链接'] = {}
+    if '支持平台' in config and '文件名称' in config:
+        for platform in config['支持平台']:
+            if platform in config['文件名称']:
+                files = config['文件名称'][platform]
+                config['下载链接'][platform] = [
+                    f"/api/download/{work_id}/{platform}/{file}" 
+                    for file in files
+                ]
     
-    for work_id in os.listdir(WORKS_DIR):
-        work_dir = os.path.join(WORKS_DIR, work_id)
-        if os.path.isdir(work_dir):
-            config = load_work_config(work_id)
-            if config:
-                works.append(config)
+    # 添加图片链接（带版本号，可被浏览器长期缓存）
+    work_dir = os.path.join(WORKS_DIR, work_id)
+    if '作品截图' in config:
+        config['图片链接'] = [
+            versioned_url(f"/api/image/{work_id}/{img}", os.path.join(work_dir, 'image', img))
+            for img in config['作品截图']
+        ]
     
-    # 按更新时间排序
-    works.sort(key=lambda x: x.get('更新时间', ''), reverse=True)
-    return works
+    # 添加视频链接
+    if '作品视频' in config:
+        config['视频链接'] = [
+            versioned_url(f"/api/video/{work_id}/{video}", os.path.join(work_dir, 'video', video))
+            for video in config['作品视频']
+        ]
+        
+    return config
 
-#获取网站设置
-@app.route('/api/settings')
-def get_settings():
-    """获取网站设置"""
-    return jsonify(load_settings())
 
-#获取所有作品列表
-@app.route('/api/works')
-def get_works():
-    """获取所有作品列表"""
-    works = get_all_works()
-    return jsonify({
-        'success': True,
-        'data': works,
-        'total': len(works)
-    })
+def parse_update_time(value):
+    """把配置中的 ISO 时间字符串转换为 UTC 时间（用于 Last-Modified）"""
+    try:
+        return datetime.fromisoformat(value).astimezone(timezone.utc).replace(microsecond=0)
+    except (TypeError, ValueError):
+        return None
 
-#获取单个作品详情
-@app.route('/api/works/<work_id>')
-def get_work_detail(work_id):
-    """获取单个作品详情"""
-    config = load_work_config(work_id)
-    if config:
-        # 增加浏览量（防刷检查）
-        if can_perform_action('view', work_id):
-            update_work_stats(work_id, '作品浏览量')
-            # 重新加载配置获取最新数据
-            config = load_work_config(work_id)
-        
-        return jsonify({
-            'success': True,
-            'data': config
-        })
-    else:
-        return jsonify({
-            'success': False,
-            'message': '作品不存在'
-        }), 404
 
-#提供作品图片
-@app.route('/api/image/<work_id>/<filename>')
-def serve_image(work_id, filename):
-    """提供作品图片"""
-    image_dir = os.path.join(WORKS_DIR, work_id, 'image')
-    if os.path.exists(os.path.join(image_dir, filename)):
-        return send_from_directory(image_dir, filename)
-    return jsonify({'error': '图片不存在'}), 404
+#==============================配置持久化===============================
+class WorkConfigStore:
+    """
+    work_config.json 的唯一写入入口（默认的文件存储后端）
+    每个作品一把锁（线程锁 + fcntl 文件锁，多进程下同样互斥），
+    写入先落到临时文件并 fsync，再原子替换，读者不会看到写了一半的 JSON
 
-#提供作品视频
-@app.route('/api/video/<work_id>/<filename>')
-def serve_video(work_id, filename):
-    """提供作品视频"""
-    video_dir = os.path.join(WORKS_DIR, work_id, 'video')
-    if os.path.exists(os.path.join(video_dir, filename)):
-        return send_from_directory(video_dir, filename)
-    return jsonify({'error': '视频不存在'}), 404
+    存储后端需要提供的接口（WorksCatalog 和各写入路径只依赖这些方法）：
+        exists / read / write / delete / lock / update   读写单个作品配置
+        version_key(work_id)                              配置的版本标识，变化即需重新加载
+        version_keys()                                    {作品ID: 版本标识}，用于全量校验
+        generation()                                      作品增删的整体标识，变化即需全量校验
+        WATCHABLE                                         配置是否保存在 works 目录中（可用 WorksWatcher 监视）
+    """
 
-#提供作品下载
-@app.route('/api/download/<work_id>/<platform>/<filename>')
-def download_file(work_id, platform, filename):
-    """提供作品下载"""
-    platform_dir = os.path.join(WORKS_DIR, work_id, 'platform', platform)
-    if os.path.exists(os.path.join(platform_dir, filename)):
-        # 增加下载量（防刷检查）
-        if can_perform_action('download', work_id):
-            update_work_stats(work_id, '作品下载量')
-        
-        return send_from_directory(platform_dir, filename, as_attachment=True)
-    return jsonify({'error': '文件不存在'}), 404
+    WATCHABLE = True
 
-#搜索作品
-@app.route('/api/search')
-def search_works():
-    """搜索作品"""
-    from flask import request
-    query = request.args.get('q', '').lower()
-    category = request.args.get('category', '')
-    
-    works = get_all_works()
-    
-    if query:
-        filtered_works = []
-        for work in works:
-            # 在作品名称、描述、标签中搜索
-            if (query in work.get('作品作品', '').lower() or
-                query in work.get('作品描述', '').lower() or
-                any(query in tag.lower() for tag in work.get('作品标签', []))):
-                filtered_works.append(work)
-        works = filtered_works
-    
-    if category:
-        works = [work for work in works if work.get('作品分类', '') == category]
-    
-    return jsonify({
-        'success': True,
-        'data': works,
-        'total': len(works)
-    })
+    def __init__(self, works_dir, compact=WORK_CONFIG_COMPACT, fsync=WORK_CONFIG_FSYNC):
+        self.works_dir = works_dir
+        self.compact = compact
+        self.fsync = fsync
+        self._guard = threading.Lock()
+        self._locks = {}  # {work_id: threading.Lock}
 
-#获取所有分类
-@app.route('/api/categories')
-def get_categories():
-    """获取所有分类"""
-    works = get_all_works()
-    categories = list(set(work.get('作品分类', '') for work in works if work.get('作品分类')))
-    return jsonify({
-        'success': True,
-        'data': categories
-    })
+    def path(self, work_id):
+        return os.path.join(self.works_dir, work_id, 'work_config.json')
 
-@app.route('/api/like/<work_id>', methods=['POST'])
-def like_work(work_id):
-    """点赞作品"""
-    # 检查作品是否存在
-    config = load_work_config(work_id)
-    if not config:
-        return jsonify({
-            'success': False,
-            'message': '作品不存在'
-        }), 404
-    
-    # 防刷检查
-    if not can_perform_action('like', work_id):
-        return jsonify({
-            'success': False,
-            'message': '操作太频繁，请稍后再试'
-        }), 429
-    
-    # 增加点赞量
-    if update_work_stats(work_id, '作品点赞量'):
-        # 获取最新的点赞数
-        updated_config = load_work_config(work_id)
-        return jsonify({
-            'success': True,
-            'message': '点赞成功',
-            'likes': updated_config.get('作品点赞量', 0)
-        })
-    else:
-        return jsonify({
-            'success': False,
-            'message': '点赞失败'
-        }), 500
-#==============================公开API接口===============================
+    def exists(self, work_id):
+        return os.path.exists(self.path(work_id))
+
+    @staticmethod
+    def _stat_key(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def version_key(self, work_id):
+        return self._stat_key(self.path(work_id))
+
+    def version_keys(self):
+        keys = {}
+        if os.path.isdir(self.works_dir):
+            for work_id in os.listdir(self.works_dir):
+                if not work_id.startswith('.') and os.path.isdir(os.path.join(self.works_dir, work_id)):
+                    keys[work_id] = self.version_key(work_id)
+        return keys
+
+    def generation(self):
+        # 新建/删除作品目录会改变 works 目录的 mtime
+        return self._stat_key(self.works_dir)
+
+    @contextmanager
+    def lock(self, work_id):
+        """独占某个作品的配置（可跨进程）"""
+        with self._guard:
+            thread_lock = self._locks.setdefault(work_id, threading.Lock())
+        with thread_lock:
+            fd = None
+            if fcntl:
+                try:
+                    fd = os.open(os.path.join(self.works_dir, work_id, '.work_config.lock'),
+                                 os.O_CREAT | os.O_RDWR, 0o644)
+                except OSError:
+                    fd = None  # 作品目录不存在
+            try:
+                if fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                if fd is not None:
+                    os.close(fd)
+
+    def read(self, work_id):
+        """读取原始配置（不含生成的链接），不存在时返回 None"""
+        try:
+            with open(self.path(work_id), 'rb') as f:
+                return load_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    def write(self, work_id, config):
+        """原子写入配置（调用方应持有该作品的锁）"""
+        path = self.path(work_id)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(dump_config_json(config, self.compact))
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except Exception:
+            # 清理临时配置文件
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        works_catalog.invalidate(work_id)
+
+    def delete(self, work_id):
+        """删除配置（作品目录由调用方删除）"""
+        try:
+            os.remove(self.path(work_id))
+        except FileNotFoundError:
+            pass
+        works_catalog.invalidate(work_id)
+
+    @contextmanager
+    def update(self, work_id):
+        """
+        加锁读取配置，with 块正常结束后写回：
+            with work_config_store.update(work_id) as config:
+                config['作品封面'] = ...
+        配置不存在时抛出 FileNotFoundError
+        """
+        with self.lock(work_id):
+            config = self.read(work_id)
+            if config is None:
+                raise FileNotFoundError(self.path(work_id))
+            yield config
+            self.write(work_id, config)
+
+
+class SQLiteWorkConfigStore(WorkConfigStore):
+    """
+    基于 SQLite（WAL 模式）的作品配置存储，作品数量很多或需要在数据库中统计查询时使用
+    完整配置以 JSON 保存在 config 列，分类、更新时间和统计字段单独成列并建索引，
+    标题/描述/标签同步到 FTS5 全文索引；图片、视频和安装包仍保存在 works 目录下
+    可用 works_db_tool.py 在 works 目录和数据库之间导入导出
+    接口的搜索、排序和分类筛选与文件后端一样由作品目录缓存及其索引完成（结果与文件后端一致，且不查询数据库），
+    索引列和全文索引只供 works_db_tool.py 和直接用 SQL 查询统计使用
+    """
+
+    # 配置不在文件系统中，改动都经过数据库，generation/revision 已能及时发现
+    WATCHABLE = False
+
+    # 单独成列（并建索引）的配置字段
+    COLUMNS = {
+        'category': '作品分类',
+        'updated_at': '更新时间',
+        'downloads': '作品下载量',
+        'views': '作品浏览量',
+        'likes': '作品点赞量',
+        'update_count': '作品更新次数',
+    }
+
+    def __init__(self, db_path, works_dir, compact=WORK_CONFIG_COMPACT, fsync=WORK_CONFIG_FSYNC):
+        super().__init__(works_dir, compact=compact, fsync=fsync)
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=' + ('FULL' if self.fsync else 'NORMAL'))
+            self._create_schema(conn)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.depth = 0
+        return conn
+
+    def _create_schema(self, conn):
+        columns = ''.join(
+            f', {column} {"TEXT" if column in ("category", "updated_at") else "INTEGER"}'
+            for column in self.COLUMNS
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS works (work_id TEXT PRIMARY KEY, config TEXT NOT NULL, '
+            f'revision INTEGER NOT NULL DEFAULT 0{columns})'
+        )
+        for column in self.COLUMNS:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_works_{column} ON works ({column})')
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+        try:
+            # trigram 分词对中文按三字切分，不需要额外的分词扩展
+            conn.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS works_fts USING fts5('
+                "work_id UNINDEXED, title, description, tags, tokenize='trigram')"
+            )
+        except sqlite3.OperationalError:
+            # SQLite < 3.34 没有 trigram 分词器
+            conn.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS works_fts USING fts5('
+                'work_id UNINDEXED, title, description, tags)'
+            )
+
+    def exists(self, work_id):
+        row = self._conn().execute('SELECT 1 FROM works WHERE work_id = ?', (work_id,)).fetchone()
+        return row is not None
+
+    def version_key(self, work_id):
+        row = self._conn().execute('SELECT revision FROM works WHERE work_id = ?', (work_id,)).fetchone()
+        return row[0] if row else None
+
+    def version_keys(self):
+        return dict(self._conn().execute('SELECT work_id, revision FROM works'))
+
+    def generation(self):
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    @contextmanager
+    def lock(self, work_id):
+        """在 BEGIN IMMEDIATE 事务中独占写入（可跨进程），with 块正常结束时提交"""
+        with self._guard:
+            thread_lock = self._locks.setdefault(work_id, threading.Lock())
+        with thread_lock:
+            with self.transaction():
+                yield
+
+    @contextmanager
+    def transaction(self):
+        """写事务，可嵌套（只有最外层提交），用于批量导入"""
+        conn = self._conn()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+        finally:
+            self._local.depth = 0
+
+    def read(self, work_id):
+        row = self._conn().execute('SELECT config FROM works WHERE work_id = ?', (work_id,)).fetchone()
+        return load_json(row[0]) if row else None
+
+    def write(self, work_id, config):
+        """写入配置并同步索引列和全文索引"""
+        data = dump_config_json(config, self.compact).decode('utf-8')
+        values = [config.get(field) for field in self.COLUMNS.values()]
+        columns = ', '.join(self.COLUMNS)
+        placeholders = ', '.join('?' * len(self.COLUMNS))
+        updates = ', '.join(f'{column} = excluded.{column}' for column in self.COLUMNS)
+        with self.transaction() as conn:
+            conn.execute(
+                f'INSERT INTO works (work_id, config, revision, {columns}) VALUES (?, ?, 1, {placeholders}) '
+                f'ON CONFLICT(work_id) DO UPDATE SET config = excluded.config, '
+                f'revision = works.revision + 1, {updates}',
+                [work_id, data] + values
+            )
+            conn.execute('DELETE FROM works_fts WHERE work_id = ?', (work_id,))
+            conn.execute(
+                'INSERT INTO works_fts (work_id, title, description, tags) VALUES (?, ?, ?, ?)',
+                (work_id, config.get('作品作品', ''), config.get('作品描述', ''),
+                 ' '.join(config.get('作品标签', [])))
+            )
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+        works_catalog.invalidate(work_id)
+
+    def delete(self, work_id):
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM works WHERE work_id = ?', (work_id,))
+            conn.execute('DELETE FROM works_fts WHERE work_id = ?', (work_id,))
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+        works_catalog.invalidate(work_id)
+
+    def search(self, query, limit=100):
+        """全文检索，返回按相关度排序的作品ID（供 works_db_tool.py search 使用，/api/search 使用 SearchIndex）"""
+        conn = self._conn()
+        if len(query) < 3:
+            # trigram 索引无法匹配不足三个字的词，退回逐行 LIKE
+            pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            rows = conn.execute(
+                "SELECT work_id FROM works_fts WHERE title LIKE ?1 ESCAPE '\\' "
+                "OR description LIKE ?1 ESCAPE '\\' OR tags LIKE ?1 ESCAPE '\\' LIMIT ?2",
+                (pattern, limit)
+            )
+        else:
+            # 按短语匹配，避免查询中的引号、运算符被当作 FTS 语法
+            phrase = '"' + query.replace('"', '""') + '"'
+            rows = conn.execute(
+                'SELECT work_id FROM works_fts WHERE works_fts MATCH ? ORDER BY rank LIMIT ?',
+                (phrase, limit)
+            )
+        return [row[0] for row in rows]
+
+    def sorted_ids(self, column='updated_at', category=None, limit=None):
+        """按索引列倒序返回作品ID（离线查询用，列表接口的排序使用作品目录缓存）"""
+        if column not in self.COLUMNS:
+            raise ValueError(f"未知的排序字段: {column}")
+        sql = 'SELECT work_id FROM works'
+        params = []
+        if category is not None:
+            sql += ' WHERE category = ?'
+            params.append(category)
+        sql += f' ORDER BY {column} DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [row[0] for row in self._conn().execute(sql, params)]
+
+
+def create_work_config_store(backend=WORK_STORE_BACKEND):
+    """根据配置创建作品配置存储"""
+    if backend == 'sqlite':
+        return SQLiteWorkConfigStore(WORKS_DB_PATH, WORKS_DIR)
+    if backend == 'file':
+        return WorkConfigStore(WORKS_DIR)
+    raise ValueError(f"未知的作品配置存储后端: {backend}")
+
+
+work_config_store = create_work_config_store()
+
+
+#==============================作品目录缓存===============================
+class WorksCatalog:
+    """
+    进程内作品目录缓存
+    只在首次访问时全量加载，之后仅重新解析版本标识（文件后端为 mtime 和 size，
+    SQLite 后端为行版本号）发生变化的配置；管理员写操作通过 invalidate() 显式标记失效
+    由 WorksWatcher 监视时（watched 为真）不再定期全量校验，也不在每次 get() 时检查版本标识，
+    手动修改的配置由监视线程调用 invalidate() 标记
+    """
+
+    def __init__(self, store, refresh_interval=CATALOG_REFRESH_INTERVAL):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self.changed_at = time.time()  # version 最近一次变化的时间
+        self._lock = threading.RLock()
+        self._entries = {}  # {work_id: (版本标识, config)}
+        self._dirty = set()
+        self._sorted = {}  # {排序字段: 排好序的作品列表}
+        self._loaded = False
+        self._generation = None
+        self._last_scan = 0.0
+        self._full_scan = False
+        self._listeners = []
+        self.watched = False
+
+    def add_listener(self, callback):
+        """注册作品变更回调 callback(work_id, config)，作品被删除时 config 为 None"""
+        with self._lock:
+            self._listeners.append(callback)
+            for work_id, entry in self._entries.items():
+                callback(work_id, entry[1])
+
+    def _set_entry(self, work_id, stat_key, config):
+        self._entries[work_id] = (stat_key, config)
+        for callback in self._listeners:
+            callback(work_id, config)
+
+    def _remove_entry(self, work_id):
+        if self._entries.pop(work_id, None) is None:
+            return False
+        for callback in self._listeners:
+            callback(work_id, None)
+        return True
+
+    @property
+    def works_dir(self):
+        return self.store.works_dir
+
+    def _refresh_entry(self, work_id, stat_key=None):
+        """按需重新加载单个作品，返回是否发生变化"""
+        if stat_key is None:
+            stat_key = self.store.version_key(work_id)
+        entry = self._entries.get(work_id)
+        if stat_key is None:
+            return self._remove_entry(work_id)
+        if entry is not None and entry[0] == stat_key:
+            return False
+        try:
+            config = read_work_config(work_id)
+        except (ValueError, OSError) as e:
+            # 配置文件损坏或正在被写入，保留旧数据
+            logger.warning(f"加载作品配置失败 {work_id}: {e}")
+            return False
+        if config is None:
+            return self._remove_entry(work_id)
+        self._set_entry(work_id, stat_key, config)
+        return True
+
+    @timed('catalog_scan')
+    def _scan(self):
+        """扫描全部作品，只重新解析有变化的配置"""
+        changed = False
+        keys = self.store.version_keys()
+        for work_id, stat_key in keys.items():
+            if stat_key is not None:
+                changed |= self._refresh_entry(work_id, stat_key)
+        for work_id in list(self._entries):
+            if keys.get(work_id) is None:
+                changed |= self._remove_entry(work_id)
+        self._dirty.clear()
+        self._loaded = True
+        self._full_scan = False
+        self._last_scan = time.monotonic()
+        return changed
+
+    def _ensure_fresh(self):
+        generation = self.store.generation()
+        interval_passed = (not self.watched
+                           and time.monotonic() - self._last_scan >= self.refresh_interval)
+        if not self._loaded or generation != self._generation or self._full_scan or interval_passed:
+            self._generation = generation
+            changed = self._scan()
+        else:
+            changed = False
+            for work_id in self._dirty:
+                changed |= self._refresh_entry(work_id)
+            self._dirty.clear()
+        if changed:
+            self._bump()
+
+    def _bump(self):
+        self._sorted = {}
+        self.version += 1
+        self.changed_at = time.time()
+
+    def refresh(self):
+        """确保缓存与存储后端一致"""
+        with self._lock:
+            self._ensure_fresh()
+
+    def invalidate(self, work_id=None):
+        """标记作品缓存失效，work_id 为空时下次访问全量重新扫描"""
+        with self._lock:
+            if work_id is None:
+                self._full_scan = True
+            else:
+                self._dirty.add(work_id)
+
+    def get(self, work_id):
+        """获取单个作品配置"""
+        with self._lock:
+            if not self._loaded:
+                self._ensure_fresh()
+            if not self.watched or work_id in self._dirty:
+                self._dirty.discard(work_id)
+                if self._refresh_entry(work_id):
+                    self._bump()
+            entry = self._entries.get(work_id)
+            return entry[1] if entry else None
+
+    def sorted_view(self, sort_field='更新时间'):
+        """
+        获取按指定字段倒序排列的全部作品
+        排序结果按字段缓存到下次变更为止，调用方不能修改返回的列表
+        """
+        with self._lock:
+            self._ensure_fresh()
+            view = self._sorted.get(sort_field)
+            if view is None:
+                default = '' if sort_field == '更新时间' else 0
+                view = sorted(
+                    (entry[1] for entry in self._entries.values()),
+                    key=lambda x: x.get(sort_field, default),
+                    reverse=True
+                )
+                self._sorted[sort_field] = view
+            return view
+
+    def __len__(self):
+        return len(self._entries)
+
+    def all(self):
+        """获取按更新时间倒序排列的全部作品"""
+        return list(self.sorted_view())
+
+    def last_modified(self):
+        """
+        作品目录最近一次变化的时间（Last-Modified 的依据）
+        删除作品不会产生更新的“更新时间”，因此不使用作品中最新的更新时间
+        """
+        with self._lock:
+            self._ensure_fresh()
+            return datetime.fromtimestamp(int(self.changed_at), timezone.utc)
+
+
+works_catalog = WorksCatalog(work_config_store)
+
+
+#==============================搜索索引===============================
+class SearchIndex:
+    """
+    作品搜索倒排索引
+    对作品名称、描述、标签按字符 1-gram/2-gram 建索引（中文无需分词），
+    随作品目录缓存的变更增量更新；分类/标签/平台筛选由 FacetIndex 负责
+    """
+
+    # 命中字段的权重
+    FIELD_WEIGHTS = (('作品作品', 3.0), ('作品标签', 2.0), ('作品描述', 1.0))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = {}        # {work_id: config}
+        self._doc_grams = {}   # {work_id: set(gram)}
+        self._postings = {}    # {gram: set(work_id)}
+
+    @staticmethod
+    def _grams(text):
+        grams = set(text)
+        grams.update(text[i:i + 2] for i in range(len(text) - 1))
+        return grams
+
+    @staticmethod
+    def _query_grams(query):
+        if len(query) == 1:
+            return {query}
+        return {query[i:i + 2] for i in range(len(query) - 1)}
+
+    @staticmethod
+    def _discard(index, key, work_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(work_id)
+            if not ids:
+                del index[key]
+
+    def _remove(self, work_id):
+        if self._docs.pop(work_id, None) is None:
+            return
+        for gram in self._doc_grams.pop(work_id, ()):
+            self._discard(self._postings, gram, work_id)
+
+    def update(self, work_id, config):
+        """新增、更新或删除（config 为 None）一个作品的索引"""
+        with self._lock:
+            self._remove(work_id)
+            if config is None:
+                return
+            grams = self._grams(config.get('作品作品', '').lower())
+            grams |= self._grams(config.get('作品描述', '').lower())
+            for tag in config.get('作品标签', []):
+                grams |= self._grams(tag.lower())
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(work_id)
+            self._doc_grams[work_id] = grams
+            self._docs[work_id] = config
+
+    def _score(self, config, query):
+        """按命中字段计算相关度，未真正包含查询串时返回 0"""
+        score = 0.0
+        for field, weight in self.FIELD_WEIGHTS:
+            if field == '作品标签':
+                tags = [tag.lower() for tag in config.get(field, [])]
+                if query in tags:
+                    score += weight * 2
+                elif any(query in tag for tag in tags):
+                    score += weight
+            else:
+                text = config.get(field, '').lower()
+                if text == query:
+                    score += weight * 2
+                elif text.startswith(query):
+                    score += weight * 1.5
+                elif query in text:
+                    score += weight
+        return score
+
+    def search(self, query='', candidates=None):
+        """
+        返回按相关度（其次按更新时间）排序的作品列表
+        candidates 为分面筛选得到的作品ID集合，None 表示不限
+        """
+        query = query.strip().lower()
+        with self._lock:
+            if candidates is not None:
+                candidates = {work_id for work_id in candidates if work_id in self._docs}
+            if query:
+                for gram in sorted(self._query_grams(query), key=lambda g: len(self._postings.get(g, ()))):
+                    ids = self._postings.get(gram)
+                    if not ids:
+                        return []
+                    candidates = set(ids) if candidates is None else candidates & ids
+                    if not candidates:
+                        return []
+            if candidates is None:
+                candidates = self._docs.keys()
+            docs = [self._docs[work_id] for work_id in candidates]
+        if not query:
+            docs.sort(key=lambda x: x.get('更新时间', ''), reverse=True)
+            return docs
+        # 2-gram 只用于筛选候选，再对候选做精确的子串校验和打分
+        scored = [(self._score(config, query), config) for config in docs]
+        scored = [item for item in scored if item[0] > 0]
+        scored.sort(key=lambda item: (item[0], item[1].get('更新时间', '')), reverse=True)
+        return [config for _, config in scored]
+
+
+search_index = SearchIndex()
+works_catalog.add_listener(search_index.update)
+
+
+#==============================分类/标签分面===============================
+class FacetIndex:
+    """
+    分类、标签、平台的分面索引：{分面: {取值: set(作品ID)}}
+    随作品目录缓存的变更增量维护，计数即集合大小，多条件筛选用集合运算
+    """
+
+    # 分面名称与配置字段
+    FIELDS = {'category': '作品分类', 'tag': '作品标签', 'platform': '支持平台'}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = {facet: {} for facet in self.FIELDS}  # {分面: {取值: set(work_id)}}
+        self._docs = {}  # {work_id: {分面: 取值集合}}
+
+    @classmethod
+    def _values(cls, config):
+        values = {}
+        for facet, field in cls.FIELDS.items():
+            value = config.get(field)
+            if isinstance(value, list):
+                values[facet] = {item for item in value if item}
+            else:
+                values[facet] = {value} if value else set()
+        return values
+
+    def update(self, work_id, config):
+        """新增、更新或删除（config 为 None）一个作品的分面"""
+        with self._lock:
+            for facet, values in self._docs.pop(work_id, {}).items():
+                index = self._index[facet]
+                for value in values:
+                    ids = index.get(value)
+                    if ids is not None:
+                        ids.discard(work_id)
+                        if not ids:
+                            del index[value]
+            if config is None:
+                return
+            values = self._values(config)
+            for facet, facet_values in values.items():
+                for value in facet_values:
+                    self._index[facet].setdefault(value, set()).add(work_id)
+            self._docs[work_id] = values
+
+    def counts(self, facet):
+        """返回 [(取值, 作品数)]，按作品数倒序、取值正序排列"""
+        with self._lock:
+            items = [(value, len(ids)) for value, ids in self._index[facet].items()]
+        items.sort(key=lambda item: (-item[1], item[0]))
+        return items
+
+    def filter(self, **conditions):
+        """
+        按分面筛选作品ID，例如 filter(category=['游戏'], tag=['AI', '工具'])
+        同一分面的多个取值按“或”求并集，不同分面之间按“且”求交集；没有任何条件时返回 None
+        """
+        with self._lock:
+            groups = []
+            for facet, values in conditions.items():
+                if values:
+                    index = self._index[facet]
+                    groups.append(set().union(*(index.get(value, ()) for value in values)))
+            if not groups:
+                return None
+            groups.sort(key=len)  # 从最小的集合开始求交集
+            result = groups[0]
+            for ids in groups[1:]:
+                if not result:
+                    break
+                result &= ids
+            return result
+
+
+facet_index = FacetIndex()
+works_catalog.add_listener(facet_index.update)
+
+def facet_response(facet):
+    """生成分面接口的响应：data 为按作品数排好序的取值，counts 附带作品数"""
+    counts = facet_index.counts(facet)
+    return {
+        'success': True,
+        'data': [value for value, _ in counts],
+        'counts': [{'name': value, 'count': count} for value, count in counts]
+    }
+
+
+#==============================作品公开数据===============================
+# 只供管理后台使用、不在公开接口中返回的配置字段
+INTERNAL_FIELDS = ('原始文件名', '文件信息')
+
+@dataclass(frozen=True, slots=True)
+class PublicWork:
+    """
+    作品的公开表示：去掉内部字段、带好链接，并预先序列化为 JSON
+    配置变化时生成一次，列表和详情接口直接拼接 body；计数变化时只重新序列化末尾的统计字段
+    只保存序列化结果和统计值，排序、筛选和字段裁剪使用作品目录缓存中的配置
+    """
+    work_id: str
+    stats: tuple       # 按 STAT_FIELDS 顺序的统计值
+    body: bytes        # 完整的 JSON
+    stats_offset: int  # body 中统计字段开始的位置
+
+    @classmethod
+    def build(cls, config):
+        data = {key: value for key, value in config.items()
+                if key not in INTERNAL_FIELDS and key not in STAT_FIELDS}
+        stats = tuple(config.get(field, 0) for field in STAT_FIELDS)
+        prefix = app.json.dumps_bytes(data)[:-1]
+        return cls(config.get('作品ID'), stats, prefix + _encode_stats(stats, len(prefix) > 1), len(prefix))
+
+    def with_stats(self, config):
+        """使用 config 中（已合并实时计数）的统计值，相同时返回自身"""
+        stats = tuple(config.get(field, 0) for field in STAT_FIELDS)
+        if stats == self.stats:
+            return self
+        body = self.body[:self.stats_offset] + _encode_stats(stats, self.stats_offset > 1)
+        return replace(self, stats=stats, body=body)
+
+
+def _encode_stats(stats, comma):
+    """序列化统计字段并补上结尾的 '}'，comma 表示前面已有其他字段"""
+    parts = []
+    for key, value in zip(_stat_keys(app.json), stats):
+        parts.append(key + (str(value).encode() if type(value) is int else app.json.dumps_bytes(value)))
+    return (b',' if comma and parts else b'') + b','.join(parts) + b'}'
+
+
+@functools.lru_cache(maxsize=None)
+def _stat_keys(provider):
+    # 统计字段名序列化后的 JSON 键（按 JSON provider 缓存）
+    return tuple(provider.dumps_bytes(field) + b':' for field in STAT_FIELDS)
+
+
+class PublicWorks:
+    """作品公开表示的缓存，随作品目录缓存的变更回调更新"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = {}  # {work_id: (生成时使用的配置, PublicWork)}
+
+    def update(self, work_id, config):
+        """作品目录缓存的变更回调"""
+        record = PublicWork.build(config) if config is not None else None
+        with self._lock:
+            if record is None:
+                self._records.pop(work_id, None)
+            else:
+                self._records[work_id] = (config, record)
+
+    def view(self, config):
+        """config（已合并实时计数）对应的公开表示"""
+        entry = self._records.get(config.get('作品ID'))
+        if entry is None:
+            # 不在作品目录缓存中（例如刚被删除），临时生成
+            return PublicWork.build(config)
+        source, record = entry
+        # 没有未落盘计数的作品直接使用缓存中的配置对象，不必比较统计值
+        return record if source is config else record.with_stats(config)
+
+    def view_all(self, works):
+        return [self.view(work) for work in works]
+
+
+public_works = PublicWorks()
+works_catalog.add_listener(public_works.update)
+
+def encode_json(payload):
+    """序列化接口响应，data 中的 PublicWork 直接使用预先序列化好的片段"""
+    data = payload.get('data')
+    if isinstance(data, PublicWork):
+        encoded = data.body
+    elif isinstance(data, list) and data and isinstance(data[0], PublicWork):
+        encoded = b'[' + b','.join(work.body for work in data) + b']'
+    else:
+        return app.json.dumps_bytes(payload)
+    rest = app.json.dumps_bytes({key: value for key, value in payload.items() if key != 'data'})
+    return rest[:-1] + (b',' if len(rest) > 2 else b'') + b'"data":' + encoded + b'}'
+
+def json_response(payload, status=200):
+    """与 jsonify 相同，但支持 PublicWork"""
+    return app.response_class(encode_json(payload), status=status, mimetype='application/json')
+
+
+#==============================作品目录监视===============================
+# inotify 事件（见 inotify(7)）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class WorksWatcher:
+    """
+    监视 works 目录，把绕过API手动放入、修改、删除的作品增量同步到作品目录缓存
+    （搜索索引和分面索引通过缓存的变更回调随之更新）
+    inotify 模式只监视 works 根目录（作品目录的增删、改名）和各作品目录（work_config.json 的写入、替换、删除），
+    收到事件立即标记对应作品失效，保证请求读到的不是旧数据；
+    重新解析和更新索引则等事件安静 WATCH_DEBOUNCE 秒后在监视线程中合并完成
+    inotify 不可用（非 Linux、监视数量超过 max_user_watches）时退回轮询
+    """
+
+    ROOT_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+    WORK_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_ONLYDIR
+
+    def __init__(self, catalog, mode=WORKS_WATCH, debounce=WATCH_DEBOUNCE,
+                 max_delay=WATCH_MAX_DELAY, poll_interval=WATCH_POLL_INTERVAL):
+        self.catalog = catalog
+        self.mode = mode
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.backend = None  # 'inotify' / 'poll'，未启动时为 None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._wds = {}  # {watch descriptor: 作品ID，works 根目录为 ''}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """在本进程中启动监视线程（fork 后的子进程会重新启动）"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            if self.mode == 'off' or not self.catalog.store.WATCHABLE:
+                return
+            if self._fd is not None:
+                # 从父进程继承的 inotify 句柄
+                os.close(self._fd)
+                self._fd = None
+            self.backend = 'poll'
+            if self.mode in ('auto', 'inotify'):
+                try:
+                    self._open_inotify()
+                    self.backend = 'inotify'
+                except OSError as e:
+                    self._close_inotify()
+                    logger.warning(f"inotify 不可用，作品目录改为轮询监视: {e}")
+            self._stop = threading.Event()
+            target = self._run_inotify if self.backend == 'inotify' else self._run_poll
+            self._thread = threading.Thread(target=target, name='works-watcher', daemon=True)
+            self._thread.start()
+            self.catalog.watched = True
+        # 监视建立之前发生的改动由一次全量校验补上
+        self.catalog.invalidate()
+        logger.info(f"作品目录监视已启动: {self.backend}")
+
+    def stop(self):
+        """停止监视，作品目录缓存恢复按 CATALOG_REFRESH_INTERVAL 定期全量校验"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+            self._stop.set()
+            self.catalog.watched = False
+        if thread is not None and thread.ident != threading.get_ident():
+            thread.join(timeout=2)
+        self._close_inotify()
+        self.backend = None
+
+    #--------------------------------inotify--------------------------------
+    def _open_inotify(self):
+        if _libc is None or not hasattr(_libc, 'inotify_init1'):
+            raise OSError('当前系统不支持 inotify')
+        fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            errno_ = ctypes.get_errno()
+            raise OSError(errno_, os.strerror(errno_))
+        self._fd = fd
+        self._wds = {}
+        works_dir = self.catalog.works_dir
+        os.makedirs(works_dir, exist_ok=True)
+        self._add_watch(works_dir, self.ROOT_MASK, '')
+        for work_id in os.listdir(works_dir):
+            path = os.path.join(works_dir, work_id)
+            if not work_id.startswith('.') and os.path.isdir(path):
+                self._add_watch(path, self.WORK_MASK, work_id)
+
+    def _close_inotify(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+        self._wds = {}
+
+    def _add_watch(self, path, mask, work_id):
+        wd = _libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno_ = ctypes.get_errno()
+            raise OSError(errno_, os.strerror(errno_), path)
+        # 同一目录（例如改名后）再次添加时返回原来的 wd，这里随之更新作品ID
+        self._wds[wd] = work_id
+
+    def _read_events(self):
+        """读取并处理已到达的事件，返回是否有作品被标记失效"""
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        changed = False
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(data):
+            wd, mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出，丢失的事件由全量校验补上
+                self.catalog.invalidate()
+                changed = True
+                continue
+            work_id = self._wds.get(wd)
+            if work_id is None:
+                continue
+            if mask & IN_IGNORED:
+                self._wds.pop(wd, None)
+                continue
+            if work_id:
+                if name == 'work_config.json':
+                    self.catalog.invalidate(work_id)
+                    changed = True
+                continue
+
+            # works 根目录
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self.catalog.invalidate()
+                changed = True
+                continue
+            if not mask & IN_ISDIR or name.startswith('.'):
+                continue
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                try:
+                    self._add_watch(os.path.join(self.catalog.works_dir, name), self.WORK_MASK, name)
+                except FileNotFoundError:
+                    pass  # 刚创建就被删除
+            # 先建立监视再标记失效，监视建立之前写入的配置也会被重新读取
+            self.catalog.invalidate(name)
+            changed = True
+        return changed
+
+    def _run_inotify(self):
+        stop = self._stop
+        first_event = None  # 本批第一个事件的时间
+        deadline = None     # 本批的合并处理时间
+        while not stop.is_set():
+            timeout = 1.0 if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                ready, _, _ = select.select([self._fd], [], [], timeout)
+                if ready and self._read_events():
+                    now = time.monotonic()
+                    if first_event is None:
+                        first_event = now
+                    deadline = min(now + self.debounce, first_event + self.max_delay)
+            except OSError as e:
+                if stop.is_set():
+                    break
+                if e.errno == errno.ENOSPC:
+                    logger.warning(f"inotify 监视数量已达上限，作品目录改为轮询监视: {e}")
+                else:
+                    logger.error(f"作品目录监视出错，改为轮询监视: {e}")
+                self._close_inotify()
+                self.backend = 'poll'
+                self.catalog.invalidate()
+                return self._run_poll()
+            if deadline is not None and time.monotonic() >= deadline:
+                first_event = deadline = None
+                self._apply()
+
+    #--------------------------------轮询--------------------------------
+    def _run_poll(self):
+        stop = self._stop
+        while not stop.wait(self.poll_interval):
+            self.catalog.invalidate()
+            self._apply()
+
+    def _apply(self):
+        """在监视线程中重新解析被标记的作品并更新索引，请求线程无需再做"""
+        try:
+            self.catalog.refresh()
+        except Exception as e:
+            logger.error(f"同步作品目录失败: {e}")
+
+
+works_watcher = WorksWatcher(works_catalog)
+
+@app.before_request
+def start_works_watcher():
+    # 与任务线程池相同，在每个 worker 进程处理第一个请求时启动
+    works_watcher.start()
+
+
+#==============================统计计数写回缓存===============================
+class StatsCounter:
+    """
+    浏览/下载/点赞计数的写回缓存
+    计数先累加在内存中并追加到本进程的日志文件，由后台线程定时批量写回 work_config.json；
+    进程异常退出后，其日志会在下次启动时被其他进程恢复
+    """
+
+    JOURNAL_PATTERN = re.compile(r'^stats_journal\.(\d+)\.log(\.flushing)?$')
+
+    def __init__(self, journal_dir, flush_interval=STATS_FLUSH_INTERVAL):
+        self.journal_dir = journal_dir
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}   # {work_id: {stat_type: n}}
+        self._inflight = {}  # 正在写回配置文件的计数
+        self._journal = None
+        self._pid = None
+        self._flusher = None
+        self._flush_listeners = []
+
+    def add_flush_listener(self, callback):
+        """注册在每次定时写回和进程退出时调用的回调（在写回线程中执行）"""
+        self._flush_listeners.append(callback)
+
+    def _notify_flush(self):
+        for callback in self._flush_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"统计写回回调失败: {e}")
+
+    def _journal_path(self):
+        return os.path.join(self.journal_dir, f'stats_journal.{self._pid}.log')
+
+    def _open_journal(self):
+        """打开本进程的日志文件（fork 后会重新打开）"""
+        if self._pid != os.getpid():
+            # fork 出的子进程不继承父进程的计数和线程
+            self._pid = os.getpid()
+            self._pending, self._inflight = {}, {}
+            self._journal, self._flusher = None, None
+            self.recover()
+        if self._journal is None:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self._journal = open(self._journal_path(), 'a', encoding='utf-8')
+            if fcntl:
+                # 进程存活期间持有日志锁，其他进程据此判断日志是否遗留
+                fcntl.flock(self._journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._run, name='stats-flusher', daemon=True)
+            self._flusher.start()
+        return self._journal
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"统计数据写回失败: {e}")
+            self._notify_flush()
+
+    @staticmethod
+    def _write_journal(journal, batch):
+        for work_id, counts in batch.items():
+            for stat_type, n in counts.items():
+                journal.write(json.dumps([work_id, stat_type, n], ensure_ascii=False) + '\n')
+        journal.flush()
+
+    def increment(self, work_id, stat_type, n=1):
+        """累加一次统计"""
+        with self._lock:
+            self._write_journal(self._open_journal(), {work_id: {stat_type: n}})
+            counts = self._pending.setdefault(work_id, {})
+            counts[stat_type] = counts.get(stat_type, 0) + n
+
+    def _live_counts(self, work_id):
+        counts = {}
+        for source in (self._inflight, self._pending):
+            for stat_type, n in source.get(work_id, {}).items():
+                counts[stat_type] = counts.get(stat_type, 0) + n
+        return counts
+
+    @staticmethod
+    def apply(config, counts):
+        """返回加上 counts 的作品数据副本"""
+        merged = dict(config)
+        for stat_type, n in counts.items():
+            merged[stat_type] = merged.get(stat_type, 0) + n
+        return merged
+
+    def merge(self, config):
+        """返回合并了未落盘计数的作品数据（不修改缓存中的字典）"""
+        if not config:
+            return config
+        with self._lock:
+            counts = self._live_counts(config.get('作品ID'))
+        return self.apply(config, counts) if counts else config
+
+    def live_counts(self, work_ids=None):
+        """有未落盘计数的作品及其计数 {作品ID: {统计字段: n}}，work_ids 不为空时只返回其中的作品"""
+        with self._lock:
+            if not self._pending and not self._inflight:
+                return {}
+            return {work_id: self._live_counts(work_id)
+                    for work_id in set(self._pending) | set(self._inflight)
+                    if work_ids is None or work_id in work_ids}
+
+    def merge_all(self, works):
+        """批量合并未落盘计数"""
+        live = self.live_counts()
+        if not live:
+            return works
+        return [self.apply(work, live[work.get('作品ID')]) if work.get('作品ID') in live else work
+                for work in works]
+
+    def flush(self):
+        """把内存中的计数批量写回配置文件"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                self._inflight = {work_id: dict(counts) for work_id, counts in batch.items()}
+                flushing, flushing_path = None, None
+                if self._journal is not None:
+                    # 轮换日志：新计数写入新日志，旧日志在写回完成后删除
+                    # 旧日志改名后仍保持打开并持有锁，其他进程的 recover() 不会在写回期间重复恢复它
+                    flushing, flushing_path = self._journal, self._journal_path() + '.flushing'
+                    self._journal = None
+                    if not fcntl:
+                        flushing.close()  # Windows 不能改名打开中的文件
+                    os.replace(self._journal_path(), flushing_path)
+            # 写配置文件（含 fsync）时不持有 _lock，请求线程的计数和合并不必等待
+            try:
+                failed = {}
+                for work_id, counts in batch.items():
+                    written = write_work_stats(work_id, counts) is not False
+                    with self._lock:
+                        self._inflight.pop(work_id, None)
+                        if not written:
+                            # 放回待写回的计数并记入新日志，旧日志删除后不会丢失，下次写回时重试
+                            failed[work_id] = counts
+                            pending = self._pending.setdefault(work_id, {})
+                            for stat_type, n in counts.items():
+                                pending[stat_type] = pending.get(stat_type, 0) + n
+                            self._write_journal(self._open_journal(), {work_id: counts})
+                if failed:
+                    logger.warning(f"{len(failed)} 个作品的统计计数写回失败，下次写回时重试")
+                if flushing_path:
+                    try:
+                        os.remove(flushing_path)
+                    except FileNotFoundError:
+                        pass  # 已被处理
+            finally:
+                if flushing is not None:
+                    flushing.close()
+            return len(batch)
+
+    def recover(self):
+        """把已退出进程遗留的计数日志写回配置文件"""
+        if not os.path.isdir(self.journal_dir):
+            return
+        for name in os.listdir(self.journal_dir):
+            match = self.JOURNAL_PATTERN.match(name)
+            if not match or int(match.group(1)) == os.getpid():
+                continue
+            path = os.path.join(self.journal_dir, name)
+            try:
+                f = open(path, 'r', encoding='utf-8')
+            except OSError:
+                continue
+            with f:
+                if fcntl:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # 所属进程仍在运行
+                    if os.fstat(f.fileno()).st_nlink == 0:
+                        continue  # 拿到锁之前所属进程已写回并删除
+                batch = {}
+                for line in f:
+                    try:
+                        work_id, stat_type, n = json.loads(line)
+                    except ValueError:
+                        continue  # 进程退出时写了一半的行
+                    counts = batch.setdefault(work_id, {})
+                    counts[stat_type] = counts.get(stat_type, 0) + n
+                failed = {work_id: counts for work_id, counts in batch.items()
+                          if write_work_stats(work_id, counts) is False}
+                if failed:
+                    # 只保留写回失败的计数，下次恢复时重试
+                    with open(path + '.tmp', 'w', encoding='utf-8') as tmp:
+                        self._write_journal(tmp, failed)
+                    os.replace(path + '.tmp', path)
+                    logger.warning(f"统计日志 {name} 中 {len(failed)} 个作品的计数写回失败，下次恢复时重试")
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            logger.info(f"已恢复统计日志 {name}: {len(batch)} 个作品")
+
+    def close(self):
+        """写回全部计数并删除本进程的日志（进程退出时调用）"""
+        self.flush()
+        self._notify_flush()
+        with self._lock:
+            if self._journal is not None and self._pid == os.getpid():
+                self._journal.close()
+                self._journal = None
+                os.remove(self._journal_path())
+
+
+stats_counter = StatsCounter(DATA_DIR)
+atexit.register(stats_counter.close)
+
+#==============================统计时间序列===============================
+class StatsTimeline:
+    """
+    浏览/下载/点赞的时间序列
+    计数事件先缓存在内存中，由 stats_counter 的写回线程批量追加到 SQLite 中的 events 表（只追加），
+    随后在同一线程中按游标批量汇总到 rollups 表（请求线程不写数据库）：
+    每个 (作品, 统计字段, 粒度) 一行，counts 是 STATS_ROLLUPS 规定格数的 uint32 环形数组，
+    last_bucket 为最新一格的编号，更早的格子随时间推进被清零复用；
+    时间序列接口和热度排序只读汇总数据，不扫描原始事件
+    多个 worker 进程共享同一个数据库，汇总在 BEGIN IMMEDIATE 事务中进行，事件不会被重复计入
+    """
+
+    FIELDS = ('作品浏览量', '作品下载量', '作品点赞量')
+    ROLLUP_BATCH = 10000  # 每个事务最多汇总的事件数
+    EPOCH = datetime(1970, 1, 1)
+
+    def __init__(self, db_path, rollups=STATS_ROLLUPS):
+        self.db_path = db_path
+        self.rollups = rollups
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._buffer = []  # 尚未写入数据库的事件 [(ts, work_id, stat_type, n)]
+        self._pid = os.getpid()
+        self._trending = (0.0, {})  # (计算时间, {作品ID: 热度})
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS events ('
+                         'ts REAL NOT NULL, work_id TEXT NOT NULL, stat_type TEXT NOT NULL, n INTEGER NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS rollups ('
+                         'work_id TEXT NOT NULL, stat_type TEXT NOT NULL, resolution TEXT NOT NULL, '
+                         'last_bucket INTEGER NOT NULL, counts BLOB NOT NULL, '
+                         'PRIMARY KEY (work_id, stat_type, resolution)) WITHOUT ROWID')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_rollups_resolution ON rollups (resolution, last_bucket)')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('cursor', 0)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def bucket(self, ts, resolution):
+        """
+        时间戳所在的格子编号：按本地时间划分小时/天的边界，
+        时区偏移按事件发生时计算，夏令时切换前后的格子都落在当地的整点/零点上
+        """
+        return int((ts + time.localtime(ts).tm_gmtoff) // self.rollups[resolution][0])
+
+    def bucket_time(self, bucket, resolution):
+        """格子的起始时间（本地时间 ISO 格式）"""
+        return (self.EPOCH + timedelta(seconds=bucket * self.rollups[resolution][0])).isoformat()
+
+    def record(self, work_id, stat_type, n=1, ts=None):
+        """记录一条计数事件（只放入内存缓冲，由 flush 写入数据库）"""
+        if stat_type not in self.FIELDS:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork 出的子进程不继承父进程未写入的事件
+                self._pid, self._buffer = os.getpid(), []
+            self._buffer.append((time.time() if ts is None else ts, work_id, stat_type, n))
+
+    def flush(self):
+        """把缓冲的事件写入数据库并汇总（在后台写回线程中调用），失败只记录日志，不影响计数本身"""
+        with self._lock:
+            events, self._buffer = self._buffer, []
+        if not events:
+            return 0
+        try:
+            conn = self._conn()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany('INSERT INTO events (ts, work_id, stat_type, n) VALUES (?, ?, ?, ?)', events)
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+            self.rollup()
+        except sqlite3.Error as e:
+            logger.error(f"写入统计事件失败: {e}")
+        return len(events)
+
+    def rollup(self):
+        """把游标之后的事件汇总到环形数组，返回处理的事件数"""
+        conn = self._conn()
+        total = 0
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                cursor = conn.execute("SELECT value FROM meta WHERE key = 'cursor'").fetchone()[0]
+                rows = conn.execute(
+                    'SELECT rowid, ts, work_id, stat_type, n FROM events WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                    (cursor, self.ROLLUP_BATCH)
+                ).fetchall()
+                if rows:
+                    self._apply_events(conn, rows)
+                    conn.execute("UPDATE meta SET value = ? WHERE key = 'cursor'", (rows[-1][0],))
+                    if total == 0:
+                        self._prune(conn, rows[-1][0])
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            total += len(rows)
+            if len(rows) < self.ROLLUP_BATCH:
+                return total
+
+    def _apply_events(self, conn, rows):
+        grouped = {}
+        for _rowid, ts, work_id, stat_type, n in rows:
+            grouped.setdefault((work_id, stat_type), []).append((ts, n))
+        for (work_id, stat_type), events in grouped.items():
+            for resolution, (_size, slots) in self.rollups.items():
+                row = conn.execute(
+                    'SELECT last_bucket, counts FROM rollups WHERE work_id = ? AND stat_type = ? AND resolution = ?',
+                    (work_id, stat_type, resolution)
+                ).fetchone()
+                if row:
+                    last, counts = row[0], array('I', row[1])
+                else:
+                    last, counts = None, array('I', bytes(4 * slots))
+                for ts, n in events:
+                    bucket = self.bucket(ts, resolution)
+                    if last is None or bucket - last >= slots:
+                        # 距上次事件已超过整个环，全部清零
+                        counts = array('I', bytes(4 * slots))
+                        last = bucket
+                    elif bucket > last:
+                        for skipped in range(last + 1, bucket + 1):
+                            counts[skipped % slots] = 0
+                        last = bucket
+                    elif bucket <= last - slots:
+                        continue  # 早于环形数组覆盖的范围
+                    counts[bucket % slots] += n
+                conn.execute(
+                    'INSERT OR REPLACE INTO rollups (work_id, stat_type, resolution, last_bucket, counts) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (work_id, stat_type, resolution, last, counts.tobytes())
+                )
+
+    def _prune(self, conn, cursor):
+        """
+        删除已汇总且超过保留时间的原始事件
+        游标所在的最后一行始终保留：删掉 rowid 最大的行后 SQLite 会重用该 rowid，新事件会被游标跳过
+        """
+        conn.execute('DELETE FROM events WHERE rowid < ? AND ts < ?',
+                     (cursor, time.time() - STATS_EVENT_RETENTION))
+
+    def _window(self, last, counts, end_bucket, length, slots):
+        """
+        从 end_bucket 往前 length 格的计数（下标 0 为 end_bucket），
+        环形数组尚未推进到的格子（晚于 last）计为 0
+        """
+        start = min(max(end_bucket - last, 0), length)
+        stop = max(min(length, end_bucket - last + slots), start)
+        # 把环形数组展开成从 end_bucket 往前的顺序
+        index = end_bucket % slots
+        ring = counts.tolist()
+        ordered = ring[index::-1] + ring[:index:-1]
+        return [0] * start + ordered[start:stop] + [0] * (length - stop)
+
+    def series(self, work_id, resolution, length):
+        """作品最近 length 格的计数，按时间先后排列（只读汇总数据，最多滞后 STATS_FLUSH_INTERVAL 秒）"""
+        _size, slots = self.rollups[resolution]
+        end_bucket = self.bucket(time.time(), resolution)
+        rows = self._conn().execute(
+            'SELECT stat_type, last_bucket, counts FROM rollups WHERE work_id = ? AND resolution = ?',
+            (work_id, resolution)
+        ).fetchall()
+        windows = {stat_type: self._window(last, array('I', counts), end_bucket, length, slots)
+                   for stat_type, last, counts in rows}
+        points = []
+        for age in range(length - 1, -1, -1):
+            point = {'时间': self.bucket_time(end_bucket - age, resolution)}
+            for field in self.FIELDS:
+                point[field] = windows[field][age] if field in windows else 0
+            points.append(point)
+        total = {field: sum(windows.get(field, ())) for field in self.FIELDS}
+        return points, total
+
+    def trending_scores(self):
+        """
+        各作品的热度，返回 (计算时间, {作品ID: 热度})
+        由小时汇总按时间衰减加权求和，结果缓存 TRENDING_CACHE_TTL 秒
+        """
+        computed_at, scores = self._trending
+        if time.time() - computed_at < TRENDING_CACHE_TTL:
+            return self._trending
+        now = time.time()
+        _size, slots = self.rollups['hour']
+        window = min(TRENDING_WINDOW_HOURS, slots)
+        end_bucket = self.bucket(now, 'hour')
+        decay = [0.5 ** (age / TRENDING_HALF_LIFE_HOURS) for age in range(window)]
+        scores = {}
+        rows = self._conn().execute(
+            "SELECT work_id, stat_type, last_bucket, counts FROM rollups WHERE resolution = 'hour' AND last_bucket > ?",
+            (end_bucket - window,)
+        )
+        for work_id, stat_type, last, counts in rows:
+            weight = TRENDING_WEIGHTS.get(stat_type, 0)
+            if weight:
+                values = self._window(last, array('I', counts), end_bucket, window, slots)
+                scores[work_id] = scores.get(work_id, 0.0) + weight * sum(map(operator.mul, values, decay))
+        self._trending = (now, scores)
+        return self._trending
+
+
+stats_timeline = StatsTimeline(os.path.join(DATA_DIR, 'stats.db'))
+stats_counter.add_flush_listener(stats_timeline.flush)
+
+#加载单个作品配置
+@timed('load_work_config')
+def load_work_config(work_id):
+    """加载单个作品配置"""
+    return stats_counter.merge(works_catalog.get(work_id))
+
+
+#==============================公开API接口===============================
+#==============================响应缓存===============================
+class ResponseCache:
+    """按数据版本缓存序列化好的 JSON 响应体及其 ETag，数据版本变化后自动失效"""
+
+    BUILD_LOCKS = 16
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {key: entry}
+        # 版本变化后同一个 key 的并发请求只生成一次响应体（按 key 分段加锁）
+        self._build_locks = [threading.Lock() for _ in range(self.BUILD_LOCKS)]
+
+    def build_lock(self, key):
+        return self._build_locks[hash(key) % self.BUILD_LOCKS]
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['version'] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, body, last_modified=None, live=None):
+        entry = {
+            'version': version,
+            'etag': hashlib.blake2b(body, digest_size=16).hexdigest(),
+            'body': body,
+            'last_modified': last_modified,
+            'live': live,  # (数据, 作品配置, 作品ID集合)，用于拼接实时计数
+            'encoded': {},  # {编码: 压缩后的响应体}，按需生成
+            'encode_lock': threading.Lock()
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+response_cache = ResponseCache()
+
+def catalog_version():
+    """
+    作品数据版本（响应缓存的依据）：只随作品目录变化
+    实时计数不计入版本，否则任何作品的一次浏览都会让全部缓存失效；
+    带作品数据的接口由 cached_json_response(live=True) 按请求拼接本页作品的实时计数
+    """
+    works_catalog.refresh()
+    return works_catalog.version
+
+def choose_encoding(body_size):
+    """根据 Accept-Encoding 选择压缩方式，不压缩时返回 None"""
+    if body_size < COMPRESS_MIN_SIZE:
+        return None
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+def get_encoded_body(entry, encoding):
+    """获取压缩后的响应体，每个数据版本每种编码只压缩一次"""
+    body = entry['encoded'].get(encoding)
+    if body is None:
+        # 并发请求等待第一个请求压缩完成，不重复压缩
+        with entry['encode_lock']:
+            body = entry['encoded'].get(encoding)
+            if body is None:
+                record_cache(f'compressed_{encoding}', False)
+                if encoding == 'br':
+                    body = brotli.compress(entry['body'], quality=BROTLI_QUALITY)
+                else:
+                    body = gzip.compress(entry['body'], compresslevel=GZIP_LEVEL, mtime=0)
+                entry['encoded'][encoding] = body
+                return body
+    record_cache(f'compressed_{encoding}', True)
+    return body
+
+def get_cache_entry(key, version, build, live=False):
+    """
+    获取缓存的响应体，build() 同一版本只调用一次（并发请求等待第一个请求生成）
+    live 为真时 build() 返回 (数据, 最后修改时间, 作品配置)，作品配置与 data 一一对应（详情接口为单个配置）
+    """
+    entry = response_cache.get(key, version)
+    hit = entry is not None
+    if entry is None:
+        with response_cache.build_lock(key):
+            # 等锁期间其他请求可能已经生成
+            entry = response_cache.get(key, version)
+            if entry is None:
+                payload, last_modified, *sources = build()
+                start = time.perf_counter()
+                body = encode_json(payload)
+                metrics.observe('smy_json_encode_seconds', time.perf_counter() - start)
+                if live:
+                    sources = sources[0] if isinstance(sources[0], list) else sources
+                    live = (payload, sources, frozenset(config.get('作品ID') for config in sources))
+                entry = response_cache.put(key, version, body, last_modified, live or None)
+            else:
+                hit = True
+    record_cache('response', hit)
+    return entry
+
+def splice_live_counts(payload, sources, counts):
+    """把实时计数拼接进缓存的数据，只重新生成有未落盘计数的作品"""
+    def merged(item, config):
+        work_counts = counts.get(config.get('作品ID'))
+        if not work_counts:
+            return item
+        config = stats_counter.apply(config, work_counts)
+        if isinstance(item, PublicWork):
+            return public_works.view(config)
+        return {field: config[field] for field in item}  # fields 裁剪后的字典
+    data = payload['data']
+    if isinstance(data, list):
+        data = [merged(item, config) for item, config in zip(data, sources)]
+    else:
+        data = merged(data, sources[0])
+    return dict(payload, data=data)
+
+def cached_json_response(key, version, build, live=False):
+    """
+    返回带 ETag 和 Last-Modified 的 JSON 响应
+    key 由视图实际读取的参数组成（不用原始查询字符串，无关参数不会占用缓存），
+    build() 返回 (数据, 最后修改时间)，同一版本只调用一次，序列化和压缩结果都会缓存；
+    If-None-Match / If-Modified-Since 命中时直接返回 304，不再生成响应体
+    live 为真时缓存的数据不含未落盘计数，每个请求检查响应中的作品有没有实时计数：
+    没有时直接使用缓存，有时把计数拼接进去（按计数缓存，只重新序列化变化的作品），
+    ETag 因而只随本响应中作品的计数变化；这类响应体随时可能变化，不带 Last-Modified
+    """
+    entry = get_cache_entry(key, version, build, live)
+    if entry['live']:
+        payload, sources, work_ids = entry['live']
+        counts = stats_counter.live_counts(work_ids)
+        if counts:
+            live_version = (version, tuple(sorted(
+                (work_id, tuple(sorted(work_counts.items()))) for work_id, work_counts in counts.items()
+            )))
+            entry = get_cache_entry(('live', key), live_version,
+                                    lambda: (splice_live_counts(payload, sources, counts), None))
+    
+    # 不同编码的响应体不同，强 ETag 也要区分
+    encoding = choose_encoding(len(entry['body']))
+    etag = f"{entry['etag']}-{encoding}" if encoding else entry['etag']
+    
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = bool(entry['last_modified'] and request.if_modified_since
+                            and entry['last_modified'] <= request.if_modified_since)
+    
+    if not_modified:
+        response = app.response_class(status=304)
+    elif encoding:
+        response = app.response_class(get_encoded_body(entry, encoding), mimetype='application/json')
+        response.content_encoding = encoding
+    else:
+        response = app.response_class(entry['body'], mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    if entry['last_modified']:
+        response.last_modified = entry['last_modified']
+    return response
+
+#获取所有作品
+@timed('get_all_works')
+def get_all_works():
+    """获取所有作品"""
+    return stats_counter.merge_all(works_catalog.all())
+
+# 列表接口 sort 参数与排序字段的对应关系
+# （统计字段按已写回配置文件的计数排序，最多滞后 STATS_FLUSH_INTERVAL 秒；
+#   热度不是配置字段，由统计时间序列计算）
+TRENDING_SORT = '热度'
+SORT_FIELDS = {
+    'updated': '更新时间',
+    'views': '作品浏览量',
+    'downloads': '作品下载量',
+    'likes': '作品点赞量',
+    'trending': TRENDING_SORT
+}
+
+def get_sort_field(default='updated'):
+    """解析 sort 参数，不支持的取值返回 None"""
+    return SORT_FIELDS.get(request.args.get('sort', default))
+
+def sort_works(works, sort_field):
+    """按排序字段倒序排列作品（返回新列表），热度相同的保持原有顺序"""
+    if sort_field == TRENDING_SORT:
+        _, scores = stats_timeline.trending_scores()
+        return sorted(works, key=lambda x: scores.get(x.get('作品ID'), 0.0), reverse=True)
+    default = '' if sort_field == '更新时间' else 0
+    return sorted(works, key=lambda x: x.get(sort_field, default), reverse=True)
+
+def sorted_works(sort_field):
+    """全部作品按排序字段倒序排列，配置字段使用作品目录缓存中排好序的结果"""
+    if sort_field == TRENDING_SORT:
+        return sort_works(works_catalog.sorted_view(), sort_field)
+    return works_catalog.sorted_view(sort_field)
+
+def get_list_arg(*names):
+    """读取可重复或逗号分隔的查询参数，返回去重后的取值列表"""
+    values = []
+    for name in names:
+        for raw in request.args.getlist(name):
+            for value in raw.split(','):
+                value = value.strip()
+                if value and value not in values:
+                    values.append(value)
+    return values
+
+def list_cache_key(*parts):
+    """
+    列表接口的响应缓存 key：parts 加上 build_list_response 读取的参数，
+    其他查询参数（如前端防缓存的时间戳）和参数顺序不会产生新的缓存项
+    """
+    args = request.args
+    page_size = args.get('page_size', type=int) or args.get('limit', type=int)
+    return parts + (args.get('page', type=int), page_size, args.get('fields', ''))
+
+def build_list_response(works, merge_stats=True, public=True, live=False, **extra):
+    """
+    按请求参数对作品列表分页（page/page_size）并裁剪字段（fields），生成列表接口的响应
+    不带分页参数时返回全部作品，兼容旧的前端；works 已合并过实时计数时 merge_stats 传 False
+    public 为真时返回 PublicWork（去掉内部字段，需用 encode_json 序列化），管理接口传 False 返回完整配置
+    live 为真时不合并实时计数，返回 (响应, 本页作品配置)，供 cached_json_response(live=True) 拼接实时计数
+    """
+    total = len(works)
+    result = {'success': True}
+    page = request.args.get('page', type=int)
+    page_size = request.args.get('page_size', type=int) or request.args.get('limit', type=int)
+    if page or page_size:
+        page = max(page or 1, 1)
+        page_size = max(page_size or load_settings().get('每页作品数量', 12), 1)
+        works = works[(page - 1) * page_size:page * page_size]
+        result['page'] = page
+        result['page_size'] = page_size
+    if merge_stats and not live:
+        works = stats_counter.merge_all(works)
+    sources = works
+    
+    fields = [field for field in request.args.get('fields', '').split(',') if field]
+    if fields:
+        # 字段裁剪直接取配置中的字段，公开接口同样不返回内部字段
+        hidden = INTERNAL_FIELDS if public else ()
+        works = [{field: work[field] for field in fields if field in work and field not in hidden}
+                 for work in works]
+    elif public:
+        works = public_works.view_all(works)
+    
+    result['data'] = works
+    result['total'] = total
+    result.update(extra)
+    return (result, sources) if live else result
+
+#获取网站设置
+@app.route('/api/settings')
+def get_settings():
+    """获取网站设置"""
+    settings_path = os.path.join(CONFIG_DIR, 'settings.json')
+    try:
+        mtime = os.stat(settings_path).st_mtime
+    except OSError:
+        mtime = None
+    last_modified = datetime.fromtimestamp(int(mtime), timezone.utc) if mtime else None
+    return cached_json_response('settings', mtime, lambda: (load_settings(), last_modified))
+
+#获取所有作品列表
+@app.route('/api/works')
+def get_works():
+    """获取所有作品列表（支持 page/page_size 分页、sort 排序、fields 字段裁剪）"""
+    sort_field = get_sort_field()
+    if not sort_field:
+        return jsonify({'success': False, 'message': '不支持的排序方式'}), 400
+    version = catalog_version()
+    if sort_field == TRENDING_SORT:
+        # 热度定期重新计算，计算时间也是数据版本的一部分
+        version = (version, stats_timeline.trending_scores()[0])
+    def build():
+        result, sources = build_list_response(sorted_works(sort_field), live=True)
+        return result, works_catalog.last_modified(), sources
+    
+    return cached_json_response(list_cache_key('works', sort_field), version, build, live=True)
+
+#获取单个作品详情
+@app.route('/api/works/<work_id>')
+def get_work_detail(work_id):
+    """获取单个作品详情"""
+    if works_catalog.get(work_id):
+        # 增加浏览量（防刷检查）
+        if can_perform_action('view', work_id):
+            update_work_stats(work_id, '作品浏览量')
+        
+        def build():
+            # 缓存不含未落盘计数，由 cached_json_response 按请求拼接
+            config = works_catalog.get(work_id)
+            return ({'success': True, 'data': public_works.view(config)},
+                    parse_update_time(config.get('更新时间')), config)
+        
+        return cached_json_response(('work', work_id), catalog_version(), build, live=True)
+    else:
+        return jsonify({
+            'success': False,
+            'message': '作品不存在'
+        }), 404
+
+def send_work_file(work_id, filename, *subdirs, as_attachment=False, cache_version=None):
+    """
+    发送作品目录下的文件，文件不存在时返回 None
+    ETag 由修改时间和大小生成；请求带的 ?v= 与文件当前版本（或 cache_version）一致时返回
+    immutable 的长期缓存，否则每次都需要用 ETag 重新验证。Range/If-Range 由 werkzeug（或 nginx）处理
+    """
+    path = safe_join(WORKS_DIR, work_id, *subdirs, filename)
+    try:
+        st = os.stat(path) if path else None
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
+        return None
+    version = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+    
+    if SEND_FILE_MODE == 'x-accel':
+        # 由 nginx 发送文件并处理 Range，这里只返回内部跳转地址
+        response = app.response_class()
+        response.headers['X-Accel-Redirect'] = X_ACCEL_PREFIX + quote('/'.join((work_id,) + subdirs + (filename,)))
+        response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        if as_attachment:
+            response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+    else:
+        response = send_file(path, as_attachment=as_attachment, download_name=filename,
+                             etag=version, last_modified=st.st_mtime, conditional=True)
+    
+    if not as_attachment and request.args.get('v') == (cache_version or version):
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    return response
+
+#==============================图片缩略图===============================
+# 缩略图与原图放在同一作品下：image/.derivatives/<原图名>.<宽度>w.<原图版本>.<格式>
+DERIVATIVE_SUBDIR = '.derivatives'
+_derivative_locks = {}  # {缩略图路径: [锁, 等待的线程数]}
+_derivative_locks_guard = threading.Lock()
+
+@contextmanager
+def derivative_lock(path):
+    """同一个缩略图只由一个线程生成，不同缩略图可以并行生成"""
+    with _derivative_locks_guard:
+        entry = _derivative_locks.setdefault(path, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _derivative_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _derivative_locks[path]
+
+def _derivative_pattern(filename):
+    return re.compile(rf'^{re.escape(filename)}\.\d+w\.')
+
+def get_image_derivative(work_id, filename, width, fmt):
+    """
+    获取（必要时生成）图片缩略图，返回 (缩略图文件名, 原图版本)
+    规格不在白名单、未安装 Pillow 或原图无法处理时返回 None
+    """
+    if Image is None or width not in THUMBNAIL_WIDTHS or fmt not in THUMBNAIL_FORMATS:
+        return None
+    source_path = safe_join(WORKS_DIR, work_id, 'image', filename)
+    version = file_version(source_path) if source_path else None
+    if version is None:
+        return None
+    
+    name = f"{filename}.{width}w.{version}.{fmt}"
+    derivative_dir = os.path.join(WORKS_DIR, work_id, 'image', DERIVATIVE_SUBDIR)
+    path = os.path.join(derivative_dir, name)
+    if os.path.exists(path):
+        record_cache('thumbnail', True)
+        return name, version
+    
+    record_cache('thumbnail', False)
+    with derivative_lock(path):
+        if os.path.exists(path):
+            return name, version
+        try:
+            with Image.open(source_path) as img:
+                if getattr(img, 'is_animated', False):
+                    return None  # 动图直接返回原图
+                img.thumbnail((width, width * 10))
+                if THUMBNAIL_FORMATS[fmt] == 'JPEG' and img.mode not in ('RGB', 'L'):
+                    img = img.convert('RGB')
+                os.makedirs(derivative_dir, exist_ok=True)
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                img.save(temp_path, THUMBNAIL_FORMATS[fmt], quality=80)
+                os.replace(temp_path, path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"生成缩略图失败 {work_id}/{filename}: {e}")
+            return None
+        
+        # 清理同一原图同一规格的旧版本
+        prefix = f"{filename}.{width}w."
+        for old_name in os.listdir(derivative_dir):
+            if old_name.startswith(prefix) and old_name.endswith(f".{fmt}") and old_name != name:
+                try:
+                    os.remove(os.path.join(derivative_dir, old_name))
+                except OSError:
+                    pass
+    return name, version
+
+def evict_image_derivatives(work_id, filename):
+    """删除某张原图的全部缩略图"""
+    derivative_dir = os.path.join(WORKS_DIR, work_id, 'image', DERIVATIVE_SUBDIR)
+    if not os.path.isdir(derivative_dir):
+        return
+    pattern = _derivative_pattern(filename)
+    for name in os.listdir(derivative_dir):
+        if pattern.match(name):
+            try:
+                os.remove(os.path.join(derivative_dir, name))
+            except OSError:
+                pass
+
+#提供作品图片
+@app.route('/api/image/<work_id>/<filename>')
+def serve_image(work_id, filename):
+    """提供作品图片，带 w（和 fmt）参数时返回缩略图（未安装 Pillow 或原图无法处理时返回原图）"""
+    if 'w' in request.args:
+        width = request.args.get('w', type=int)
+        fmt = request.args.get('fmt', 'webp').lower()
+        if width not in THUMBNAIL_WIDTHS or fmt not in THUMBNAIL_FORMATS:
+            return jsonify({
+                'error': f"不支持的缩略图规格，w 可选 {', '.join(map(str, THUMBNAIL_WIDTHS))}，"
+                         f"fmt 可选 {', '.join(THUMBNAIL_FORMATS)}"
+            }), 400
+        derivative = get_image_derivative(work_id, filename, width, fmt)
+        if derivative:
+            name, version = derivative
+            response = send_work_file(work_id, name, 'image', DERIVATIVE_SUBDIR, cache_version=version)
+            if response is not None:
+                return response
+    
+    response = send_work_file(work_id, filename, 'image')
+    if response is not None:
+        return response
+    return jsonify({'error': '图片不存在'}), 404
+
+#提供作品视频
+@app.route('/api/video/<work_id>/<filename>')
+def serve_video(work_id, filename):
+    """提供作品视频"""
+    response = send_work_file(work_id, filename, 'video')
+    if response is not None:
+        return response
+    return jsonify({'error': '视频不存在'}), 404
+
+#提供作品下载
+@app.route('/api/download/<work_id>/<platform>/<filename>')
+def download_file(work_id, platform, filename):
+    """提供作品下载"""
+    response = send_work_file(work_id, filename, 'platform', platform, as_attachment=True)
+    if response is not None:
+        # 增加下载量（防刷检查）；断点续传的后续分段不重复计数
+        if response.status_code == 200 and can_perform_action('download', work_id):
+            update_work_stats(work_id, '作品下载量')
+        
+        return response
+    return jsonify({'error': '文件不存在'}), 404
+
+#==============================打包下载===============================
+class _ZipStreamBuffer:
+    """只写的输出流：zipfile 写入的数据暂存在这里，由生成器取走后立即发给客户端"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def iter_zip(entries):
+    """
+    边读边打包输出 ZIP，entries 为 [(压缩包内路径, 文件路径)]
+    输出流不可 seek，zipfile 会改用数据描述符记录大小和 CRC；
+    同一时间只在内存中保留一个读缓冲区的数据，不生成临时文件
+    """
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', allowZip64=True) as archive:
+        for arcname, path in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = archive_compression(arcname)
+            with open(path, 'rb') as src, archive.open(info, 'w') as dest:
+                while True:
+                    chunk = src.read(UPLOAD_BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    yield buffer.drain()  # 中央目录
+
+def bundle_entries(work_id, config, bundle):
+    """打包下载包含的文件：<平台> 为该平台的全部文件，all 为全部平台文件、截图和视频"""
+    work_dir = os.path.join(WORKS_DIR, work_id)
+    files = config.get('文件名称', {})
+    entries = []
+    if bundle == 'all':
+        for platform in config.get('支持平台', []):
+            for filename in files.get(platform, []):
+                entries.append((f'{work_id}/{platform}/{filename}',
+                                safe_join(work_dir, 'platform', platform, filename)))
+        for filename in config.get('作品截图', []):
+            entries.append((f'{work_id}/image/{filename}', safe_join(work_dir, 'image', filename)))
+        for filename in config.get('作品视频', []):
+            entries.append((f'{work_id}/video/{filename}', safe_join(work_dir, 'video', filename)))
+    else:
+        for filename in files.get(bundle, []):
+            entries.append((filename, safe_join(work_dir, 'platform', bundle, filename)))
+    return [(arcname, path) for arcname, path in entries if path and os.path.isfile(path)]
+
+@app.route('/api/download/<work_id>/<bundle>.zip')
+def download_bundle(work_id, bundle):
+    """打包下载：/api/download/<作品ID>/<平台>.zip 或 /api/download/<作品ID>/all.zip"""
+    config = load_work_config(work_id)
+    if not config:
+        return jsonify({'error': '作品不存在'}), 404
+    if bundle != 'all' and bundle not in config.get('文件名称', {}):
+        return jsonify({'error': '平台不存在'}), 404
+    
+    entries = bundle_entries(work_id, config, bundle)
+    if not entries:
+        return jsonify({'error': '文件不存在'}), 404
+    
+    # 整个压缩包只计一次下载（防刷检查）
+    if can_perform_action('download', work_id):
+        update_work_stats(work_id, '作品下载量')
+    
+    response = app.response_class(iter_zip(entries), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(f'{work_id}_{bundle}.zip')}"
+    response.headers['Cache-Control'] = 'no-cache'
+    # 让 nginx 直接转发而不是先缓冲整个响应
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+#搜索作品
+@app.route('/api/search')
+def search_works():
+    """
+    搜索作品（默认按相关度排序，支持 sort 排序、page/page_size 分页、fields 字段裁剪）
+    可按 category、tags、platforms 筛选，多个取值用逗号分隔或重复传参：
+    同一参数的取值满足其一即可，不同参数需同时满足
+    """
+    query = request.args.get('q', '')
+    
+    works_catalog.refresh()
+    candidates = facet_index.filter(
+        category=get_list_arg('category'),
+        tag=get_list_arg('tags', 'tag'),
+        platform=get_list_arg('platforms', 'platform')
+    )
+    works = search_index.search(query, candidates)
+    
+    # 搜索结果只有命中的作品，直接合并实时计数后排序
+    works = stats_counter.merge_all(works)
+    if 'sort' in request.args:
+        sort_field = get_sort_field()
+        if not sort_field:
+            return jsonify({'success': False, 'message': '不支持的排序方式'}), 400
+        works = sort_works(works, sort_field)
+    
+    return json_response(build_list_response(works, merge_stats=False))
+
+#获取所有分类
+@app.route('/api/categories')
+def get_categories():
+    """获取所有分类（按作品数倒序，counts 中附带各分类的作品数）"""
+    def build():
+        return facet_response('category'), works_catalog.last_modified()
+    
+    return cached_json_response('categories', catalog_version(), build)
+
+#获取所有标签
+@app.route('/api/tags')
+def get_tags():
+    """获取所有标签（按作品数倒序，counts 中附带各标签的作品数）"""
+    def build():
+        return facet_response('tag'), works_catalog.last_modified()
+    
+    return cached_json_response('tags', catalog_version(), build)
+
+# 统计时间序列的 range 参数：<数字>m / <数字>h / <数字>d
+STATS_RANGE_PATTERN = re.compile(r'^(\d+)([mhd])$')
+STATS_RANGE_UNITS = {'m': ('minute', 60), 'h': ('hour', 3600), 'd': ('day', 86400)}
+
+@app.route('/api/stats/<work_id>')
+def get_work_stats_series(work_id):
+    """
+    作品浏览/下载/点赞的时间序列：/api/stats/<作品ID>?range=7d&interval=hour
+    interval 可选 minute/hour/day，默认与 range 的单位相同；数据来自汇总后的环形数组
+    """
+    if works_catalog.get(work_id) is None:
+        return jsonify({'success': False, 'message': '作品不存在'}), 404
+    
+    range_arg = request.args.get('range', '7d')
+    match = STATS_RANGE_PATTERN.match(range_arg)
+    if not match:
+        return jsonify({'success': False, 'message': '不支持的时间范围'}), 400
+    default_interval, unit_seconds = STATS_RANGE_UNITS[match.group(2)]
+    interval = request.args.get('interval', default_interval)
+    if interval not in STATS_ROLLUPS:
+        return jsonify({'success': False, 'message': '不支持的统计粒度'}), 400
+    
+    size, slots = STATS_ROLLUPS[interval]
+    length = -(-int(match.group(1)) * unit_seconds // size)  # 向上取整
+    if not 0 < length <= slots:
+        return jsonify({'success': False, 'message': f'按 {interval} 统计最多查询 {slots} 格'}), 400
+    
+    points, total = stats_timeline.series(work_id, interval, length)
+    return jsonify({
+        'success': True,
+        'data': {
+            '作品ID': work_id,
+            'range': range_arg,
+            'interval': interval,
+            'points': points,
+            'total': total
+        }
+    })
+
+@app.route('/api/like/<work_id>', methods=['POST'])
+def like_work(work_id):
+    """点赞作品"""
+    # 检查作品是否存在（只查作品目录缓存，不合并计数）
+    if works_catalog.get(work_id) is None:
+        return jsonify({
+            'success': False,
+            'message': '作品不存在'
+        }), 404
+    
+    # 防刷检查
+    if not can_perform_action('like', work_id):
+        return jsonify({
+            'success': False,
+            'message': '操作太频繁，请稍后再试'
+        }), 429
+    
+    # 增加点赞量
+    if update_work_stats(work_id, '作品点赞量'):
+        # 获取最新的点赞数
+        updated_config = load_work_config(work_id)
+        return jsonify({
+            'success': True,
+            'message': '点赞成功',
+            'likes': updated_config.get('作品点赞量', 0)
+        })
+    else:
+        return jsonify({
+            'success': False,
+            'message': '点赞失败'
+        }), 500
+#==============================公开API接口===============================
+
+
+#==============================监控接口===============================
+@app.before_request
+def start_request_timer():
+    if METRICS_ENABLED:
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """按路由模板（而不是实际路径）统计，避免作品ID、文件名导致标签爆炸"""
+    start = g.pop('request_start', None)
+    if start is None:
+        return response
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.inc('smy_http_requests_total', method=request.method, route=route,
+                status=str(response.status_code))
+    metrics.observe('smy_http_request_duration_seconds', time.perf_counter() - start, route=route)
+    if response.content_length is not None:
+        metrics.observe('smy_http_response_size_bytes', response.content_length, route=route)
+    return response
+
+metrics.gauge('smy_rate_limit_entries', '防刷记录条数', lambda: len(rate_limit_store))
+metrics.gauge('smy_catalog_works', '作品目录缓存中的作品数', lambda: len(works_catalog))
+metrics.gauge('smy_catalog_version', '作品目录缓存版本号（每次变更加一）', lambda: works_catalog.version)
+metrics.gauge('smy_response_cache_entries', '已缓存的 JSON 响应数', lambda: len(response_cache))
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus 指标（建议在 nginx 中只允许内网访问）"""
+    if not METRICS_ENABLED:
+        return jsonify({'success': False, 'message': '未启用监控指标'}), 404
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+#==============================后台任务===============================
+class JobQueue:
+    """
+    进程内的后台任务队列
+    慢操作交给线程池执行，接口立即返回 202 和任务ID；任务状态保存在 DATA_DIR/jobs/<任务ID>.json，
+    任意 worker 进程都能查询。进程重启后，所属进程已退出的未完成任务中，
+    可重复执行的（resumable）重新执行，其余标记为失败并调用注册的 on_abort 清理
+    """
+
+    ID_PATTERN = re.compile(r'^[\w.-]+$')
+
+    def __init__(self, jobs_dir, workers=JOB_WORKERS, retention=JOB_RETENTION):
+        self.jobs_dir = jobs_dir
+        self.workers = workers
+        self.retention = retention
+        self._handlers = {}  # {任务类型: (函数, 可否重新执行, 中断时的清理函数)}
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._index = {}  # {文件名: (mtime, 大小, (状态, 作品ID, 任务类型))}，pending() 用
+        self._index_mtime = None
+        self._pending = {}
+        self._executor = None
+        self._pid = None
+
+    def handler(self, job_type, resumable=False, on_abort=None):
+        """
+        注册任务处理函数 func(work_id, **params)，返回值（需可 JSON 序列化）记为任务结果
+        不可重新执行的任务因进程退出而中断时，recover() 调用 on_abort(work_id, **params) 清理它留下的文件
+        """
+        def decorator(func):
+            self._handlers[job_type] = (func, resumable, on_abort)
+            return func
+        return decorator
+
+    def _path(self, job_id):
+        return os.path.join(self.jobs_dir, f'{job_id}.json')
+
+    def _save(self, job):
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        path = self._path(job['id'])
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def get(self, job_id):
+        """读取任务状态，不存在时返回 None"""
+        if not self.ID_PATTERN.match(job_id):
+            return None
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _jobs(self):
+        if not os.path.isdir(self.jobs_dir):
+            return
+        for name in os.listdir(self.jobs_dir):
+            if name.endswith('.json'):
+                job = self.get(name[:-5])
+                if job:
+                    yield job
+
+    def start(self):
+        """在本进程中启动线程池（fork 后的子进程会重新启动），并接管遗留的任务"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            self._pid = os.getpid()
+        self.recover()
+
+    def submit(self, job_type, work_id=None, job_id=None, **params):
+        """
+        提交任务并返回任务记录
+        指定 job_id 时同一任务只会提交一次（未失败的同名任务直接返回原记录）
+        """
+        self.start()
+        with self._lock:
+            if job_id:
+                existing = self.get(job_id)
+                if existing and existing['status'] != 'failed':
+                    return existing
+            job = {
+                'id': job_id or uuid.uuid4().hex,
+                'type': job_type,
+                'work_id': work_id,
+                'status': 'queued',  # queued / running / done / failed
+                'params': params,
+                'result': None,
+                'error': None,
+                'pid': os.getpid(),
+                'created': datetime.now().isoformat(),
+                'started': None,
+                'finished': None
+            }
+            self._save(job)
+            self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        func = self._handlers[job['type']][0]
+        job['status'] = 'running'
+        job['started'] = datetime.now().isoformat()
+        self._save(job)
+        start = time.perf_counter()
+        try:
+            job['result'] = func(job['work_id'], **job['params'])
+            job['status'] = 'done'
+        except Exception as e:
+            logger.error(f"后台任务失败 {job['type']} {job['id']}: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        job['finished'] = datetime.now().isoformat()
+        self._save(job)
+        metrics.observe('smy_function_duration_seconds', time.perf_counter() - start, function=f"job_{job['type']}")
+
+    @staticmethod
+    def _process_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+        return True
+
+    def recover(self):
+        """接管已退出进程遗留的未完成任务，并清理过期的任务记录"""
+        if not os.path.isdir(self.jobs_dir):
+            return
+        lock_file = open(os.path.join(self.jobs_dir, '.recover.lock'), 'w')
+        with lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)  # 多个 worker 同时启动时只接管一次
+            now = time.time()
+            for job in self._jobs():
+                if job['status'] in ('queued', 'running'):
+                    if job['pid'] == os.getpid() or self._process_alive(job['pid']):
+                        continue
+                    handler = self._handlers.get(job['type'])
+                    if handler and handler[1]:
+                        logger.info(f"重新执行中断的后台任务 {job['type']} {job['id']}")
+                        job.update(status='queued', pid=os.getpid())
+                        self._save(job)
+                        self._executor.submit(self._run, job)
+                    else:
+                        job.update(status='failed', error='服务重启，任务中断', finished=datetime.now().isoformat())
+                        self._save(job)
+                        if handler and handler[2]:
+                            try:
+                                handler[2](job['work_id'], **job['params'])
+                            except Exception as e:
+                                logger.error(f"清理中断的后台任务失败 {job['type']} {job['id']}: {e}")
+                elif job['finished'] and now - datetime.fromisoformat(job['finished']).timestamp() > self.retention:
+                    try:
+                        os.remove(self._path(job['id']))
+                    except OSError:
+                        pass
+
+    def pending(self):
+        """
+        {作品ID: [未完成的任务类型]}
+        任务记录都用 os.replace 写入，任务目录的 mtime 随之变化：mtime 不变时直接返回上次的结果，
+        变化时只重新读取大小或 mtime 有变化的记录。mtime 离现在不到 1 秒时同一时钟粒度内可能还有写入，
+        此时不使用上次的结果（与 git 处理“racy”索引的方式相同）
+        """
+        try:
+            mtime = os.stat(self.jobs_dir).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        with self._index_lock:
+            if mtime == self._index_mtime and time.time_ns() - mtime > 1_000_000_000:
+                return self._pending
+            index = {}
+            for name in os.listdir(self.jobs_dir):
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.jobs_dir, name))
+                except FileNotFoundError:
+                    continue  # 过期记录刚被删除
+                cached = self._index.get(name)
+                if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+                    index[name] = cached
+                    continue
+                job = self.get(name[:-5])
+                if job:
+                    index[name] = (st.st_mtime_ns, st.st_size, (job['status'], job['work_id'], job['type']))
+            result = {}
+            for _mtime, _size, (status, work_id, job_type) in index.values():
+                if status in ('queued', 'running') and work_id:
+                    result.setdefault(work_id, []).append(job_type)
+            self._index, self._index_mtime, self._pending = index, mtime, result
+            return result
+
+    def shutdown(self, wait=True):
+        """停止接收任务，wait 时等待正在执行的任务完成"""
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=wait)
+
+
+job_queue = JobQueue(os.path.join(DATA_DIR, 'jobs'))
+
+@app.before_request
+def start_job_queue():
+    # 线程池在每个 worker 进程处理第一个请求时启动（preload 后 fork 出的进程不继承线程）
+    job_queue.start()
+
+def job_accepted(job, message, **extra):
+    """任务已提交：返回 202，Location 指向任务状态接口"""
+    response = jsonify({'success': True, 'message': message, 'job_id': job['id'], 'status': job['status'], **extra})
+    response.status_code = 202
+    response.headers['Location'] = f"/api/admin/jobs/{job['id']}"
+    return response
+
+@app.route('/api/admin/jobs/<job_id>', methods=['GET'])
+def admin_get_job(job_id):
+    """管理员查询后台任务状态"""
+    if not verify_admin_token():
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+    
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': '任务不存在'}), 404
+    return jsonify({'success': True, 'data': job})
+
+@job_queue.handler('generate_derivatives', resumable=True)
+def run_generate_derivatives(work_id, filenames=None, sizes=None):
+    """生成图片缩略图，filenames 为空时处理全部截图，sizes 为 [(宽度, 格式)]"""
+    if filenames is None:
+        config = works_catalog.get(work_id)
+        filenames = config.get('作品截图', []) if config else []
+    if sizes is None:
+        sizes = [(width, 'webp') for width in THUMBNAIL_WIDTHS]
+    generated = 0
+    for filename in filenames:
+        for width, fmt in sizes:
+            if get_image_derivative(work_id, filename, width, fmt):
+                generated += 1
+    return {'generated': generated}
+
+@app.route('/api/admin/works/<work_id>/derivatives', methods=['POST'])
+def admin_generate_derivatives(work_id):
+    """管理员为作品的全部截图（重新）生成缩略图"""
+    if not verify_admin_token():
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+    if not work_config_store.exists(work_id):
+        return jsonify({'success': False, 'message': '作品不存在'}), 404
+    
+    job = job_queue.submit('generate_derivatives', work_id)
+    return job_accepted(job, '正在生成缩略图')
+
+def archive_compression(filename):
+    """已压缩的文件直接存储，其余使用 deflate"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+@job_queue.handler('build_archive', resumable=True)
+def run_build_archive(work_id, name):
+    """把作品目录（配置和全部文件，不含缩略图和上传暂存）打包到 DATA_DIR/archives/<name>"""
+    work_dir = os.path.join(WORKS_DIR, work_id)
+    archive_dir = os.path.join(DATA_DIR, 'archives')
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, name)
+    temp_path = path + '.tmp'
+    skipped_dirs = {DERIVATIVE_SUBDIR, UPLOAD_STAGING_SUBDIR}
+    with zipfile.ZipFile(temp_path, 'w', allowZip64=True) as archive:
+        config = work_config_store.read(work_id)
+        if config is None:
+            raise FileNotFoundError(work_config_store.path(work_id))
+        archive.writestr(f'{work_id}/work_config.json', dump_config_json(config),
+                         compress_type=zipfile.ZIP_DEFLATED)
+        for root, dirs, files in os.walk(work_dir):
+            dirs[:] = [d for d in dirs if d not in skipped_dirs]
+            for filename in files:
+                if filename.startswith('.') or filename.startswith('work_config.json'):
+                    continue
+                file_path = os.path.join(root, filename)
+                arcname = os.path.join(work_id, os.path.relpath(file_path, work_dir))
+                archive.write(file_path, arcname, compress_type=archive_compression(filename))
+    os.replace(temp_path, path)
+    return {'archive': name, 'size': os.path.getsize(path), 'url': f'/api/admin/archives/{name}'}
+
+@app.route('/api/admin/works/<work_id>/archive', methods=['POST'])
+def admin_build_archive(work_id):
+    """管理员打包作品（用于备份/迁移），完成后从任务结果中的 url 下载"""
+    if not verify_admin_token():
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+    if not work_config_store.exists(work_id):
+        return jsonify({'success': False, 'message': '作品不存在'}), 404
+    
+    name = f"{work_id}-{datetime.now().strftime('%Y%m%d%H%M%S')}.zip"
+    job = job_queue.submit('build_archive', work_id, name=name)
+    return job_accepted(job, '正在打包')
+
+@app.route('/api/admin/archives/<name>', methods=['GET'])
+def admin_download_archive(name):
+    """管理员下载打包好的作品"""
+    if not verify_admin_token():
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+    
+    path = safe_join(os.path.join(DATA_DIR, 'archives'), name)
+    if not path or not name.endswith('.zip') or not os.path.isfile(path):
+        return jsonify({'success': False, 'message': '文件不存在'}), 404
+    return send_file(path, as_attachment=True, download_name=name, conditional=True)
 
 
 
@@ -401,12 +3256,24 @@ def admin_get_works():
     if not verify_admin_token():
         return jsonify({'success': False, 'message': '权限不足'}), 403
     
-    works = get_all_works()
-    return jsonify({
-        'success': True,
-        'data': works,
-        'total': len(works)
-    })
+    sort_field = get_sort_field()
+    if not sort_field:
+        return jsonify({'success': False, 'message': '不支持的排序方式'}), 400
+    works = sorted_works(sort_field)
+    
+    # 还有后台任务未完成的作品（例如上传的文件还在处理中）单独返回 {作品ID: 任务}，
+    # 不放进作品配置里，以免编辑器保存时写回配置
+    return jsonify(build_list_response(works, public=False, pending_jobs=job_queue.pending()))
+
+# 由服务端维护的字段（文件登记、统计数据等），管理员编辑作品时以现有配置为准
+SERVER_FIELDS = INTERNAL_FIELDS + tuple(STAT_FIELDS) + ('作品ID', '上传时间', '更新时间')
+# 读取时生成的字段，不保存到配置中
+GENERATED_FIELDS = ('下载链接', '图片链接', '视频链接', '处理中任务')
+
+def editable_fields(data):
+    """请求体中管理员可以修改的字段"""
+    return {key: value for key, value in data.items()
+            if key not in SERVER_FIELDS and key not in GENERATED_FIELDS}
 
 @app.route('/api/admin/works/<work_id>', methods=['PUT'])
 def admin_update_work(work_id):
@@ -415,30 +3282,30 @@ def admin_update_work(work_id):
         return jsonify({'success': False, 'message': '权限不足'}), 403
     
     try:
-        data = request.get_json()
-        work_dir = os.path.join(WORKS_DIR, work_id)
-        config_path = os.path.join(work_dir, 'work_config.json')
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'message': '请求格式错误'}), 400
         
-        if not os.path.exists(config_path):
+        if not work_config_store.exists(work_id):
             return jsonify({'success': False, 'message': '作品不存在'}), 404
         
-        # 读取现有配置获取当前统计数据
-        with open(config_path, 'r', encoding='utf-8') as f:
-            current_config = json.load(f)
-        
-        # 确保统计字段存在并保持原值
-        stat_fields = ['作品下载量', '作品浏览量', '作品点赞量', '作品更新次数']
-        for field in stat_fields:
-            if field not in data:
-                data[field] = current_config.get(field, 0)
-        
-        # 更新时间和更新次数
-        data['更新时间'] = datetime.now().isoformat()
-        data['作品更新次数'] = current_config.get('作品更新次数', 0) + 1
-        
-        # 保存配置文件
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # 请求体是编辑器打开时的快照：只合并可编辑的字段，文件登记和统计数据保留现有配置中的值
+        # （未落盘的计数之后由 stats_counter 累加到配置上，不会丢失）
+        with work_config_store.lock(work_id):
+            current_config = work_config_store.read(work_id)
+            if current_config is None:
+                return jsonify({'success': False, 'message': '作品不存在'}), 404
+            current_config.update(editable_fields(data))
+            # 清除旧版本误写入配置的生成字段
+            for field in GENERATED_FIELDS:
+                current_config.pop(field, None)
+            
+            # 更新时间和更新次数
+            current_config['更新时间'] = datetime.now().isoformat()
+            current_config['作品更新次数'] = current_config.get('作品更新次数', 0) + 1
+            
+            # 保存配置文件
+            work_config_store.write(work_id, current_config)
         
         return jsonify({'success': True, 'message': '更新成功'})
     
@@ -457,14 +3324,112 @@ def admin_delete_work(work_id):
         if not os.path.exists(work_dir):
             return jsonify({'success': False, 'message': '作品不存在'}), 404
         
-        # 删除整个作品目录
-        shutil.rmtree(work_dir)
+        # 先把作品目录改名到回收目录（同盘改名，瞬间完成，作品立即从列表中消失），
+        # 再由后台任务删除文件
+        trash_dir = os.path.join(WORKS_DIR, TRASH_SUBDIR)
+        os.makedirs(trash_dir, exist_ok=True)
+        trash_path = os.path.join(trash_dir, f'{work_id}.{uuid.uuid4().hex}')
+        os.rename(work_dir, trash_path)
+        work_config_store.delete(work_id)
         
-        return jsonify({'success': True, 'message': '删除成功'})
+        job = job_queue.submit('delete_work', work_id, trash_path=trash_path)
+        return job_accepted(job, '删除成功')
     
     except Exception as e:
         return jsonify({'success': False, 'message': f'删除失败: {str(e)}'}), 500
 
+@job_queue.handler('delete_work', resumable=True)
+def run_delete_work(work_id, trash_path):
+    """删除回收目录中的作品文件，并回收不再被引用的 blob"""
+    shutil.rmtree(trash_path, ignore_errors=True)
+    gc_blobs()
+
+def batch_work_id(value):
+    """批量接口中的作品ID（来自请求体而不是URL，需要排除路径分隔符和隐藏目录）"""
+    if isinstance(value, str) and value and os.path.basename(value) == value and not value.startswith('.'):
+        return value
+    return None
+
+@app.route('/api/admin/works/batch', methods=['POST'])
+def admin_batch_works():
+    """
+    管理员批量修改/删除作品：
+        {"update": [{"作品ID": "...", "作品分类": "游戏"}, ...], "delete": ["作品ID", ...]}
+    update 只需给出要修改的字段（与现有配置合并），同一作品的多个修改合并后配置只写一次；
+    删除的作品立即从列表中消失，文件由一个后台任务统一清理；返回逐项结果 results
+    """
+    if not verify_admin_token():
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    updates = data.get('update') or []
+    deletes = data.get('delete') or []
+    if not isinstance(updates, list) or not isinstance(deletes, list) or not (updates or deletes):
+        return jsonify({'success': False, 'message': '请求格式错误'}), 400
+    
+    results = []
+    patches = OrderedDict()  # {作品ID: 合并后的修改}
+    for patch in updates:
+        work_id = batch_work_id(patch.get('作品ID')) if isinstance(patch, dict) else None
+        if not work_id:
+            results.append({'作品ID': patch.get('作品ID') if isinstance(patch, dict) else None,
+                            'action': 'update', 'success': False, 'message': '作品ID无效'})
+            continue
+        patches.setdefault(work_id, {}).update(patch)
+    
+    for work_id, patch in patches.items():
+        result = {'作品ID': work_id, 'action': 'update'}
+        try:
+            with work_config_store.lock(work_id):
+                config = work_config_store.read(work_id)
+                if config is None:
+                    result.update(success=False, message='作品不存在')
+                else:
+                    config.update(editable_fields(patch))
+                    config['更新时间'] = datetime.now().isoformat()
+                    config['作品更新次数'] = config.get('作品更新次数', 0) + 1
+                    work_config_store.write(work_id, config)
+                    result.update(success=True, message='更新成功')
+        except Exception as e:
+            result.update(success=False, message=f'更新失败: {str(e)}')
+        results.append(result)
+    
+    trash_dir = os.path.join(WORKS_DIR, TRASH_SUBDIR)
+    trash_paths = []
+    for value in deletes:
+        work_id = batch_work_id(value)
+        if work_id and work_id in (result['作品ID'] for result in results if result['action'] == 'delete'):
+            continue  # 重复的删除项
+        result = {'作品ID': value, 'action': 'delete'}
+        work_dir = os.path.join(WORKS_DIR, work_id) if work_id else None
+        if not work_dir or not os.path.isdir(work_dir):
+            result.update(success=False, message='作品不存在')
+        else:
+            try:
+                os.makedirs(trash_dir, exist_ok=True)
+                trash_path = os.path.join(trash_dir, f'{work_id}.{uuid.uuid4().hex}')
+                os.rename(work_dir, trash_path)
+                work_config_store.delete(work_id)
+                trash_paths.append(trash_path)
+                result.update(success=True, message='删除成功')
+            except Exception as e:
+                result.update(success=False, message=f'删除失败: {str(e)}')
+        results.append(result)
+    
+    response = {'success': all(result['success'] for result in results),
+                'message': f"{sum(1 for result in results if result['success'])}/{len(results)} 项操作成功",
+                'results': results}
+    if trash_paths:
+        response['job_id'] = job_queue.submit('delete_works', trash_paths=trash_paths)['id']
+    return jsonify(response)
+
+@job_queue.handler('delete_works', resumable=True)
+def run_delete_works(work_id, trash_paths):
+    """批量删除后清理回收目录中的作品文件，只回收一次 blob"""
+    for trash_path in trash_paths:
+        shutil.rmtree(trash_path, ignore_errors=True)
+    gc_blobs()
+
 @app.route('/api/admin/works', methods=['POST'])
 def admin_create_work():
     """管理员创建新作品"""
@@ -481,7 +3446,7 @@ def admin_create_work():
         work_dir = os.path.join(WORKS_DIR, work_id)
         
         # 检查作品是否已存在
-        if os.path.exists(work_dir):
+        if os.path.exists(work_dir) or work_config_store.exists(work_id):
             return jsonify({'success': False, 'message': '作品ID已存在'}), 409
         
         # 创建作品目录结构
@@ -520,18 +3485,647 @@ def admin_create_work():
         }
         
         # 保存配置文件
-        config_path = os.path.join(work_dir, 'work_config.json')
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
+        with work_config_store.lock(work_id):
+            work_config_store.write(work_id, config)
         
         return jsonify({'success': True, 'message': '创建成功', 'work_id': work_id})
     
     except Exception as e:
         return jsonify({'success': False, 'message': f'创建失败: {str(e)}'}), 500
 
+#==============================上传辅助函数===============================
+def upload_save_dir(work_dir, file_type, platform=None):
+    """上传文件的保存目录"""
+    if file_type == 'platform':
+        return os.path.join(work_dir, 'platform', platform)
+    return os.path.join(work_dir, file_type)
+
+def existing_upload_names(config, file_type, platform=None):
+    """配置中已登记的同类文件名"""
+    if file_type == 'image':
+        return config.get('作品截图', [])
+    if file_type == 'video':
+        return config.get('作品视频', [])
+    return config.get('文件名称', {}).get(platform, [])
+
+def unique_upload_filename(existing_names, base_name):
+    """尝试使用原始文件名，如果重复则添加序号"""
+    filename = base_name
+    counter = 1
+    while filename in existing_names:
+        name_part, ext_part = os.path.splitext(base_name)
+        filename = f"{name_part}_{counter}{ext_part}"
+        counter += 1
+    return filename
+
+def save_upload_stream(stream, staging_dir):
+    """把上传的文件流分块写入暂存区，同时计算 SHA-256，返回 (暂存文件路径, 大小, sha256)"""
+    os.makedirs(staging_dir, exist_ok=True)
+    sha256 = hashlib.sha256()
+    total_size = 0
+    with tempfile.NamedTemporaryFile(dir=staging_dir, suffix='.part', delete=False) as temp_file:
+        try:
+            for chunk in iter(lambda: stream.read(UPLOAD_BUFFER_SIZE), b''):
+                temp_file.write(chunk)
+                sha256.update(chunk)
+                total_size += len(chunk)
+        except Exception:
+            temp_file.close()
+            os.remove(temp_file.name)
+            raise
+    return temp_file.name, total_size, sha256.hexdigest()
+
+class StagedUploadFile:
+    """
+    接收 multipart 表单中一个文件的暂存文件：解析表单时直接写入作品目录的上传暂存区并计算 SHA-256，
+    代替 Werkzeug 默认写到系统临时目录（大文件）的 SpooledTemporaryFile，省去一次完整的复制
+    """
+
+    def __init__(self, staging_dir):
+        os.makedirs(staging_dir, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=staging_dir, suffix='.part', delete=False)
+        self.name = self._file.name
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._claimed = False
+
+    def write(self, data):
+        self._sha256.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        # seek/read/close 等交给底层文件
+        return getattr(self._file, name)
+
+    def claim(self):
+        """取走暂存文件，返回 (暂存文件路径, 大小, sha256)，请求结束时不再删除"""
+        self._claimed = True
+        self._file.close()
+        return self.name, self.size, self._sha256.hexdigest()
+
+    def discard(self):
+        """请求结束时删除没有被取走的暂存文件"""
+        self._file.close()
+        if not self._claimed:
+            try:
+                os.remove(self.name)
+            except FileNotFoundError:
+                pass
+
+
+class UploadRequest(app.request_class):
+    """
+    上传接口的表单文件由 StagedUploadFile 接收（已验证管理员身份、作品目录存在时），
+    请求结束时删除未被接口取走的暂存文件；其他请求保持 Werkzeug 的默认行为
+    """
+
+    UPLOAD_ENDPOINTS = ('admin_upload_file', 'admin_upload_files')
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint in self.UPLOAD_ENDPOINTS and verify_admin_token():
+            work_dir = safe_join(WORKS_DIR, self.view_args.get('work_id', ''))
+            if work_dir and os.path.isdir(work_dir):
+                stream = StagedUploadFile(os.path.join(work_dir, UPLOAD_STAGING_SUBDIR))
+                self.__dict__.setdefault('_staged_uploads', []).append(stream)
+                return stream
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for stream in self.__dict__.get('_staged_uploads', ()):
+                stream.discard()
+
+
+app.request_class = UploadRequest
+
+def take_uploaded_file(file, staging_dir):
+    """取得表单中上传的文件，返回 (暂存文件路径, 大小, sha256)；未经 StagedUploadFile 接收时复制到暂存区"""
+    if isinstance(file.stream, StagedUploadFile):
+        return file.stream.claim()
+    return save_upload_stream(file.stream, staging_dir)
+
+def record_uploaded_file(config, file_type, platform, filename, original_filename, sha256=None, size=None):
+    """把上传完成的文件登记到作品配置中"""
+    if file_type == 'image':
+        if filename not in config.get('作品截图', []):
+            config.setdefault('作品截图', []).append(filename)
+        if not config.get('作品封面'):
+            config['作品封面'] = filename
+    elif file_type == 'video':
+        if filename not in config.get('作品视频', []):
+            config.setdefault('作品视频', []).append(filename)
+    elif file_type == 'platform':
+        config.setdefault('文件名称', {}).setdefault(platform, [])
+        if filename not in config['文件名称'][platform]:
+            config['文件名称'][platform].append(filename)
+    # 记录原始文件名映射
+    config.setdefault('原始文件名', {})
+    config['原始文件名'][filename] = original_filename
+    # 记录文件内容哈希和大小（按文件位置登记，不同平台可以有同名文件）
+    if sha256:
+        config.setdefault('文件信息', {})
+        config['文件信息'][file_info_key(file_type, platform, filename)] = {'sha256': sha256, '大小': size}
+    config['更新时间'] = datetime.now().isoformat()
+
+def file_info_key(file_type, platform, filename):
+    """文件在 文件信息 中的键：image/<文件名>、video/<文件名> 或 platform/<平台>/<文件名>"""
+    if file_type == 'platform':
+        return f'platform/{platform}/{filename}'
+    return f'{file_type}/{filename}'
+
+def pop_file_info(config, file_type, platform, filename, file_path):
+    """
+    移除文件的 文件信息 记录并返回其 sha256（应在删除文件之前调用）
+    旧版本以文件名为键的记录可能属于其他平台的同名文件，只有确认该文件就是对应 blob 的硬链接时才采用
+    """
+    file_info = config.get('文件信息', {})
+    entry = file_info.pop(file_info_key(file_type, platform, filename), None)
+    if entry is None:
+        legacy = file_info.get(filename)
+        if legacy and is_blob_link(file_path, legacy.get('sha256')):
+            entry = file_info.pop(filename)
+    return entry.get('sha256') if entry else None
+
+
+#==============================内容寻址存储===============================
+# 上传的文件按 SHA-256 存放在 BLOB_DIR/<前两位>/<哈希>，作品目录中的文件是指向它的硬链接，
+# 相同内容（例如多个平台共用的安装包、重复的截图）只占用一份磁盘空间
+def blob_path(sha256):
+    return os.path.join(BLOB_DIR, sha256[:2], sha256)
+
+def hash_file(path):
+    """计算文件的 SHA-256"""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_BUFFER_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+_blob_thread_lock = threading.Lock()
+
+@contextmanager
+def blob_lock():
+    """
+    blob 存储的全局锁（可跨进程）：链接和回收 blob 互斥，
+    避免回收在“检查 blob 存在”和“建立硬链接”之间删掉它
+    """
+    with _blob_thread_lock:
+        fd = None
+        if fcntl:
+            os.makedirs(BLOB_DIR, exist_ok=True)
+            fd = os.open(os.path.join(BLOB_DIR, '.lock'), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+@functools.lru_cache(maxsize=None)
+def blob_store_enabled():
+    """
+    BLOB_DIR 与 WORKS_DIR 在同一文件系统上时才启用 blob 存储（硬链接不能跨文件系统），
+    否则上传的文件直接放入作品目录、不做内容去重，避免同一文件在两处各占一份空间；结果只检查一次
+    """
+    try:
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        os.makedirs(WORKS_DIR, exist_ok=True)
+        if os.stat(BLOB_DIR).st_dev == os.stat(WORKS_DIR).st_dev:
+            return True
+        logger.warning(f"{BLOB_DIR} 与 {WORKS_DIR} 不在同一文件系统上，无法使用硬链接，已停用内容去重存储")
+    except OSError as e:
+        logger.warning(f"无法使用 blob 存储目录 {BLOB_DIR}，已停用内容去重存储: {e}")
+    return False
+
+def blob_exists(sha256, size):
+    """blob 存储中是否已有该内容"""
+    if not blob_store_enabled():
+        return False
+    try:
+        return os.path.getsize(blob_path(sha256)) == size
+    except OSError:
+        return False
+
+def link_blob(sha256, source_path, target_path):
+    """
+    把 source_path 存入 blob 存储（相同内容已存在时删除 source_path），再在 target_path 建立硬链接；
+    source_path 为 None 时只链接已有的 blob。先建立链接再删除 source_path，
+    并与 release_blob 互斥，链接期间 blob 不会被回收。
+    blob 存储停用或无法建立硬链接时把文件直接放到 target_path，不保留第二份副本
+    """
+    if not blob_store_enabled():
+        shutil.move(source_path, target_path)
+        return
+    path = blob_path(sha256)
+    with blob_lock():
+        created = False
+        if source_path and not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.move(source_path, path)
+            source_path, created = None, True
+        try:
+            os.link(path, target_path)
+        except OSError as e:
+            if not source_path and not created:
+                raise  # 秒传的 blob 已不存在，需要重新上传
+            # blob 只属于这次上传（或仍有暂存文件），把文件本身移到作品目录
+            logger.warning(f"无法创建硬链接，文件不经过 blob 存储: {e}")
+            shutil.move(source_path or path, target_path)
+            return
+        if source_path:
+            os.remove(source_path)
+
+def is_blob_link(path, sha256):
+    """path 是否为该 blob 的硬链接"""
+    if not sha256:
+        return False
+    try:
+        return os.path.samefile(path, blob_path(sha256))
+    except OSError:
+        return False
+
+def _release_blob(path):
+    # 调用方应持有 blob_lock
+    try:
+        if os.stat(path).st_nlink <= 1:
+            os.remove(path)
+    except OSError:
+        pass
+
+def release_blob(sha256):
+    """作品中已没有文件引用该 blob 时删除它"""
+    if not sha256 or not blob_store_enabled():
+        return
+    with blob_lock():
+        _release_blob(blob_path(sha256))
+
+def gc_blobs():
+    """删除所有未被引用的 blob（删除整个作品后调用）"""
+    if not os.path.isdir(BLOB_DIR) or not blob_store_enabled():
+        return
+    with blob_lock():
+        for prefix in os.listdir(BLOB_DIR):
+            prefix_dir = os.path.join(BLOB_DIR, prefix)
+            if os.path.isdir(prefix_dir):
+                for name in os.listdir(prefix_dir):
+                    _release_blob(os.path.join(prefix_dir, name))
+
+def find_duplicate_upload(config, file_type, platform, sha256):
+    """同一位置已登记了相同内容的文件时返回其文件名"""
+    file_info = config.get('文件信息', {})
+    for name in existing_upload_names(config, file_type, platform):
+        if file_info.get(file_info_key(file_type, platform, name), {}).get('sha256') == sha256:
+            return name
+    return None
+
+def finalize_uploads(work_id, file_type, platform, items):
+    """
+    完成一批上传：逐个存入 blob 存储、链接到作品目录并登记，全部处理完后只写一次配置文件
+    items 为 [{'original_filename', 'source_path', 'sha256', 'size'}]，source_path 为 None 表示内容已在 blob 存储中（秒传）；
+    返回与 items 一一对应的结果 {'filename', 'deduplicated'} 或 {'error'}，单个文件失败不影响其他文件
+    """
+    work_dir = os.path.join(WORKS_DIR, work_id)
+    results = []
+    with work_config_store.lock(work_id):
+        config = work_config_store.read(work_id)
+        if config is None:
+            raise FileNotFoundError(work_config_store.path(work_id))
+        
+        recorded = []  # 本批新登记的文件名
+        for item in items:
+            source_path = item.get('source_path')
+            try:
+                # 同一位置已有相同内容，直接复用（不改动配置）
+                duplicate = find_duplicate_upload(config, file_type, platform, item['sha256'])
+                if duplicate:
+                    if source_path:
+                        os.remove(source_path)
+                    results.append({'filename': duplicate, 'deduplicated': True})
+                    continue
+                
+                deduplicated = blob_exists(item['sha256'], item['size'])
+                save_dir = upload_save_dir(work_dir, file_type, platform)
+                filename = unique_upload_filename(existing_upload_names(config, file_type, platform),
+                                                  safe_filename(item['original_filename']))
+                os.makedirs(save_dir, exist_ok=True)
+                final_file_path = os.path.join(save_dir, filename)
+                link_blob(item['sha256'], source_path, final_file_path)
+                logger.info(f"文件移动到最终位置完成: {final_file_path}")
+                
+                record_uploaded_file(config, file_type, platform, filename, item['original_filename'],
+                                     item['sha256'], item['size'])
+                recorded.append(filename)
+                results.append({'filename': filename, 'deduplicated': deduplicated})
+            except Exception as e:
+                if source_path and os.path.exists(source_path):
+                    os.remove(source_path)
+                logger.error(f"登记上传文件失败 {item['original_filename']}: {e}")
+                results.append({'error': str(e)})
+        
+        if recorded:
+            work_config_store.write(work_id, config)
+    
+    # 后台预生成封面缩略图
+    if file_type == 'image' and COVER_THUMBNAIL and config.get('作品封面') in recorded:
+        job_queue.submit('generate_derivatives', work_id, filenames=[config['作品封面']],
+                         sizes=[list(COVER_THUMBNAIL)])
+    return results
+
+def finalize_upload(work_id, file_type, platform, original_filename, source_path, sha256, size):
+    """完成单个文件的上传，返回 (文件名, 是否为重复内容)"""
+    result, = finalize_uploads(work_id, file_type, platform, [{
+        'original_filename': original_filename, 'source_path': source_path, 'sha256': sha256, 'size': size
+    }])
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    return result['filename'], result['deduplicated']
+
+def discard_staged_uploads(work_id, source_path=None, items=(), **params):
+    """上传任务因服务重启中断时删除它的暂存文件（任务不能重新执行，暂存文件不会再被使用）"""
+    for path in [source_path] + [item.get('source_path') for item in items]:
+        if path:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+@job_queue.handler('finalize_upload', on_abort=discard_staged_uploads)
+def run_finalize_upload(work_id, file_type, platform, original_filename, source_path, sha256, size):
+    """后台完成普通上传（暂存文件在失败时删除）"""
+    try:
+        filename, deduplicated = finalize_upload(work_id, file_type, platform, original_filename,
+                                                 source_path, sha256, size)
+    except Exception:
+        if source_path and os.path.exists(source_path):
+            os.remove(source_path)
+        raise
+    logger.info(f"文件上传成功: {filename}, 大小: {size} bytes")
+    return {'filename': filename, 'file_size': size, 'deduplicated': deduplicated}
+
+
+#==============================分块断点续传===============================
+# 会话文件都放在作品目录下的 UPLOAD_STAGING_SUBDIR 中：
+#   <upload_id>.json    会话信息
+#   <upload_id>.part    预分配大小的暂存文件，各分块按偏移直接写入（可并行）
+#   <upload_id>.<n>.ok  第 n 块已写完的标记，多进程下也无需加锁
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+def is_positive_int(value):
+    """JSON 中的正整数（排除 true/false 和浮点数）"""
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+def _upload_session_paths(work_id, upload_id):
+    staging_dir = os.path.join(WORKS_DIR, work_id, UPLOAD_STAGING_SUBDIR)
+    return (staging_dir,
+            os.path.join(staging_dir, f'{upload_id}.json'),
+            os.path.join(staging_dir, f'{upload_id}.part'))
+
+def load_upload_session(work_id, upload_id):
+    """读取上传会话，不存在时返回 None"""
+    if not UPLOAD_ID_PATTERN.match(upload_id):
+        return None
+    _, meta_path, _ = _upload_session_paths(work_id, upload_id)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def upload_session_received(session):
+    """已写完的分块序号"""
+    staging_dir, _, _ = _upload_session_paths(session['work_id'], session['upload_id'])
+    prefix = session['upload_id'] + '.'
+    received = set()
+    for name in os.listdir(staging_dir):
+        if name.startswith(prefix) and name.endswith('.ok'):
+            try:
+                received.add(int(name[len(prefix):-3]))
+            except ValueError:
+                pass
+    return received
+
+def remove_upload_session(work_id, upload_id):
+    """删除会话的全部暂存文件"""
+    staging_dir, _, _ = _upload_session_paths(work_id, upload_id)
+    if not os.path.isdir(staging_dir):
+        return
+    for name in os.listdir(staging_dir):
+        if name.startswith(upload_id + '.'):
+            try:
+                os.remove(os.path.join(staging_dir, name))
+            except OSError:
+                pass
+
+def cleanup_stale_upload_sessions(work_id):
+    """清理超过 UPLOAD_SESSION_TTL 未完成的上传会话"""
+    staging_dir, _, _ = _upload_session_paths(work_id, '')
+    if not os.path.isdir(staging_dir):
+        return
+    now = time.time()
+    for name in os.listdir(staging_dir):
+        path = os.path.join(staging_dir, name)
+        try:
+            if now - os.path.getmtime(path) > UPLOAD_SESSION_TTL:
+                os.remove(path)
+        except OSError:
+            pass
+
+@app.route('/api/admin/upload-session/<work_id>/<file_type>', methods=['POST'])
+def admin_init_upload(work_id, file_type):
+    """管理员创建分块上传会话，参数：filename、size、platform（平台文件）、chunk_size、sha256（可选）"""
+    if not verify_admin_token():
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+    
+    if not work_config_store.exists(work_id):
+        return jsonify({'success': False, 'message': '作品不存在'}), 404
+    if file_type not in UPLOAD_FILE_TYPES:
+        return jsonify({'success': False, 'message': '不支持的文件类型'}), 400
+    
+    data = request.get_json(silent=True) or {}
+    original_filename = data.get('filename', '')
+    size = data.get('size')
+    platform = data.get('platform') if file_type == 'platform' else None
+    if not original_filename:
+        return jsonify({'success': False, 'message': '没有选择文件'}), 400
+    if not allowed_file(original_filename):
+        return jsonify({'success': False, 'message': '不支持的文件格式'}), 400
+    if file_type == 'platform' and not platform:
+        return jsonify({'success': False, 'message': '平台参数缺失'}), 400
+    if not is_positive_int(size):
+        return jsonify({'success': False, 'message': '文件大小无效'}), 400
+    if size > app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({
+            'success': False,
+            'message': f'文件太大，最大支持 {app.config["MAX_CONTENT_LENGTH"] // (1024*1024)}MB'
+        }), 413
+    
+    chunk_size = data.get('chunk_size') or UPLOAD_CHUNK_SIZE
+    if not is_positive_int(chunk_size):
+        return jsonify({'success': False, 'message': '分块大小无效'}), 400
+    chunk_size = min(max(chunk_size, 1024 * 1024), UPLOAD_MAX_CHUNK_SIZE)
+    sha256 = data.get('sha256') or None
+    if sha256 is not None:
+        if not isinstance(sha256, str) or not SHA256_PATTERN.match(sha256.lower()):
+            return jsonify({'success': False, 'message': 'sha256 格式错误'}), 400
+        sha256 = sha256.lower()
+    
+    # 提供了 SHA-256 且内容已存在时秒传，无需上传
+    if sha256 and blob_exists(sha256, size):
+        filename, _ = finalize_upload(work_id, file_type, platform, original_filename, None, sha256, size)
+        logger.info(f"秒传完成: {filename}, 大小: {size} bytes")
+        return jsonify({
+            'success': True,
+            'message': '上传成功',
+            'filename': filename,
+            'file_size': size,
+            'deduplicated': True
+        })
+    
+    cleanup_stale_upload_sessions(work_id)
+    upload_id = uuid.uuid4().hex
+    staging_dir, meta_path, part_path = _upload_session_paths(work_id, upload_id)
+    os.makedirs(staging_dir, exist_ok=True)
+    session = {
+        'upload_id': upload_id,
+        'work_id': work_id,
+        'file_type': file_type,
+        'platform': platform,
+        'original_filename': original_filename,
+        'size': size,
+        'chunk_size': chunk_size,
+        'total_chunks': (size + chunk_size - 1) // chunk_size,
+        'sha256': sha256,
+        'created': datetime.now().isoformat()
+    }
+    # 预分配暂存文件，分块可以按任意顺序写入
+    with open(part_path, 'wb') as f:
+        f.truncate(size)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(session, f, ensure_ascii=False)
+    
+    logger.info(f"创建分块上传会话 {upload_id} - 作品ID: {work_id}, 文件: {original_filename}, 大小: {size} bytes")
+    return jsonify({'success': True, **session})
+
+@app.route('/api/admin/upload-session/<work_id>/<upload_id>', methods=['GET'])
+def admin_upload_status(work_id, upload_id):
+    """管理员查询分块上传进度（用于断点续传）"""
+    if not verify_admin_token():
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+    
+    session = load_upload_session(work_id, upload_id)
+    if not session:
+        return jsonify({'success': False, 'message': '上传会话不存在'}), 404
+    
+    received = upload_session_received(session)
+    missing = [index for index in range(session['total_chunks']) if index not in received]
+    return jsonify({
+        'success': True,
+        **session,
+        'received': sorted(received),
+        'missing': missing,
+        'uploaded': session['size'] - sum(
+            min(session['chunk_size'], session['size'] - index * session['chunk_size']) for index in missing
+        )
+    })
+
+@app.route('/api/admin/upload-session/<work_id>/<upload_id>/<int:index>', methods=['PUT'])
+def admin_upload_chunk(work_id, upload_id, index):
+    """管理员上传第 index 块（请求体为原始字节，可带 offset 参数校验位置）"""
+    if not verify_admin_token():
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+    
+    session = load_upload_session(work_id, upload_id)
+    if not session:
+        return jsonify({'success': False, 'message': '上传会话不存在'}), 404
+    if index >= session['total_chunks']:
+        return jsonify({'success': False, 'message': '分块序号无效'}), 400
+    
+    offset = index * session['chunk_size']
+    expected = min(session['chunk_size'], session['size'] - offset)
+    if request.args.get('offset', offset, type=int) != offset:
+        return jsonify({'success': False, 'message': '分块偏移与序号不一致'}), 400
+    if request.content_length is not None and request.content_length != expected:
+        return jsonify({'success': False, 'message': f'分块大小应为 {expected} bytes'}), 400
+    
+    staging_dir, _, part_path = _upload_session_paths(work_id, upload_id)
+    written = 0
+    upload_start = time.perf_counter()
+    with open(part_path, 'r+b', buffering=UPLOAD_BUFFER_SIZE) as f:
+        f.seek(offset)
+        while written < expected:
+            data = request.stream.read(min(UPLOAD_BUFFER_SIZE, expected - written))
+            if not data:
+                break
+            f.write(data)
+            written += len(data)
+    record_upload('chunk', written, time.perf_counter() - upload_start)
+    if written != expected:
+        return jsonify({'success': False, 'message': f'分块不完整：收到 {written} / {expected} bytes'}), 400
+    
+    # 写完后再打标记，中断的分块会在状态查询里显示为缺失
+    open(os.path.join(staging_dir, f'{upload_id}.{index}.ok'), 'w').close()
+    return jsonify({'success': True, 'index': index, 'size': written})
+
+@app.route('/api/admin/upload-session/<work_id>/<upload_id>/commit', methods=['POST'])
+def admin_commit_upload(work_id, upload_id):
+    """管理员完成分块上传：校验分块、移动到最终位置并登记到作品配置"""
+    if not verify_admin_token():
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+    
+    session = load_upload_session(work_id, upload_id)
+    if not session:
+        return jsonify({'success': False, 'message': '上传会话不存在'}), 404
+    
+    received = upload_session_received(session)
+    missing = [index for index in range(session['total_chunks']) if index not in received]
+    if missing:
+        return jsonify({'success': False, 'message': '还有分块未上传', 'missing': missing}), 409
+    
+    # 计算整个文件的哈希可能需要很久，交给后台任务；重复提交返回同一个任务
+    job = job_queue.submit('commit_upload', work_id, job_id=f'commit-{upload_id}', upload_id=upload_id)
+    return job_accepted(job, '正在处理上传的文件', file_size=session['size'])
+
+@job_queue.handler('commit_upload', resumable=True)
+def run_commit_upload(work_id, upload_id):
+    """校验分块上传的完整文件并登记到作品配置（只在提交时更新一次配置文件）"""
+    session = load_upload_session(work_id, upload_id)
+    if not session:
+        raise FileNotFoundError('上传会话不存在')
+    _, _, part_path = _upload_session_paths(work_id, upload_id)
+    sha256 = hash_file(part_path)
+    if session.get('sha256') and session['sha256'] != sha256:
+        remove_upload_session(work_id, upload_id)
+        raise ValueError('文件校验失败，SHA-256 不一致')
+    
+    filename, deduplicated = finalize_upload(work_id, session['file_type'], session['platform'],
+                                             session['original_filename'], part_path, sha256, session['size'])
+    remove_upload_session(work_id, upload_id)
+    
+    logger.info(f"分块上传完成: {filename}, 大小: {session['size']} bytes")
+    return {'filename': filename, 'file_size': session['size'], 'deduplicated': deduplicated}
+
+@app.route('/api/admin/upload-session/<work_id>/<upload_id>', methods=['DELETE'])
+def admin_abort_upload(work_id, upload_id):
+    """管理员取消分块上传"""
+    if not verify_admin_token():
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+    
+    if not load_upload_session(work_id, upload_id):
+        return jsonify({'success': False, 'message': '上传会话不存在'}), 404
+    remove_upload_session(work_id, upload_id)
+    return jsonify({'success': True, 'message': '已取消上传'})
+
 @app.route('/api/admin/upload/<work_id>/<file_type>', methods=['POST'])
 def admin_upload_file(work_id, file_type):
-    """管理员上传文件（优化大文件处理）"""
+    """
+    管理员上传文件（multipart 表单，字段 file）
+    表单中的文件在解析时由 UploadRequest 直接写入作品目录的上传暂存区，不经过系统临时目录
+    """
     if not verify_admin_token():
         return jsonify({'success': False, 'message': '权限不足'}), 403
     
@@ -544,6 +4138,8 @@ def admin_upload_file(work_id, file_type):
             logger.error(f"作品目录不存在: {work_dir}")
             return jsonify({'success': False, 'message': '作品不存在'}), 404
         
+        # 访问 request.files 时才读取请求体，上传耗时从这里开始计算
+        upload_start = time.perf_counter()
         if 'file' not in request.files:
             logger.error("请求中没有文件")
             return jsonify({'success': False, 'message': '没有文件'}), 400
@@ -562,175 +4158,134 @@ def admin_upload_file(work_id, file_type):
             logger.error(f"不支持的文件格式: {original_filename}")
             return jsonify({'success': False, 'message': '不支持的文件格式'}), 400
         
-        # 使用安全的文件名处理函数
-        safe_original_filename = safe_filename(original_filename)
-        file_extension = safe_original_filename.rsplit('.', 1)[1].lower() if '.' in safe_original_filename else 'unknown'
-        
-        logger.info(f"安全处理后的文件名: {safe_original_filename}")
-        
-        # 读取现有配置来生成新文件名
-        config_path = os.path.join(work_dir, 'work_config.json')
-        if not os.path.exists(config_path):
-            logger.error(f"配置文件不存在: {config_path}")
+        if not work_config_store.exists(work_id):
+            logger.error(f"作品配置不存在: {work_id}")
             return jsonify({'success': False, 'message': '作品配置不存在'}), 404
-            
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
         
-        # 根据文件类型确定保存目录和文件名
-        if file_type == 'image':
-            save_dir = os.path.join(work_dir, 'image')
-            existing_images = config.get('作品截图', [])
-            
-            # 尝试使用原始文件名，如果重复则添加序号
-            base_name = safe_original_filename
-            filename = base_name
-            counter = 1
-            while filename in existing_images:
-                name_part, ext_part = os.path.splitext(base_name)
-                filename = f"{name_part}_{counter}{ext_part}"
-                counter += 1
-                
-        elif file_type == 'video':
-            save_dir = os.path.join(work_dir, 'video')
-            existing_videos = config.get('作品视频', [])
-            
-            # 尝试使用原始文件名，如果重复则添加序号
-            base_name = safe_original_filename
-            filename = base_name
-            counter = 1
-            while filename in existing_videos:
-                name_part, ext_part = os.path.splitext(base_name)
-                filename = f"{name_part}_{counter}{ext_part}"
-                counter += 1
-                
-        elif file_type == 'platform':
-            platform = request.form.get('platform')
-            if not platform:
-                logger.error("平台参数缺失")
-                return jsonify({'success': False, 'message': '平台参数缺失'}), 400
-            save_dir = os.path.join(work_dir, 'platform', platform)
-            
-            # 对于平台文件，也尝试保留原始文件名
-            existing_files = config.get('文件名称', {}).get(platform, [])
-            base_name = safe_original_filename
-            filename = base_name
-            counter = 1
-            while filename in existing_files:
-                name_part, ext_part = os.path.splitext(base_name)
-                filename = f"{name_part}_{counter}{ext_part}"
-                counter += 1
-        else:
+        if file_type not in UPLOAD_FILE_TYPES:
             logger.error(f"不支持的文件类型: {file_type}")
             return jsonify({'success': False, 'message': '不支持的文件类型'}), 400
+        platform = request.form.get('platform') if file_type == 'platform' else None
+        if file_type == 'platform' and not platform:
+            logger.error("平台参数缺失")
+            return jsonify({'success': False, 'message': '平台参数缺失'}), 400
         
-        # 确保目录存在
-        os.makedirs(save_dir, exist_ok=True)
-        final_file_path = os.path.join(save_dir, filename)
-        
-        logger.info(f"目标文件路径: {final_file_path}")
-        
-        # 使用临时文件进行流式保存，避免内存溢出
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file_path = temp_file.name
-            logger.info(f"临时文件路径: {temp_file_path}")
-            
-            # 分块读取和写入文件，减少内存使用
-            chunk_size = 8192  # 8KB chunks
-            total_size = 0
-            
-            while True:
-                chunk = file.stream.read(chunk_size)
-                if not chunk:
-                    break
-                temp_file.write(chunk)
-                total_size += len(chunk)
-                
-                # 检查文件大小
-                max_size = 5000 * 1024 * 1024  # 5000MB
-                if total_size > max_size:
-                    logger.error(f"文件太大: {total_size} bytes")
-                    return jsonify({
-                        'success': False, 
-                        'message': f'文件太大，最大支持 {max_size // (1024*1024)}MB，当前文件大小：{total_size // (1024*1024)}MB'
-                    }), 413
-        
+        # 文件已在作品目录内的暂存区（完成后同盘重命名即可），大小由 MAX_CONTENT_LENGTH 限制
+        temp_file_path, total_size, sha256 = take_uploaded_file(file, os.path.join(work_dir, UPLOAD_STAGING_SUBDIR))
+        logger.info(f"临时文件路径: {temp_file_path}")
+        record_upload('form', total_size, time.perf_counter() - upload_start)
         logger.info(f"文件写入临时文件完成，总大小: {total_size} bytes")
         
-        # 移动临时文件到最终位置
-        shutil.move(temp_file_path, final_file_path)
-        temp_file_path = None  # 标记已移动，避免重复删除
-        
-        logger.info(f"文件移动到最终位置完成: {final_file_path}")
-        
-        # 更新配置文件
-        if file_type == 'image':
-            if filename not in config.get('作品截图', []):
-                config.setdefault('作品截图', []).append(filename)
-            # 记录原始文件名映射
-            config.setdefault('原始文件名', {})
-            config['原始文件名'][filename] = original_filename
-            if not config.get('作品封面'):
-                config['作品封面'] = filename
-        elif file_type == 'video':
-            if filename not in config.get('作品视频', []):
-                config.setdefault('作品视频', []).append(filename)
-            # 记录原始文件名映射
-            config.setdefault('原始文件名', {})
-            config['原始文件名'][filename] = original_filename
-        elif file_type == 'platform':
-            platform = request.form.get('platform')
-            config.setdefault('文件名称', {}).setdefault(platform, [])
-            if filename not in config['文件名称'][platform]:
-                config['文件名称'][platform].append(filename)
-            # 记录原始文件名映射
-            config.setdefault('原始文件名', {})
-            config['原始文件名'][filename] = original_filename
-        
-        config['更新时间'] = datetime.now().isoformat()
-        
-        # 原子性更新配置文件
-        temp_config_path = config_path + '.tmp'
-        try:
-            with open(temp_config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
-            shutil.move(temp_config_path, config_path)
-        except Exception as e:
-            # 清理临时配置文件
-            if os.path.exists(temp_config_path):
-                os.remove(temp_config_path)
-            raise e
-        
-        logger.info(f"文件上传成功: {filename}, 大小: {total_size} bytes")
+        # 存入 blob 存储、链接到最终位置并更新配置文件的工作交给后台任务
+        job = job_queue.submit('finalize_upload', work_id, file_type=file_type, platform=platform,
+                               original_filename=original_filename, source_path=temp_file_path,
+                               sha256=sha256, size=total_size)
+        temp_file_path = None  # 由后台任务负责，避免重复删除
         
-        return jsonify({
-            'success': True, 
-            'message': '上传成功',
-            'filename': filename,
-            'file_size': total_size
-        })
+        return job_accepted(job, '上传成功，正在处理', file_size=total_size)
         
     except Exception as e:
         # 清理临时文件
         if temp_file_path and os.path.exists(temp_file_path):
             try:
                 os.remove(temp_file_path)
-            except:
+            except OSError:
                 pass
         
-        logger.error(f"文件上传错误: {str(e)}")
-        logger.error(f"错误类型: {type(e)}")
-        import traceback
-        traceback.print_exc()
-        
         # 特殊处理文件大小超限错误
-        if 'Request Entity Too Large' in str(e) or 'exceeded maximum allowed payload' in str(e):
+        if isinstance(e, RequestEntityTooLarge):
+            logger.error(f"文件太大: {work_id}")
             return jsonify({
                 'success': False, 
-                'message': '文件太大，请选择小于5000MB的文件'
+                'message': f'文件太大，请选择小于{app.config["MAX_CONTENT_LENGTH"] // (1024*1024)}MB的文件'
             }), 413
         
+        logger.exception(f"文件上传错误: {e}")
+        return jsonify({'success': False, 'message': f'上传失败: {str(e)}'}), 500
+
+@app.route('/api/admin/upload/<work_id>/<file_type>/batch', methods=['POST'])
+def admin_upload_files(work_id, file_type):
+    """
+    管理员一次上传多个文件（表单字段 files，可重复）
+    各文件依次写入暂存区，再由一个后台任务统一登记，作品配置只写一次；
+    任务结果中的 results 与上传的文件一一对应
+    """
+    if not verify_admin_token():
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+    
+    if not work_config_store.exists(work_id):
+        return jsonify({'success': False, 'message': '作品不存在'}), 404
+    if file_type not in UPLOAD_FILE_TYPES:
+        return jsonify({'success': False, 'message': '不支持的文件类型'}), 400
+    platform = request.form.get('platform') if file_type == 'platform' else None
+    if file_type == 'platform' and not platform:
+        return jsonify({'success': False, 'message': '平台参数缺失'}), 400
+    
+    files = request.files.getlist('files') or request.files.getlist('file')
+    if not files:
+        return jsonify({'success': False, 'message': '没有文件'}), 400
+    
+    staging_dir = os.path.join(WORKS_DIR, work_id, UPLOAD_STAGING_SUBDIR)
+    items = []
+    total_size = 0
+    upload_start = time.perf_counter()
+    try:
+        for file in files:
+            original_filename = file.filename
+            if not original_filename:
+                items.append({'original_filename': '', 'error': '没有选择文件'})
+            elif not allowed_file(original_filename):
+                items.append({'original_filename': original_filename, 'error': '不支持的文件格式'})
+            else:
+                source_path, size, sha256 = take_uploaded_file(file, staging_dir)
+                items.append({'original_filename': original_filename, 'source_path': source_path,
+                              'sha256': sha256, 'size': size})
+                total_size += size
+            file.close()
+    except Exception as e:
+        for item in items:
+            if item.get('source_path') and os.path.exists(item['source_path']):
+                os.remove(item['source_path'])
+        logger.error(f"批量上传错误: {str(e)}")
         return jsonify({'success': False, 'message': f'上传失败: {str(e)}'}), 500
+    record_upload('batch', total_size, time.perf_counter() - upload_start)
+    
+    accepted = sum(1 for item in items if 'error' not in item)
+    if not accepted:
+        results = [{'original_filename': item['original_filename'], 'success': False, 'message': item['error']}
+                   for item in items]
+        return jsonify({'success': False, 'message': '没有可上传的文件', 'results': results}), 400
+    
+    job = job_queue.submit('finalize_uploads', work_id, file_type=file_type, platform=platform, items=items)
+    return job_accepted(job, f'已接收 {accepted} 个文件，正在处理', file_count=accepted, total_size=total_size)
+
+@job_queue.handler('finalize_uploads', on_abort=discard_staged_uploads)
+def run_finalize_uploads(work_id, file_type, platform, items):
+    """后台登记批量上传的文件，返回逐个文件的结果"""
+    accepted = [item for item in items if 'error' not in item]
+    try:
+        outcomes = iter(finalize_uploads(work_id, file_type, platform, accepted))
+    except Exception:
+        for item in accepted:
+            if os.path.exists(item['source_path']):
+                os.remove(item['source_path'])
+        raise
+    
+    results = []
+    for item in items:
+        result = {'original_filename': item['original_filename']}
+        outcome = {'error': item['error']} if 'error' in item else next(outcomes)
+        if 'error' in outcome:
+            result.update(success=False, message=outcome['error'])
+        else:
+            result.update(success=True, filename=outcome['filename'], file_size=item['size'],
+                          deduplicated=outcome['deduplicated'])
+        results.append(result)
+    
+    succeeded = sum(1 for result in results if result['success'])
+    logger.info(f"批量上传完成: {work_id}, {succeeded}/{len(results)} 个文件成功")
+    return {'success': succeeded == len(results), 'message': f'{succeeded}/{len(results)} 个文件上传成功',
+            'results': results}
 
 @app.route('/api/admin/delete-file/<work_id>/<file_type>/<filename>', methods=['DELETE'])
 def admin_delete_file(work_id, file_type, filename):
@@ -740,9 +4295,8 @@ def admin_delete_file(work_id, file_type, filename):
     
     try:
         work_dir = os.path.join(WORKS_DIR, work_id)
-        config_path = os.path.join(work_dir, 'work_config.json')
         
-        if not os.path.exists(config_path):
+        if not work_config_store.exists(work_id):
             return jsonify({'success': False, 'message': '作品不存在'}), 404
         
         # 确定文件路径
@@ -758,41 +4312,39 @@ def admin_delete_file(work_id, file_type, filename):
         else:
             return jsonify({'success': False, 'message': '不支持的文件类型'}), 400
         
-        # 删除文件
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        
         # 更新配置文件
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        if file_type == 'image':
-            if filename in config.get('作品截图', []):
-                config['作品截图'].remove(filename)
-            # 清理原始文件名映射
-            if '原始文件名' in config and filename in config['原始文件名']:
-                del config['原始文件名'][filename]
-            if config.get('作品封面') == filename:
-                config['作品封面'] = config['作品截图'][0] if config['作品截图'] else ''
-        elif file_type == 'video':
-            if filename in config.get('作品视频', []):
-                config['作品视频'].remove(filename)
-            # 清理原始文件名映射
-            if '原始文件名' in config and filename in config['原始文件名']:
-                del config['原始文件名'][filename]
-        elif file_type == 'platform':
-            platform = request.args.get('platform')
-            if platform in config.get('文件名称', {}):
-                if filename in config['文件名称'][platform]:
-                    config['文件名称'][platform].remove(filename)
-            # 清理原始文件名映射
-            if '原始文件名' in config and filename in config['原始文件名']:
-                del config['原始文件名'][filename]
-        
-        config['更新时间'] = datetime.now().isoformat()
-        
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
+        with work_config_store.update(work_id) as config:
+            # 删除文件并清理文件哈希记录，blob 不再被引用时一并删除
+            sha256 = pop_file_info(config, file_type, request.args.get('platform'), filename, file_path)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            release_blob(sha256)
+            if file_type == 'image':
+                evict_image_derivatives(work_id, filename)
+            
+            if file_type == 'image':
+                if filename in config.get('作品截图', []):
+                    config['作品截图'].remove(filename)
+                # 清理原始文件名映射
+                if '原始文件名' in config and filename in config['原始文件名']:
+                    del config['原始文件名'][filename]
+                if config.get('作品封面') == filename:
+                    config['作品封面'] = config['作品截图'][0] if config['作品截图'] else ''
+            elif file_type == 'video':
+                if filename in config.get('作品视频', []):
+                    config['作品视频'].remove(filename)
+                # 清理原始文件名映射
+                if '原始文件名' in config and filename in config['原始文件名']:
+                    del config['原始文件名'][filename]
+            elif file_type == 'platform':
+                platform = request.args.get('platform')
+                if platform in config.get('文件名称', {}):
+                    if filename in config['文件名称'][platform]:
+                        config['文件名称'][platform].remove(filename)
+                # 清理原始文件名映射
+                if '原始文件名' in config and filename in config['原始文件名']:
+                    del config['原始文件名'][filename]
+            config['更新时间'] = datetime.now().isoformat()
         
         return jsonify({'success': True, 'message': '删除成功'})
     
@@ -800,4 +4352,5 @@ def admin_delete_file(work_id, file_type, filename):
         return jsonify({'success': False, 'message': f'删除失败: {str(e)}'}), 500
 
 if __name__ == '__main__':
+    # 开发服务器（单进程、开启调试器），生产环境使用 wsgi.py 启动
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,398 @@
+"""
+后端性能基准测试
+
+生成与 后端返回接口.json 相同结构的模拟作品目录，再用 Flask test client 逐个接口压测，
+输出每个接口的 p50/p99 延迟、每秒请求数以及进程内存（RSS），用于发现随作品数量增长的性能退化；
+另外对比列表和详情接口的冷请求（响应缓存失效，需要重新生成响应体）和热请求（命中响应缓存），
+以及全部作品配置用标准库 json / orjson 序列化、解析的耗时和大小
+
+用法：
+    python benchmark.py run                                # 默认 10 / 1000 / 10000 个作品
+    python benchmark.py run --sizes 100,5000 --requests 500 --json result.json
+    python benchmark.py generate /tmp/works --works 1000   # 只生成模拟作品目录
+
+每个规模在独立的子进程中运行（SMY_WORKS_DIR 等环境变量指向临时目录），互不影响，也不会改动真实的 works 目录
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CATEGORIES = ['游戏', '开发工具', '应用', '网站', '其他']
+TAGS = ['AI', '原创', '开源', '休闲', '效率', '代码助手', '像素', '教育', '音乐', '多人', '单机', '工具']
+PLATFORMS = ['Windows', 'Android', 'Linux', 'MacOS', 'Web']
+WORDS = ['智能', '代码', '变量', '像素', '冒险', '音乐', '笔记', '助手', '星球', '花园', '迷宫', '工坊']
+
+ADMIN_TOKEN = 'shumengya520'
+# 上传场景每个文件的大小（字节）
+UPLOAD_SIZE = 256 * 1024
+
+
+#==============================模拟数据生成===============================
+def _shared_payload(cache_dir, name, size):
+    """生成一份指定大小的随机内容文件，各作品通过硬链接共用，避免大规模时占满磁盘"""
+    path = os.path.join(cache_dir, f'{name}.{size}')
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+    return path
+
+
+def _place(source, target, share):
+    if share:
+        try:
+            os.link(source, target)
+            return
+        except OSError:
+            pass
+    shutil.copyfile(source, target)
+
+
+def generate_works(works_dir, count, screenshots=3, tags=4, platforms=3,
+                   image_size=32 * 1024, file_size=1024 * 1024, share_files=True, seed=1):
+    """生成 count 个作品：work_config.json + 截图 + 各平台安装包"""
+    rng = random.Random(seed)
+    os.makedirs(works_dir, exist_ok=True)
+    payload_dir = os.path.join(works_dir, '..', '.bench_payload')
+    os.makedirs(payload_dir, exist_ok=True)
+    image_source = _shared_payload(payload_dir, 'image', image_size)
+    file_source = _shared_payload(payload_dir, 'file', file_size)
+    start = datetime(2024, 1, 1)
+
+    for i in range(count):
+        work_id = f'work{i:05d}'
+        work_dir = os.path.join(works_dir, work_id)
+        for sub in ('image', 'video', 'platform'):
+            os.makedirs(os.path.join(work_dir, sub), exist_ok=True)
+
+        images = [f'image{n + 1}.jpg' for n in range(screenshots)]
+        for name in images:
+            _place(image_source, os.path.join(work_dir, 'image', name), share_files)
+
+        work_platforms = rng.sample(PLATFORMS, min(platforms, len(PLATFORMS)))
+        files = {}
+        for platform in work_platforms:
+            os.makedirs(os.path.join(work_dir, 'platform', platform), exist_ok=True)
+            name = f'{work_id}_{platform.lower()}.zip'
+            _place(file_source, os.path.join(work_dir, 'platform', platform, name), share_files)
+            files[platform] = [name]
+
+        uploaded = start + timedelta(hours=rng.randint(0, 24 * 600))
+        updated = uploaded + timedelta(hours=rng.randint(0, 24 * 60))
+        title = ''.join(rng.sample(WORDS, 2)) + ('工具' if i % 3 else '游戏') + str(i)
+        config = {
+            '作品ID': work_id,
+            '作品作品': title,
+            '作品描述': f'{title}：' + '，'.join(rng.sample(WORDS, 4)) + '，用于基准测试的模拟作品',
+            '作者': '树萌芽',
+            '作品版本号': f'1.{rng.randint(0, 9)}.{rng.randint(0, 9)}',
+            '作品分类': rng.choice(CATEGORIES),
+            '作品标签': rng.sample(TAGS, min(tags, len(TAGS))),
+            '上传时间': uploaded.isoformat(),
+            '更新时间': updated.isoformat(),
+            '支持平台': work_platforms,
+            '文件名称': files,
+            '作品截图': images,
+            '作品视频': [],
+            '作品封面': images[0] if images else '',
+            '作品下载量': rng.randint(0, 5000),
+            '作品浏览量': rng.randint(0, 50000),
+            '作品点赞量': rng.randint(0, 2000),
+            '作品更新次数': rng.randint(0, 20),
+        }
+        with open(os.path.join(work_dir, 'work_config.json'), 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+
+
+#==============================压测===============================
+def rss_kb():
+    """当前常驻内存（KB）"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(client, count, make_request):
+    """执行 count 次请求，返回延迟统计（毫秒）和每秒请求数"""
+    latencies = []
+    statuses = {}
+    started = time.perf_counter()
+    for i in range(count):
+        t0 = time.perf_counter()
+        response = make_request(client, i)
+        response.get_data()  # 读完响应体（文件下载是流式的）
+        response.close()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': count,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'req_per_s': round(count / elapsed, 1) if elapsed else None,
+        'status': {str(code): n for code, n in sorted(statuses.items())},
+    }
+
+
+def client_ip(i):
+    """每个请求使用不同的客户端地址，避免浏览/点赞被防刷逻辑拦下"""
+    return {'REMOTE_ADDR': f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}'}
+
+
+def scenarios(works, requests, rng):
+    """返回 [(名称, 请求次数, 请求函数)]，works 为全部作品配置"""
+    work_ids = [work['作品ID'] for work in works]
+    downloads = [(work['作品ID'], platform, files[0])
+                 for work in works for platform, files in work.get('文件名称', {}).items() if files]
+
+    def pick():
+        return rng.choice(work_ids)
+
+    def download(client, i):
+        work_id, platform, filename = rng.choice(downloads)
+        return client.get(f'/api/download/{work_id}/{platform}/{filename}', environ_overrides=client_ip(i))
+
+    def upload(client, i):
+        data = {'file': (io.BytesIO(os.urandom(UPLOAD_SIZE)), f'bench{i}.png')}
+        return client.post(f'/api/admin/upload/{pick()}/image', query_string={'token': ADMIN_TOKEN},
+                           data=data, content_type='multipart/form-data')
+
+    query = WORDS[0]
+    return [
+        ('GET /api/works', requests, lambda c, i: c.get('/api/works')),
+        ('GET /api/works?page', requests, lambda c, i: c.get('/api/works', query_string={'page': i % 5 + 1, 'page_size': 12})),
+        ('GET /api/search', requests, lambda c, i: c.get('/api/search', query_string={'q': query})),
+        ('GET /api/categories', requests, lambda c, i: c.get('/api/categories')),
+        ('GET /api/works/<id>', requests, lambda c, i: c.get(f'/api/works/{pick()}', environ_overrides=client_ip(i))),
+        ('POST /api/like/<id>', requests, lambda c, i: c.post(f'/api/like/{pick()}', environ_overrides=client_ip(i))),
+        ('GET /api/image', requests, lambda c, i: c.get(f'/api/image/{pick()}/image1.jpg')),
+        ('GET /api/download', requests, download),
+        ('POST /api/admin/upload', max(requests // 10, 1), upload),
+    ]
+
+
+def cold_warm(backend, works, requests):
+    """
+    冷/热请求对比：冷请求前清空响应缓存，相当于计数或配置刚发生变化；
+    热请求重复同一个请求（同一客户端地址，浏览量不再增加），直接命中响应缓存
+    """
+    client = backend.app.test_client()
+    work_ids = [work['作品ID'] for work in works]
+
+    def cold(make_request):
+        def run(c, i):
+            backend.response_cache.clear()
+            return make_request(c, i)
+        return run
+
+    cases = [
+        ('GET /api/works', lambda c, i: c.get('/api/works')),
+        ('GET /api/works?page', lambda c, i: c.get('/api/works', query_string={'page': 1, 'page_size': 12})),
+        ('GET /api/works/<id>', lambda c, i: c.get(f'/api/works/{work_ids[0]}', environ_overrides=client_ip(0))),
+    ]
+    results = {}
+    for name, make_request in cases:
+        make_request(client, 0)  # 预热（浏览量只在第一次请求时增加）
+        results[name] = {
+            'cold': measure(client, requests, cold(make_request)),
+            'warm': measure(client, requests, make_request),
+        }
+
+    # 作品配置变化后重新生成公开表示（去掉内部字段、预先序列化）的耗时
+    configs = backend.works_catalog.all()
+    start = time.perf_counter()
+    for config in configs:
+        backend.PublicWork.build(config)
+    elapsed = time.perf_counter() - start
+    results['public_build_us_per_work'] = round(elapsed / max(len(configs), 1) * 1e6, 1)
+    return results
+
+
+def json_codecs(backend, rounds=3):
+    """
+    全部作品配置的序列化/解析耗时（取 rounds 次中最快的一次）和总大小：
+    标准库 indent=2 即改动前的 work_config.json，Flask 默认（转义中文、排序键）即改动前的接口响应
+    """
+    configs = backend.works_catalog.all()
+    codecs = [
+        ('标准库 indent=2', lambda c: json.dumps(c, ensure_ascii=False, indent=2).encode('utf-8'), json.loads),
+        ('标准库 紧凑', lambda c: json.dumps(c, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), json.loads),
+        ('Flask 默认', lambda c: json.dumps(c, sort_keys=True).encode('utf-8'), json.loads),
+    ]
+    if backend.orjson is not None:
+        orjson = backend.orjson
+        codecs += [
+            ('orjson indent=2', lambda c: orjson.dumps(c, option=orjson.OPT_INDENT_2), orjson.loads),
+            ('orjson 紧凑', orjson.dumps, orjson.loads),
+        ]
+    codecs.append((f'当前 ({type(backend.app.json).__name__})',
+                   lambda c: backend.dump_config_json(c, backend.WORK_CONFIG_COMPACT), backend.load_json))
+    results = {}
+    for name, encode, decode in codecs:
+        encode_times, decode_times = [], []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            encoded = [encode(config) for config in configs]
+            encode_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            for data in encoded:
+                decode(data)
+            decode_times.append(time.perf_counter() - start)
+        results[name] = {
+            'encode_ms': round(min(encode_times) * 1000, 2),
+            'decode_ms': round(min(decode_times) * 1000, 2),
+            'bytes': sum(len(data) for data in encoded),
+        }
+    return results
+
+
+def run_size(size, requests, seed):
+    """在当前进程中对一个规模压测（由子进程调用，环境变量已指向临时目录）"""
+    rss_before = rss_kb()
+    import_start = time.perf_counter()
+    import app as backend
+    import_seconds = time.perf_counter() - import_start
+
+    load_start = time.perf_counter()
+    backend.works_catalog.refresh()
+    load_seconds = time.perf_counter() - load_start
+
+    client = backend.app.test_client()
+    works = sorted(backend.works_catalog.all(), key=lambda work: work['作品ID'])
+    rng = random.Random(seed)
+    results = {}
+    for name, count, make_request in scenarios(works, requests, rng):
+        results[name] = measure(client, count, make_request)
+    cache_results = cold_warm(backend, works, requests)
+    codec_results = json_codecs(backend)
+    backend.stats_counter.close()
+    return {
+        'works': size,
+        'import_s': round(import_seconds, 3),
+        'catalog_load_s': round(load_seconds, 3),
+        'rss_start_kb': rss_before,
+        'rss_end_kb': rss_kb(),
+        'scenarios': results,
+        'cold_warm': cache_results,
+        'json_codecs': codec_results,
+    }
+
+
+def run_in_subprocess(size, args):
+    """生成 size 个作品并在新进程中压测，返回结果"""
+    root = tempfile.mkdtemp(prefix=f'smy_bench_{size}_')
+    try:
+        works_dir = os.path.join(root, 'works')
+        gen_start = time.perf_counter()
+        generate_works(works_dir, size, screenshots=args.screenshots, tags=args.tags,
+                       platforms=args.platforms, image_size=args.image_size,
+                       file_size=args.file_size, seed=args.seed)
+        gen_seconds = time.perf_counter() - gen_start
+        env = dict(os.environ,
+                   SMY_WORKS_DIR=works_dir,
+                   SMY_DATA_DIR=os.path.join(root, 'data'),
+                   SMY_BLOB_DIR=os.path.join(root, 'blobs'))
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '_worker', str(size),
+             '--requests', str(args.requests), '--seed', str(args.seed)],
+            env=env, cwd=BASE_DIR, check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        ).stdout
+        result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+        result['generate_s'] = round(gen_seconds, 3)
+        return result
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+        else:
+            print(f'保留模拟数据: {root}', file=sys.stderr)
+
+
+def print_report(results):
+    for result in results:
+        print(f"\n== {result['works']} 个作品 ==  生成 {result['generate_s']}s  "
+              f"导入 {result['import_s']}s  加载目录 {result['catalog_load_s']}s  "
+              f"RSS {result['rss_start_kb'] // 1024}MB -> {result['rss_end_kb'] // 1024}MB")
+        print(f"{'接口':<26}{'次数':>6}{'p50(ms)':>10}{'p99(ms)':>10}{'req/s':>10}  状态码")
+        for name, stats in result['scenarios'].items():
+            print(f"{name:<26}{stats['requests']:>6}{stats['p50_ms']:>10}{stats['p99_ms']:>10}"
+                  f"{stats['req_per_s']:>10}  {stats['status']}")
+        cache_results = dict(result['cold_warm'])
+        build_us = cache_results.pop('public_build_us_per_work')
+        print(f"\n{'冷/热请求':<26}{'冷p50':>10}{'冷p99':>10}{'热p50':>10}{'热p99':>10}"
+              f"   （生成公开表示 {build_us}us/作品）")
+        for name, stats in cache_results.items():
+            print(f"{name:<26}{stats['cold']['p50_ms']:>10}{stats['cold']['p99_ms']:>10}"
+                  f"{stats['warm']['p50_ms']:>10}{stats['warm']['p99_ms']:>10}")
+        print(f"\n{'全部配置 JSON':<26}{'序列化(ms)':>10}{'解析(ms)':>10}{'大小(KB)':>10}")
+        for name, stats in result['json_codecs'].items():
+            print(f"{name:<26}{stats['encode_ms']:>10}{stats['decode_ms']:>10}{stats['bytes'] // 1024:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='后端性能基准测试')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_generate_options(p):
+        p.add_argument('--screenshots', type=int, default=3, help='每个作品的截图数')
+        p.add_argument('--tags', type=int, default=4, help='每个作品的标签数')
+        p.add_argument('--platforms', type=int, default=3, help='每个作品的平台数')
+        p.add_argument('--image-size', type=int, default=32 * 1024, help='截图大小（字节）')
+        p.add_argument('--file-size', type=int, default=1024 * 1024, help='安装包大小（字节）')
+        p.add_argument('--seed', type=int, default=1)
+
+    run = sub.add_parser('run', help='生成模拟数据并压测')
+    run.add_argument('--sizes', default='10,1000,10000', help='作品数量，逗号分隔')
+    run.add_argument('--requests', type=int, default=200, help='每个接口的请求次数')
+    run.add_argument('--json', help='把结果另存为 JSON 文件')
+    run.add_argument('--keep', action='store_true', help='保留生成的模拟数据')
+    add_generate_options(run)
+
+    gen = sub.add_parser('generate', help='只生成模拟作品目录')
+    gen.add_argument('works_dir')
+    gen.add_argument('--works', type=int, default=1000)
+    add_generate_options(gen)
+
+    worker = sub.add_parser('_worker')  # 内部使用：在子进程中压测一个规模
+    worker.add_argument('size', type=int)
+    worker.add_argument('--requests', type=int, default=200)
+    worker.add_argument('--seed', type=int, default=1)
+
+    args = parser.parse_args(argv)
+    if args.command == 'generate':
+        generate_works(args.works_dir, args.works, screenshots=args.screenshots, tags=args.tags,
+                       platforms=args.platforms, image_size=args.image_size,
+                       file_size=args.file_size, seed=args.seed)
+        print(f'已生成 {args.works} 个作品到 {args.works_dir}')
+    elif args.command == '_worker':
+        print(json.dumps(run_size(args.size, args.requests, args.seed)))
+    else:
+        results = [run_in_subprocess(int(size), args) for size in args.sizes.split(',') if size]
+        print_report(results)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
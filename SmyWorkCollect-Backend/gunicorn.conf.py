@@ -0,0 +1,37 @@
+"""
+gunicorn 配置：gunicorn -c gunicorn.conf.py wsgi:app
+进程数、线程数等可用环境变量覆盖，例如 GUNICORN_WORKERS=4 GUNICORN_THREADS=8
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# 每个 worker 是独立进程，可同时使用多个 CPU 核心；
+# gthread 模式下每个进程再开多个线程，上传/下载大文件时不会占满所有 worker
+workers = int(os.environ.get('GUNICORN_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_class = 'gthread'
+
+# 内存中的防刷记录只在单个进程内有效，多个 worker 时默认改用 SQLite 共享
+# （配置文件在预加载 app 之前执行；已设置 SMY_RATE_LIMIT_BACKEND 时不覆盖）
+if workers > 1:
+    os.environ.setdefault('SMY_RATE_LIMIT_BACKEND', 'sqlite')
+
+# 在 master 进程中导入 wsgi:app 并预加载作品目录缓存，fork 后各 worker 共享
+preload_app = True
+
+# gthread 模式下 timeout 只检查 worker 心跳，不会打断长时间的上传/下载
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+# 收到 SIGTERM/SIGHUP 后等待正在处理的请求完成的时间
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def worker_exit(server, worker):
+    """worker 退出（包括重启、缩容）时写回该进程未落盘的统计计数"""
+    from wsgi import shutdown
+    shutdown()
@@ -0,0 +1,63 @@
+"""
+测试公共配置：导入 app 之前把作品、数据和 blob 目录指向临时目录，测试不会改动仓库中的 works 目录
+运行：cd SmyWorkCollect-Backend && python -m pytest -q
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_ROOT = tempfile.mkdtemp(prefix='smy-test-')
+os.environ['SMY_WORKS_DIR'] = os.path.join(TEST_ROOT, 'works')
+os.environ['SMY_DATA_DIR'] = os.path.join(TEST_ROOT, 'data')
+os.environ['SMY_BLOB_DIR'] = os.path.join(TEST_ROOT, 'blobs')
+os.environ['SMY_RATE_LIMIT_BACKEND'] = 'memory'
+sys.path.insert(0, BACKEND_DIR)
+
+import app as smy  # noqa: E402
+
+ADMIN = {'token': smy.ADMIN_TOKEN}
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _shutdown():
+    yield
+    smy.works_watcher.stop()
+    smy.job_queue.shutdown(wait=True)
+    smy.stats_counter.close()
+    shutil.rmtree(TEST_ROOT, ignore_errors=True)
+
+
+@pytest.fixture
+def client():
+    return smy.app.test_client()
+
+
+def wait_job(client, response, timeout=10):
+    """等待 202 返回的后台任务结束，返回任务记录"""
+    assert response.status_code == 202, response.get_json()
+    job_id = response.get_json()['job_id']
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f'/api/admin/jobs/{job_id}', query_string=ADMIN).get_json()['data']
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'任务 {job_id} 未在 {timeout} 秒内完成')
+
+
+@pytest.fixture
+def make_work(client):
+    """通过管理接口新建作品，返回作品ID（每个测试使用不同的作品，互不影响）"""
+    def create(**fields):
+        work_id = fields.pop('作品ID', None) or f'w{uuid.uuid4().hex[:12]}'
+        data = {'作品ID': work_id, '作品作品': work_id, **fields}
+        response = client.post('/api/admin/works', query_string=ADMIN, json=data)
+        assert response.status_code == 200, response.get_json()
+        return work_id
+    return create
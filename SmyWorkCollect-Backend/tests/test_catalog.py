@@ -0,0 +1,56 @@
+"""作品目录缓存的失效与分面筛选"""
+import time
+
+from conftest import ADMIN, smy
+
+
+def test_write_through_store_invalidates_catalog(make_work):
+    work_id = make_work(作品描述='旧描述')
+    version = smy.catalog_version()
+
+    with smy.work_config_store.update(work_id) as config:
+        config['作品描述'] = '新描述'
+
+    assert smy.works_catalog.get(work_id)['作品描述'] == '新描述'
+    assert smy.catalog_version() != version
+    assert work_id in [work['作品ID'] for work in smy.search_index.search('新描述', None)]
+
+
+def test_delete_removes_work_and_advances_last_modified(client, make_work):
+    work_id = make_work()
+    before = client.get('/api/works')
+    assert any(work['作品ID'] == work_id for work in before.get_json()['data'])
+
+    time.sleep(1.1)  # Last-Modified 精确到秒
+    response = client.delete(f'/api/admin/works/{work_id}', query_string=ADMIN)
+    assert response.status_code in (200, 202)
+
+    after = client.get('/api/works', headers={'If-Modified-Since': before.headers['Last-Modified']})
+    assert after.status_code == 200
+    assert all(work['作品ID'] != work_id for work in after.get_json()['data'])
+    assert smy.works_catalog.get(work_id) is None
+
+
+def test_facet_filter_ors_within_facet_and_ands_across_facets():
+    index = smy.FacetIndex()
+    index.update('a', {'作品分类': '游戏', '作品标签': ['AI'], '支持平台': ['Windows']})
+    index.update('b', {'作品分类': '工具', '作品标签': ['AI', 'CLI'], '支持平台': ['Linux']})
+    index.update('c', {'作品分类': '工具', '作品标签': ['CLI'], '支持平台': ['Windows']})
+
+    assert index.filter(category=['游戏', '工具']) == {'a', 'b', 'c'}
+    assert index.filter(category=['游戏', '工具'], tag=['AI']) == {'a', 'b'}
+    assert index.filter(category=['工具'], platform=['Windows']) == {'c'}
+    assert index.filter(tag=['不存在']) == set()
+    assert index.filter(category=[], tag=[]) is None
+
+    index.update('c', None)
+    assert index.filter(category=['工具']) == {'b'}
+    assert index.counts('category') == [('工具', 1), ('游戏', 1)]
+
+
+def test_search_endpoint_uses_facet_semantics(client, make_work):
+    game = make_work(作品分类='测试分类甲')
+    tool = make_work(作品分类='测试分类乙')
+    response = client.get('/api/search', query_string={'category': '测试分类甲,测试分类乙'})
+    ids = {work['作品ID'] for work in response.get_json()['data']}
+    assert {game, tool} <= ids
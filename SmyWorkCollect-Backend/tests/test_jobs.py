@@ -0,0 +1,112 @@
+"""后台任务队列的恢复和未完成任务索引"""
+import json
+import os
+import time
+
+import pytest
+
+from conftest import smy
+
+DEAD_PID = 2 ** 22 + 1  # 超过 pid_max 的默认值，不会是存活的进程
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = smy.JobQueue(str(tmp_path / 'jobs'), workers=2)
+    yield queue
+    queue.shutdown(wait=True)
+
+
+def leftover(queue, job_id, job_type, status='running', work_id='w', **params):
+    """写入一条已退出进程遗留的任务记录（与 JobQueue 一样用 os.replace 写入）"""
+    os.makedirs(queue.jobs_dir, exist_ok=True)
+    job = {'id': job_id, 'type': job_type, 'work_id': work_id, 'status': status, 'params': params,
+           'result': None, 'error': None, 'pid': DEAD_PID, 'created': '2026-01-01T00:00:00',
+           'started': None, 'finished': None}
+    path = os.path.join(queue.jobs_dir, f'{job_id}.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(job, f)
+    os.replace(path + '.tmp', path)
+    return job
+
+
+def wait(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(job_id)
+
+
+def test_submit_runs_handler_and_records_result(queue):
+    @queue.handler('double')
+    def double(work_id, value):
+        return {'value': value * 2}
+
+    job = queue.submit('double', 'w', value=21)
+    assert wait(queue, job['id'])['result'] == {'value': 42}
+    # 同一 job_id 未失败时不重复提交
+    first = queue.submit('double', 'w', job_id='once', value=1)
+    assert queue.submit('double', 'w', job_id='once', value=2)['params'] == first['params']
+
+
+def test_recover_reruns_resumable_and_aborts_others(queue, tmp_path):
+    ran, aborted = [], []
+    staged = tmp_path / 'staged.part'
+    staged.write_bytes(b'x')
+
+    @queue.handler('resumable', resumable=True)
+    def resumable(work_id, n):
+        ran.append(n)
+        return n
+
+    def cleanup(work_id, source_path):
+        aborted.append(work_id)
+        os.remove(source_path)
+
+    @queue.handler('one_shot', on_abort=cleanup)
+    def one_shot(work_id, source_path):
+        raise AssertionError('中断的一次性任务不应重新执行')
+
+    leftover(queue, 'r1', 'resumable', n=7)
+    leftover(queue, 'o1', 'one_shot', status='queued', source_path=str(staged))
+    queue.start()
+
+    assert wait(queue, 'r1')['status'] == 'done'
+    assert ran == [7]
+    failed = queue.get('o1')
+    assert failed['status'] == 'failed'
+    assert aborted == ['w']
+    assert not staged.exists()
+
+
+def test_recover_removes_expired_records(tmp_path):
+    queue = smy.JobQueue(str(tmp_path / 'jobs'), retention=0)
+    job = leftover(queue, 'old', 'anything', status='done')
+    job['finished'] = '2000-01-01T00:00:00'
+    with open(os.path.join(queue.jobs_dir, 'old.json'), 'w', encoding='utf-8') as f:
+        json.dump(job, f)
+    queue.start()
+    try:
+        assert queue.get('old') is None
+    finally:
+        queue.shutdown()
+
+
+def test_pending_reflects_records_written_by_other_processes(queue):
+    assert queue.pending() == {}
+    leftover(queue, 'p1', 'build_archive', status='queued', work_id='a')
+    leftover(queue, 'p2', 'generate_derivatives', status='running', work_id='a')
+    leftover(queue, 'p3', 'build_archive', status='done', work_id='b')
+    assert {work_id: sorted(types) for work_id, types in queue.pending().items()} == {
+        'a': ['build_archive', 'generate_derivatives']
+    }
+
+    # 任务目录的 mtime 不变时使用缓存的结果，记录被改写后重新读取
+    os.utime(queue.jobs_dir, ns=(0, 0))
+    cached = queue.pending()
+    assert queue.pending() is cached
+    leftover(queue, 'p1', 'build_archive', status='done', work_id='a')
+    assert queue.pending() == {'a': ['generate_derivatives']}
@@ -0,0 +1,48 @@
+"""防刷记录存储"""
+import pytest
+
+from conftest import smy
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return smy.MemoryRateLimitStore(max_entries=3)
+    return smy.SQLiteRateLimitStore(str(tmp_path / 'rate_limits.db'), max_entries=3)
+
+
+def test_hit_is_limited_until_expiry(store):
+    key = smy.rate_limit_key(b'fingerprint', 'like', 'w1')
+    assert store.hit(key, 60, now=1000)
+    assert not store.hit(key, 60, now=1059)
+    assert store.hit(key, 60, now=1060)
+
+
+def test_keys_are_independent(store):
+    assert store.hit(smy.rate_limit_key(b'fp', 'like', 'w1'), 60, now=0)
+    assert store.hit(smy.rate_limit_key(b'fp', 'like', 'w2'), 60, now=0)
+    assert store.hit(smy.rate_limit_key(b'fp', 'view', 'w1'), 60, now=0)
+    assert store.hit(smy.rate_limit_key(b'other', 'like', 'w1'), 60, now=0)
+
+
+def test_memory_store_evicts_least_recent():
+    store = smy.MemoryRateLimitStore(max_entries=2)
+    for key in (b'a', b'b', b'c'):
+        store.hit(key, 60, now=0)
+    assert len(store) == 2
+    assert store.hit(b'a', 60, now=1)  # 最早的记录已被淘汰
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    # 两个实例相当于两个 worker 进程
+    first = smy.SQLiteRateLimitStore(str(tmp_path / 'rate_limits.db'))
+    second = smy.SQLiteRateLimitStore(str(tmp_path / 'rate_limits.db'))
+    assert first.hit(b'key', 60, now=0)
+    assert not second.hit(b'key', 60, now=30)
+
+
+def test_like_endpoint_rejects_repeated_like(client, make_work):
+    work_id = make_work()
+    assert client.post(f'/api/like/{work_id}').get_json()['success']
+    response = client.post(f'/api/like/{work_id}')
+    assert response.status_code == 429
@@ -0,0 +1,98 @@
+"""响应缓存、条件请求、压缩和断点续传"""
+import gzip
+import io
+
+from conftest import ADMIN, smy, wait_job
+
+
+def test_etag_and_not_modified(client, make_work):
+    make_work()
+    smy.stats_counter.flush()  # 有未落盘计数时列表不带 Last-Modified
+    first = client.get('/api/works')
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+
+    cached = client.get('/api/works', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+    by_date = client.get('/api/works', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert by_date.status_code == 304
+
+    make_work()
+    changed = client.get('/api/works', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_gzip_variant_has_its_own_etag(client, make_work):
+    make_work(作品描述='压缩' * 2000)
+    plain = client.get('/api/works')
+    compressed = client.get('/api/works', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+    assert gzip.decompress(compressed.data) == plain.data
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+
+
+def test_irrelevant_query_parameters_share_cache_entry(client, make_work):
+    make_work()
+    client.get('/api/works?page=1&page_size=5')
+    entries = len(smy.response_cache)
+    for bust in range(5):
+        client.get(f'/api/works?page_size=5&page=1&_={bust}')
+    assert len(smy.response_cache) == entries
+
+
+def test_counts_on_other_works_keep_page_etag(client, make_work):
+    make_work()
+    make_work()
+    smy.stats_counter.flush()
+    params = {'page': 1, 'page_size': 1, 'sort': 'updated'}
+    page = client.get('/api/works', query_string=params)
+    etag = page.headers['ETag']
+    first = page.get_json()['data'][0]['作品ID']
+    # 给不在本页的作品计数不影响本页的 ETag
+    listed = client.get('/api/works', query_string={'fields': '作品ID'}).get_json()['data']
+    outside = next(work['作品ID'] for work in listed if work['作品ID'] != first)
+    assert client.post(f'/api/like/{outside}').get_json()['success']
+    assert client.get('/api/works', query_string=params, headers={'If-None-Match': etag}).status_code == 304
+    # 本页作品的计数变化后 ETag 随之变化
+    assert client.post(f'/api/like/{first}').get_json()['success']
+    assert client.get('/api/works', query_string=params, headers={'If-None-Match': etag}).status_code == 200
+
+
+def upload(client, work_id, data, filename='app.zip', platform='Windows'):
+    response = client.post(f'/api/admin/upload/{work_id}/platform', query_string=ADMIN,
+                           data={'platform': platform, 'file': (io.BytesIO(data), filename)},
+                           content_type='multipart/form-data')
+    job = wait_job(client, response)
+    assert job['status'] == 'done', job
+    return job['result']
+
+
+def test_download_range_and_if_range(client, make_work):
+    work_id = make_work(支持平台=['Windows'])
+    data = bytes(range(256)) * 40
+    upload(client, work_id, data)
+    url = f'/api/download/{work_id}/Windows/app.zip'
+
+    full = client.get(url)
+    assert full.status_code == 200
+    etag = full.headers['ETag']
+
+    part = client.get(url, headers={'Range': 'bytes=100-199'})
+    assert part.status_code == 206
+    assert part.data == data[100:200]
+    assert part.headers['Content-Range'] == f'bytes 100-199/{len(data)}'
+
+    resumed = client.get(url, headers={'Range': 'bytes=1000-', 'If-Range': etag})
+    assert resumed.status_code == 206
+    assert resumed.data == data[1000:]
+
+    stale = client.get(url, headers={'Range': 'bytes=1000-', 'If-Range': '"stale"'})
+    assert stale.status_code == 200
+    assert stale.data == data
+
+    unsatisfiable = client.get(url, headers={'Range': f'bytes={len(data) + 10}-'})
+    assert unsatisfiable.status_code == 416
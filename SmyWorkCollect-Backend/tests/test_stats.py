@@ -0,0 +1,96 @@
+"""统计计数的写回、恢复和实时合并"""
+import os
+
+import pytest
+
+from conftest import smy
+
+
+@pytest.fixture
+def written(monkeypatch):
+    """替换 write_work_stats，记录写回的计数；failing 中的作品写回失败，gone 中的作品视为已删除"""
+    state = {'counts': {}, 'failing': set(), 'gone': set()}
+
+    def write(work_id, counts):
+        if work_id in state['gone']:
+            return None
+        if work_id in state['failing']:
+            return False
+        stored = state['counts'].setdefault(work_id, {})
+        for stat_type, n in counts.items():
+            stored[stat_type] = stored.get(stat_type, 0) + n
+        return True
+
+    monkeypatch.setattr(smy, 'write_work_stats', write)
+    return state
+
+
+def test_flush_writes_pending_counts_and_removes_journal(tmp_path, written):
+    counter = smy.StatsCounter(str(tmp_path), flush_interval=3600)
+    counter.increment('a', '作品浏览量')
+    counter.increment('a', '作品浏览量')
+    counter.increment('b', '作品点赞量')
+    assert counter.merge({'作品ID': 'a', '作品浏览量': 5})['作品浏览量'] == 7
+
+    assert counter.flush() == 2
+    assert written['counts'] == {'a': {'作品浏览量': 2}, 'b': {'作品点赞量': 1}}
+    assert counter.live_counts() == {}
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.flushing')]
+
+
+def test_failed_flush_keeps_counts_for_retry(tmp_path, written):
+    counter = smy.StatsCounter(str(tmp_path), flush_interval=3600)
+    written['failing'].add('a')
+    written['gone'].add('deleted')
+    counter.increment('a', '作品下载量', 3)
+    counter.increment('b', '作品下载量')
+    counter.increment('deleted', '作品下载量')
+
+    counter.flush()
+    assert written['counts'] == {'b': {'作品下载量': 1}}
+    # 写回失败的计数仍然可见，并记在新日志中；已删除作品的计数直接丢弃
+    assert counter.live_counts() == {'a': {'作品下载量': 3}}
+    journals = os.listdir(tmp_path)
+    assert len(journals) == 1 and '"a"' in (tmp_path / journals[0]).read_text()
+
+    written['failing'].clear()
+    counter.flush()
+    assert written['counts']['a'] == {'作品下载量': 3}
+    assert counter.live_counts() == {}
+
+
+def test_recover_replays_leftover_journals(tmp_path, written):
+    (tmp_path / 'stats_journal.999999.log').write_text(
+        '["a", "作品浏览量", 1]\n["b", "作品浏览量", 2]\n["a", "作品浏览量"'  # 最后一行写了一半
+    )
+    written['failing'].add('a')
+    counter = smy.StatsCounter(str(tmp_path))
+
+    counter.recover()
+    assert written['counts'] == {'b': {'作品浏览量': 2}}
+    # 只保留写回失败的计数，下次恢复时重试
+    assert (tmp_path / 'stats_journal.999999.log').read_text() == '["a", "作品浏览量", 1]\n'
+
+    written['failing'].clear()
+    counter.recover()
+    assert written['counts']['a'] == {'作品浏览量': 1}
+    assert os.listdir(tmp_path) == []
+
+
+def test_like_is_visible_before_flush(client, make_work):
+    work_id = make_work()
+    smy.stats_counter.flush()
+    detail = client.get(f'/api/works/{work_id}').get_json()['data']
+    page = client.get('/api/works', query_string={'fields': '作品ID,作品点赞量'}).get_json()['data']
+
+    response = client.post(f'/api/like/{work_id}')
+    assert response.get_json()['success']
+
+    assert client.get(f'/api/works/{work_id}').get_json()['data']['作品点赞量'] == detail['作品点赞量'] + 1
+    likes = {work['作品ID']: work['作品点赞量']
+             for work in client.get('/api/works', query_string={'fields': '作品ID,作品点赞量'}).get_json()['data']}
+    assert likes[work_id] == {work['作品ID']: work['作品点赞量'] for work in page}[work_id] + 1
+
+    smy.stats_counter.flush()
+    assert smy.work_config_store.read(work_id)['作品点赞量'] == detail['作品点赞量'] + 1
+    assert client.get(f'/api/works/{work_id}').get_json()['data']['作品点赞量'] == detail['作品点赞量'] + 1
@@ -0,0 +1,174 @@
+"""分块断点续传、内容去重存储和上传暂存文件的清理"""
+import hashlib
+import io
+import os
+import threading
+
+from conftest import ADMIN, smy, wait_job
+
+MB = 1024 * 1024
+
+
+def work_file(work_id, *parts):
+    return os.path.join(smy.WORKS_DIR, work_id, *parts)
+
+
+def staged_files(work_id):
+    staging_dir = work_file(work_id, smy.UPLOAD_STAGING_SUBDIR)
+    return os.listdir(staging_dir) if os.path.isdir(staging_dir) else []
+
+
+def init_session(client, work_id, data, **extra):
+    response = client.post(f'/api/admin/upload-session/{work_id}/platform', query_string=ADMIN,
+                           json={'filename': 'setup.zip', 'size': len(data), 'platform': 'Windows',
+                                 'chunk_size': MB, **extra})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def put_chunk(client, work_id, session, data, index):
+    chunk = data[index * session['chunk_size']:(index + 1) * session['chunk_size']]
+    return client.put(f"/api/admin/upload-session/{work_id}/{session['upload_id']}/{index}",
+                      query_string=ADMIN, data=chunk)
+
+
+def test_chunked_upload_resume_and_commit(client, make_work):
+    work_id = make_work(支持平台=['Windows'])
+    data = os.urandom(2 * MB + 123)
+    session = init_session(client, work_id, data, sha256=hashlib.sha256(data).hexdigest())
+    assert session['total_chunks'] == 3
+    base = f"/api/admin/upload-session/{work_id}/{session['upload_id']}"
+
+    assert put_chunk(client, work_id, session, data, 2).status_code == 200
+    assert put_chunk(client, work_id, session, data, 0).status_code == 200
+    status = client.get(base, query_string=ADMIN).get_json()
+    assert status['received'] == [0, 2]
+    assert status['missing'] == [1]
+    assert status['uploaded'] == len(data) - MB
+
+    incomplete = client.post(f'{base}/commit', query_string=ADMIN)
+    assert incomplete.status_code == 409
+    assert incomplete.get_json()['missing'] == [1]
+
+    # 中断的分块（大小不足）不计为已收到
+    truncated = client.put(f'{base}/1', query_string=ADMIN, data=data[MB:MB + 10])
+    assert truncated.status_code == 400
+    assert client.get(base, query_string=ADMIN).get_json()['missing'] == [1]
+
+    assert put_chunk(client, work_id, session, data, 1).status_code == 200
+    job = wait_job(client, client.post(f'{base}/commit', query_string=ADMIN))
+    assert job['status'] == 'done', job
+    assert job['result']['filename'] == 'setup.zip'
+
+    with open(work_file(work_id, 'platform', 'Windows', 'setup.zip'), 'rb') as f:
+        assert f.read() == data
+    assert staged_files(work_id) == []
+    assert client.get(base, query_string=ADMIN).status_code == 404
+
+
+def test_commit_rejects_checksum_mismatch(client, make_work):
+    work_id = make_work(支持平台=['Windows'])
+    data = os.urandom(MB + 1)
+    session = init_session(client, work_id, data, sha256='0' * 64)
+    for index in range(session['total_chunks']):
+        put_chunk(client, work_id, session, data, index)
+    job = wait_job(client, client.post(f"/api/admin/upload-session/{work_id}/{session['upload_id']}/commit",
+                                       query_string=ADMIN))
+    assert job['status'] == 'failed'
+    assert not os.path.exists(work_file(work_id, 'platform', 'Windows', 'setup.zip'))
+    assert staged_files(work_id) == []
+
+
+def upload(client, work_id, data, filename, platform):
+    response = client.post(f'/api/admin/upload/{work_id}/platform', query_string=ADMIN,
+                           data={'platform': platform, 'file': (io.BytesIO(data), filename)},
+                           content_type='multipart/form-data')
+    job = wait_job(client, response)
+    assert job['status'] == 'done', job
+    return job['result']
+
+
+def test_same_content_is_stored_once_and_collected(client, make_work):
+    work_id = make_work(支持平台=['Windows', 'Linux'])
+    data = os.urandom(64 * 1024)
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    assert upload(client, work_id, data, 'app.zip', 'Windows')['deduplicated'] is False
+    assert upload(client, work_id, data, 'app.zip', 'Linux')['deduplicated'] is True
+    windows = work_file(work_id, 'platform', 'Windows', 'app.zip')
+    linux = work_file(work_id, 'platform', 'Linux', 'app.zip')
+    assert os.path.samefile(windows, linux)
+    assert os.path.samefile(windows, smy.blob_path(sha256))
+    # 同名文件按平台分别登记
+    info = smy.work_config_store.read(work_id)['文件信息']
+    assert info['platform/Windows/app.zip']['sha256'] == info['platform/Linux/app.zip']['sha256'] == sha256
+
+    # 删除其中一个平台的文件，blob 仍被另一个引用
+    response = client.delete(f'/api/admin/delete-file/{work_id}/platform/app.zip',
+                             query_string={**ADMIN, 'platform': 'Windows'})
+    assert response.status_code == 200, response.get_json()
+    assert os.path.exists(smy.blob_path(sha256))
+    assert 'platform/Linux/app.zip' in smy.work_config_store.read(work_id)['文件信息']
+
+    # 删除整个作品后 blob 被回收
+    wait_job(client, client.delete(f'/api/admin/works/{work_id}', query_string=ADMIN))
+    assert not os.path.exists(smy.blob_path(sha256))
+
+
+def test_known_content_is_linked_without_upload(client, make_work):
+    work_id = make_work(支持平台=['Windows'])
+    other = make_work(支持平台=['Windows'])
+    data = os.urandom(32 * 1024)
+    upload(client, work_id, data, 'tool.zip', 'Windows')
+
+    response = client.post(f'/api/admin/upload-session/{other}/platform', query_string=ADMIN,
+                           json={'filename': 'tool.zip', 'size': len(data), 'platform': 'Windows',
+                                 'sha256': hashlib.sha256(data).hexdigest()})
+    assert response.get_json()['deduplicated'] is True
+    assert os.path.samefile(work_file(work_id, 'platform', 'Windows', 'tool.zip'),
+                            work_file(other, 'platform', 'Windows', 'tool.zip'))
+
+
+def test_release_waits_for_concurrent_link(tmp_path, make_work):
+    work_id = make_work()
+    sha256 = hashlib.sha256(b'race').hexdigest()
+    errors = []
+
+    def worker(n):
+        for i in range(50):
+            source = tmp_path / f'{n}-{i}'
+            source.write_bytes(b'race')
+            target = work_file(work_id, 'image', f'{n}-{i}.png')
+            try:
+                smy.link_blob(sha256, str(source), target)
+            except OSError as e:
+                errors.append(e)
+                continue
+            os.remove(target)
+            smy.release_blob(sha256)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert not os.path.exists(smy.blob_path(sha256))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_form_upload_is_staged_in_work_directory(client, make_work, monkeypatch):
+    work_id = make_work(支持平台=['Windows'])
+
+    def copied(*args):
+        raise AssertionError('表单文件不应再从系统临时目录复制')
+
+    monkeypatch.setattr(smy, 'save_upload_stream', copied)
+    upload(client, work_id, os.urandom(MB), 'big.zip', 'Windows')
+
+    # 请求在登记之前失败时，已接收的暂存文件在请求结束时删除
+    response = client.post(f'/api/admin/upload/{work_id}/platform', query_string=ADMIN,
+                           data={'file': (io.BytesIO(b'x' * 1000), 'other.zip')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert staged_files(work_id) == []
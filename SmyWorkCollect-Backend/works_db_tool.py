@@ -0,0 +1,72 @@
+"""
+作品配置导入导出工具：在 works 目录（work_config.json）和 SQLite 数据库之间转换
+
+用法：
+    python works_db_tool.py import              # works/*/work_config.json -> data/works.db
+    python works_db_tool.py export              # data/works.db -> works/*/work_config.json
+    python works_db_tool.py search 关键词        # 在数据库全文索引中搜索
+    可用 --db 和 --works-dir 指定其他路径
+
+导入后把 app.py 中的 WORK_STORE_BACKEND 改为 'sqlite' 即可切换到数据库存储
+"""
+import argparse
+import os
+import sys
+
+from app import WORKS_DIR, WORKS_DB_PATH, WorkConfigStore, SQLiteWorkConfigStore
+
+
+def import_works(file_store, db_store):
+    """把 works 目录下的全部配置写入数据库（单个事务，失败时不留下半份数据）"""
+    count = 0
+    with db_store.transaction():
+        for work_id, version in sorted(file_store.version_keys().items()):
+            if version is None:
+                continue
+            try:
+                config = file_store.read(work_id)
+            except ValueError as e:
+                print(f"跳过 {work_id}: 配置文件损坏 ({e})", file=sys.stderr)
+                continue
+            db_store.write(work_id, config)
+            count += 1
+    return count
+
+
+def export_works(db_store, file_store):
+    """把数据库中的全部配置写回各作品目录的 work_config.json"""
+    count = 0
+    for work_id in sorted(db_store.version_keys()):
+        config = db_store.read(work_id)
+        os.makedirs(os.path.join(file_store.works_dir, work_id), exist_ok=True)
+        with file_store.lock(work_id):
+            file_store.write(work_id, config)
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='作品配置导入导出工具')
+    parser.add_argument('command', choices=['import', 'export', 'search'])
+    parser.add_argument('query', nargs='?', help='search 的关键词')
+    parser.add_argument('--db', default=WORKS_DB_PATH, help='数据库路径')
+    parser.add_argument('--works-dir', default=WORKS_DIR, help='works 目录路径')
+    args = parser.parse_args(argv)
+
+    file_store = WorkConfigStore(args.works_dir)
+    db_store = SQLiteWorkConfigStore(args.db, args.works_dir)
+
+    if args.command == 'import':
+        print(f"已导入 {import_works(file_store, db_store)} 个作品到 {args.db}")
+    elif args.command == 'export':
+        print(f"已导出 {export_works(db_store, file_store)} 个作品到 {args.works_dir}")
+    else:
+        if not args.query:
+            parser.error('search 需要关键词')
+        for work_id in db_store.search(args.query):
+            print(work_id)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
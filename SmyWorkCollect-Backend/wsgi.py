@@ -0,0 +1,104 @@
+"""
+生产环境入口
+
+Linux 多进程（推荐，可使用多个 CPU 核心）：
+    pip install gunicorn
+    gunicorn -c gunicorn.conf.py wsgi:app
+    或 python wsgi.py --server gunicorn --workers 4 --threads 8
+
+单进程多线程（Windows 也可用）：
+    pip install waitress
+    python wsgi.py --server waitress --threads 16
+
+可用环境变量 SMY_WORKS_DIR、SMY_DATA_DIR、SMY_BLOB_DIR 指定数据目录（需在启动前设置）
+多个 worker 进程时 gunicorn.conf.py 会把防刷记录的存储设为 SQLite（SMY_RATE_LIMIT_BACKEND），让各进程共享
+"""
+import argparse
+import os
+import signal
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def preload():
+    """
+    在 fork 出 worker 之前完成的准备工作：
+    恢复上次异常退出遗留的统计日志，加载作品目录缓存（同时建立搜索索引和分面索引），
+    检查 blob 存储能否使用硬链接，子进程通过写时复制共享这些数据，不必各自重新扫描
+    """
+    from app import works_catalog, stats_counter, blob_store_enabled
+    stats_counter.recover()
+    works_catalog.refresh()
+    blob_store_enabled()
+
+
+def shutdown():
+    """优雅退出：停止作品目录监视，等待正在执行的后台任务，写回内存中尚未落盘的浏览/下载/点赞计数"""
+    from app import job_queue, stats_counter, works_watcher
+    works_watcher.stop()
+    job_queue.shutdown(wait=True)
+    stats_counter.close()
+
+
+def create_app(preload_catalog=True):
+    """
+    应用工厂：返回关闭调试模式、按需预加载过的 Flask 应用
+    路由在 app.py 导入时注册，工厂只负责生产环境的配置和启动准备
+    """
+    from app import app as flask_app
+    flask_app.config['DEBUG'] = False
+    flask_app.config['PROPAGATE_EXCEPTIONS'] = False
+    if preload_catalog:
+        preload()
+    return flask_app
+
+
+def _exit_on_sigterm(signum, frame):
+    # 默认的 SIGTERM 处理会直接结束进程，转成 SystemExit 才会执行 atexit 中的计数写回
+    sys.exit(0)
+
+
+def run_gunicorn(args):
+    """以 gunicorn.conf.py 为配置启动 gunicorn，命令行参数通过环境变量传入配置文件"""
+    env = dict(os.environ)
+    env['GUNICORN_BIND'] = args.bind
+    if args.workers:
+        env['GUNICORN_WORKERS'] = str(args.workers)
+    if args.threads:
+        env['GUNICORN_THREADS'] = str(args.threads)
+    conf = os.path.join(BASE_DIR, 'gunicorn.conf.py')
+    os.chdir(BASE_DIR)
+    os.execvpe('gunicorn', ['gunicorn', '-c', conf, 'wsgi:app'], env)
+
+
+def run_waitress(args):
+    """单进程多线程运行（waitress 不 fork，直接在本进程预加载）"""
+    from waitress import serve
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    host, _, port = args.bind.rpartition(':')
+    try:
+        serve(create_app(), host=host or '0.0.0.0', port=int(port), threads=args.threads or 8)
+    finally:
+        shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='树萌芽の作品集后端（生产环境）')
+    parser.add_argument('--server', choices=['gunicorn', 'waitress'],
+                        default='gunicorn' if os.name == 'posix' else 'waitress')
+    parser.add_argument('--bind', default='0.0.0.0:5000', help='监听地址，默认 0.0.0.0:5000')
+    parser.add_argument('--workers', type=int, help='worker 进程数（仅 gunicorn）')
+    parser.add_argument('--threads', type=int, help='每个进程的线程数')
+    args = parser.parse_args(argv)
+    if args.server == 'gunicorn':
+        run_gunicorn(args)
+    else:
+        run_waitress(args)
+
+
+if __name__ == '__main__':
+    main()
+else:
+    # gunicorn wsgi:app（配合 preload_app 在 master 进程中导入并预加载）
+    app = create_app()
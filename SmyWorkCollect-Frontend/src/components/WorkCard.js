@@ -170,7 +170,10 @@ const WorkCard = ({ work }) => {
     if (work.作品封面 && work.图片链接) {
       const coverIndex = work.作品截图?.indexOf(work.作品封面);
       if (coverIndex >= 0 && work.图片链接[coverIndex]) {
-        return `${getApiBaseUrl()}${work.图片链接[coverIndex]}`;
+        // 卡片只需要缩略图，由后端按需生成并缓存
+        const url = work.图片链接[coverIndex];
+        const separator = url.includes('?') ? '&' : '?';
+        return `${getApiBaseUrl()}${url}${separator}w=640&fmt=webp`;
       }
     }
     return null;
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import styled from 'styled-components';
-import { adminCreateWork, adminUpdateWork, adminUploadFile, adminDeleteFile } from '../services/adminApi';
+import { adminCreateWork, adminUpdateWork, adminUploadFile, adminUploadFiles, adminDeleteFile, CHUNKED_UPLOAD_THRESHOLD } from '../services/adminApi';
 import UploadProgressModal from './UploadProgressModal';
 
 // 获取API基础URL
@@ -446,6 +446,69 @@ const WorkEditor = ({ work, onClose }) => {
     }
   };
 
+  // 多个小文件合并为一个请求上传，后端只更新一次作品配置
+  const handleBatchUpload = async (files, fileType, platform) => {
+    const batchKey = 'batch';
+    const totalSize = files.reduce((sum, file) => sum + file.size, 0);
+    setUploadItems({
+      [batchKey]: {
+        fileName: `${files.length} 个文件`,
+        fileSize: totalSize,
+        progress: 0,
+        uploaded: 0,
+        speed: 0,
+        status: 'uploading'
+      }
+    });
+
+    const response = await adminUploadFiles(formData.作品ID, fileType, files, platform, (progressInfo) => {
+      setUploadItems(prev => ({
+        ...prev,
+        [batchKey]: {
+          ...prev[batchKey],
+          ...progressInfo,
+          status: 'uploading'
+        }
+      }));
+    });
+    console.log('批量上传响应:', response);
+
+    const results = response.results || [];
+    const failed = results.filter(item => !item.success);
+    const uploaded = results.filter(item => item.success).map(item => item.filename);
+    const appendNew = (list) => [...list, ...uploaded.filter(name => !list.includes(name))];
+
+    if (fileType === 'image') {
+      const newImages = appendNew(formData.作品截图);
+      handleInputChange('作品截图', newImages);
+      if (!formData.作品封面 && newImages.length > 0) {
+        handleInputChange('作品封面', newImages[0]);
+      }
+    } else if (fileType === 'video') {
+      handleInputChange('作品视频', appendNew(formData.作品视频));
+    } else if (fileType === 'platform' && platform) {
+      const newFileNames = { ...formData.文件名称 };
+      newFileNames[platform] = appendNew(newFileNames[platform] || []);
+      handleInputChange('文件名称', newFileNames);
+    }
+
+    setUploadItems(prev => ({
+      ...prev,
+      [batchKey]: {
+        ...prev[batchKey],
+        progress: 100,
+        status: response.success ? 'completed' : 'error'
+      }
+    }));
+    if (uploaded.length > 0) {
+      setSuccess(`${uploaded.length} 个文件上传成功`);
+    }
+    if (!response.success) {
+      const details = failed.map(item => `${item.original_filename}（${item.message}）`).join('、');
+      setError(`文件上传失败: ${details || response.message}`);
+    }
+  };
+
   const handleFileUpload = async (files, fileType, platform = null) => {
     if (!formData.作品ID) {
       setError('请先保存作品基本信息后再上传文件');
@@ -458,6 +521,12 @@ const WorkEditor = ({ work, onClose }) => {
     setShowUploadModal(true);
 
     try {
+      const fileList = Array.from(files);
+      if (fileList.length > 1 && fileList.every(file => file.size < CHUNKED_UPLOAD_THRESHOLD)) {
+        await handleBatchUpload(fileList, fileType, platform);
+        return;
+      }
+
       for (let i = 0; i < files.length; i++) {
         const file = files[i];
         console.log(`上传文件: ${file.name}, 作品ID: ${formData.作品ID}, 文件类型: ${fileType}, 平台: ${platform}`);
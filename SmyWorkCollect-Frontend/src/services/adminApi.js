@@ -68,6 +68,118 @@ export const adminDeleteWork = async (workId) => {
   return response.data;
 };
 
+// 管理员批量修改/删除作品（update 中只需给出要修改的字段），返回逐项结果 results
+export const adminBatchWorks = async ({ update = [], remove = [] } = {}) => {
+  const response = await adminApi.post('/admin/works/batch', { update, delete: remove }, {
+    params: { token: adminToken }
+  });
+  return response.data;
+};
+
+// 等待后台任务完成（上传的文件在后台登记，接口先返回 202 和任务ID），返回与同步接口相同格式的结果
+export const waitForJob = async (jobId, { interval = 500, timeout = 30 * 60 * 1000 } = {}) => {
+  const deadline = Date.now() + timeout;
+  for (;;) {
+    const { data } = await adminApi.get(`/admin/jobs/${jobId}`, {
+      params: { token: adminToken }
+    });
+    const job = data.data;
+    if (job.status === 'done') {
+      return { success: true, message: '处理完成', ...(job.result || {}) };
+    }
+    if (job.status === 'failed') {
+      return { success: false, message: job.error || '后台任务失败' };
+    }
+    if (Date.now() > deadline) {
+      throw new Error('等待后台任务超时');
+    }
+    await new Promise(resolve => setTimeout(resolve, interval));
+  }
+};
+
+// 202 表示已转为后台任务，等待任务完成后再返回结果
+const resolveJobResponse = (response) => (
+  response.status === 202 && response.data.job_id ? waitForJob(response.data.job_id) : response.data
+);
+
+// 超过该大小的文件使用分块上传
+export const CHUNKED_UPLOAD_THRESHOLD = 50 * 1024 * 1024; // 50MB
+
+// 管理员分块上传文件 (断点续传：失败的分块单独重试，parallel > 1 时并行上传多个分块)
+export const adminUploadFileChunked = async (workId, fileType, file, platform = null, onProgress = null, { parallel = 3, maxRetries = 3 } = {}) => {
+  console.log(`开始分块上传文件: ${file.name}, 大小: ${(file.size / (1024 * 1024)).toFixed(1)}MB, 并行数: ${parallel}`);
+
+  const params = { token: adminToken };
+  const { data: session } = await adminApi.post(`/admin/upload-session/${workId}/${fileType}`, {
+    filename: file.name,
+    size: file.size,
+    platform,
+  }, { params });
+  if (!session.success) {
+    throw new Error(session.message || '创建上传会话失败');
+  }
+
+  const { upload_id: uploadId, chunk_size: chunkSize, total_chunks: totalChunks } = session;
+  const pending = Array.from({ length: totalChunks }, (_, index) => index);
+  const startTime = Date.now();
+  let uploaded = 0;
+
+  const reportProgress = () => {
+    if (!onProgress) return;
+    const elapsed = (Date.now() - startTime) / 1000;
+    const speed = elapsed > 0 ? uploaded / elapsed : 0;
+    onProgress({
+      progress: Math.round((uploaded * 100) / file.size),
+      uploaded,
+      total: file.size,
+      speed,
+      fileName: file.name,
+      fileSize: file.size,
+      eta: speed > 0 ? Math.round((file.size - uploaded) / speed) : 0,
+      retryCount: 0
+    });
+  };
+
+  const uploadChunk = async (index) => {
+    const offset = index * chunkSize;
+    const blob = file.slice(offset, Math.min(offset + chunkSize, file.size));
+    for (let attempt = 0; ; attempt++) {
+      try {
+        await adminApi.put(`/admin/upload-session/${workId}/${uploadId}/${index}`, blob, {
+          params: { ...params, offset },
+          headers: { 'Content-Type': 'application/octet-stream' },
+          timeout: 10 * 60 * 1000,
+        });
+        uploaded += blob.size;
+        reportProgress();
+        return;
+      } catch (error) {
+        if (attempt >= maxRetries || (error.response && error.response.status < 500)) {
+          throw error;
+        }
+        const delayMs = Math.min(1000 * Math.pow(2, attempt), 10000); // 指数退避，最大10秒
+        console.log(`分块 ${index} 上传失败，${delayMs}ms后重试...`);
+        await new Promise(resolve => setTimeout(resolve, delayMs));
+      }
+    }
+  };
+
+  const worker = async () => {
+    while (pending.length > 0) {
+      await uploadChunk(pending.shift());
+    }
+  };
+  await Promise.all(Array.from({ length: Math.max(1, parallel) }, worker));
+
+  const commitResponse = await adminApi.post(`/admin/upload-session/${workId}/${uploadId}/commit`, null, {
+    params,
+    timeout: 5 * 60 * 1000,
+  });
+  const result = await resolveJobResponse(commitResponse);
+  console.log(`文件分块上传成功: ${file.name}`);
+  return result;
+};
+
 // 管理员上传文件 (支持大文件和详细进度回调，增强错误处理和重试机制)
 export const adminUploadFile = async (workId, fileType, file, platform = null, onProgress = null, maxRetries = 3) => {
   // 检查文件大小 (前端预检查)
@@ -76,6 +188,11 @@ export const adminUploadFile = async (workId, fileType, file, platform = null, o
     throw new Error(`文件太大，最大支持 ${maxSize / (1024 * 1024)}MB，当前文件大小：${(file.size / (1024 * 1024)).toFixed(1)}MB`);
   }
 
+  // 大文件走分块断点续传
+  if (file.size >= CHUNKED_UPLOAD_THRESHOLD) {
+    return adminUploadFileChunked(workId, fileType, file, platform, onProgress, { maxRetries });
+  }
+
   console.log(`开始上传文件: ${file.name}, 大小: ${(file.size / (1024 * 1024)).toFixed(1)}MB, 作品ID: ${workId}, 类型: ${fileType}, 平台: ${platform}`);
 
   const formData = new FormData();
@@ -145,7 +262,7 @@ export const adminUploadFile = async (workId, fileType, file, platform = null, o
       });
       
       console.log(`文件上传成功: ${file.name}`);
-      return response.data;
+      return resolveJobResponse(response);
       
     } catch (error) {
       console.error(`上传尝试 ${retryCount + 1} 失败:`, error);
@@ -220,6 +337,42 @@ export const adminUploadFile = async (workId, fileType, file, platform = null, o
   return uploadAttempt();
 };
 
+// 管理员一次上传多个文件（一个请求，作品配置只更新一次），返回逐个文件的结果 results
+export const adminUploadFiles = async (workId, fileType, files, platform = null, onProgress = null) => {
+  const formData = new FormData();
+  files.forEach(file => formData.append('files', file));
+  if (platform) {
+    formData.append('platform', platform);
+  }
+
+  const totalSize = files.reduce((sum, file) => sum + file.size, 0);
+  const startTime = Date.now();
+  const response = await adminApi.post(`/admin/upload/${workId}/${fileType}/batch`, formData, {
+    params: { token: adminToken },
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+    timeout: 30 * 60 * 1000,
+    onUploadProgress: (progressEvent) => {
+      if (onProgress && progressEvent.total) {
+        const elapsed = (Date.now() - startTime) / 1000;
+        const speed = elapsed > 0 ? progressEvent.loaded / elapsed : 0;
+        onProgress({
+          progress: Math.round((progressEvent.loaded * 100) / progressEvent.total),
+          uploaded: progressEvent.loaded,
+          total: progressEvent.total,
+          speed,
+          fileName: `${files.length} 个文件`,
+          fileSize: totalSize,
+          eta: speed > 0 ? Math.round((progressEvent.total - progressEvent.loaded) / speed) : 0,
+          retryCount: 0
+        });
+      }
+    },
+  });
+  return resolveJobResponse(response);
+};
+
 // 管理员删除文件
 export const adminDeleteFile = async (workId, fileType, filename, platform = null) => {
   const params = { token: adminToken };